@@ -14,6 +14,8 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+import json
+import zipfile
 from datetime import datetime
 from enum import Enum
 from pathlib import Path
@@ -26,6 +28,7 @@ from dynatrace.dynatrace_object import DynatraceObject
 from dynatrace.environment_v2.monitored_entities import EntityShortRepresentation
 from dynatrace.http_client import HttpClient
 from dynatrace.pagination import PaginatedList
+from dynatrace.streaming import DEFAULT_CHUNK_SIZE, Destination, DownloadResult, MultipartFileEncoder, ProgressCallback, write_response
 
 
 class ExtensionService:
@@ -49,19 +52,30 @@ class ExtensionService:
         response = self.__http_client.make_request(f"/api/config/v1/extensions/{extension_id}").json()
         return Extension(raw_element=response)
 
-    def post(self, zip_file_path: str) -> EntityShortRepresentation:
-
-        file = Path(zip_file_path)
-        with open(file, "rb") as f:
-            response = self.__http_client.make_request("/api/config/v1/extensions", method="POST", files={"file": f})
+    def post(
+        self, zip_file_path: str, validate_locally: bool = False, progress: Optional[ProgressCallback] = None, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> EntityShortRepresentation:
+        """Uploads an extension, streaming the archive from disk
 
+        :param zip_file_path: path to the zipped extension
+        :param validate_locally: check the archive and its plugin.json with validate_extension_zip before uploading it
+        :param progress: called with (bytes sent, total bytes) while the archive is uploaded
+        :param chunk_size: how many bytes of the archive are read at a time
+        """
+        response = self.__upload("/api/config/v1/extensions", zip_file_path, validate_locally, progress, chunk_size)
         return EntityShortRepresentation(raw_element=response.json())
 
-    def validate(self, zip_file_path: str) -> Response:
+    def validate(
+        self, zip_file_path: str, validate_locally: bool = False, progress: Optional[ProgressCallback] = None, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> Response:
+        """Validates an extension on the server without uploading it, the parameters are the same as post"""
+        return self.__upload("/api/config/v1/extensions/validator", zip_file_path, validate_locally, progress, chunk_size)
 
-        file = Path(zip_file_path)
-        with open(file, "rb") as f:
-            return self.__http_client.make_request("/api/config/v1/extensions/validator", method="POST", files={"file": f})
+    def __upload(self, path: str, zip_file_path: str, validate_locally: bool, progress: Optional[ProgressCallback], chunk_size: int) -> Response:
+        if validate_locally:
+            validate_extension_zip(zip_file_path)
+        with MultipartFileEncoder(zip_file_path, progress=progress, chunk_size=chunk_size) as body:
+            return self.__http_client.make_request(path, method="POST", headers={"Content-Type": body.content_type}, data=body)
 
     def list_instances(self, extension_id: str, page_size: int = 200) -> PaginatedList["ExtensionShortRepresentation"]:
         params = {"pageSize": page_size}
@@ -99,6 +113,13 @@ class ExtensionService:
     def get_binary(self, extension_id: str) -> bytes:
         return self.__http_client.make_request(f"/api/config/v1/extensions/{extension_id}/binary").content
 
+    def download_binary(
+        self, extension_id: str, destination: Destination, expected_sha256: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> DownloadResult:
+        """Same as get_binary, but writes the extension zip to a file or file-like object in chunks instead of holding it in memory"""
+        response = self.__http_client.make_request(f"/api/config/v1/extensions/{extension_id}/binary", stream=True)
+        return write_response(response, destination, expected_sha256, chunk_size)
+
     def list_states(self, extension_id: str) -> PaginatedList["ExtensionState"]:
         return PaginatedList(
             ExtensionState,
@@ -141,6 +162,36 @@ class ExtensionService:
         return ExtensionConfigurationDto(http_client=self.__http_client, raw_element=raw_element)
 
 
+def validate_extension_zip(zip_file_path: Union[str, Path]) -> Dict[str, Any]:
+    """Checks that an extension archive is a valid zip file with a plugin.json, without uploading it
+
+    The CRC of every file is checked, and there must be a single plugin.json, at the root of the archive or in its
+    top level directory, declaring a name, a version and a type.
+
+    :param zip_file_path: path to the zipped extension
+
+    :return: the parsed plugin.json
+    """
+    try:
+        with zipfile.ZipFile(zip_file_path) as archive:
+            corrupted = archive.testzip()
+            if corrupted is not None:
+                raise ValueError(f"{zip_file_path} is corrupted, the CRC of {corrupted} does not match")
+            manifests = [name for name in archive.namelist() if name.split("/")[-1] == "plugin.json" and name.count("/") <= 1]
+            if len(manifests) != 1:
+                raise ValueError(f"{zip_file_path} must contain exactly one plugin.json in its top level directory, found {len(manifests)}")
+            plugin = json.loads(archive.read(manifests[0]).decode("utf-8"))
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"{zip_file_path} is not a valid zip file: {e}")
+    except json.JSONDecodeError as e:
+        raise ValueError(f"The plugin.json of {zip_file_path} is not valid JSON: {e}")
+
+    missing = [key for key in ("name", "version", "type") if not plugin.get(key)]
+    if missing:
+        raise ValueError(f"The plugin.json of {zip_file_path} does not declare {', '.join(missing)}")
+    return plugin
+
+
 class ExtensionProperty(DynatraceObject):
     def _create_from_raw_data(self, raw_element):
         self.key: str = raw_element.get("key")
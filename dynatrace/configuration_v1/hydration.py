@@ -0,0 +1,74 @@
+"""
+Copyright 2021 Dynatrace LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import inspect
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+from dynatrace.dynatrace_object import DynatraceObject
+from dynatrace.utils import parallel_map, parallel_map_unordered
+
+# The config v1 stubs don't share a method name to fetch their full object, these are tried in order
+FULL_OBJECT_GETTERS = (
+    "get_full_configuration",
+    "get_full_dashboard",
+    "get_full_maintenance_window",
+    "get_full_metric_event",
+    "get_full_extension",
+)
+
+
+def get_full_object(stub: DynatraceObject, **kwargs) -> Any:
+    """Fetches the full object for a single stub, using whichever of FULL_OBJECT_GETTERS it offers
+
+    Only the kwargs the getter accepts are passed to it, so stubs of different types can share them.
+    """
+    for name in FULL_OBJECT_GETTERS:
+        getter = getattr(stub, name, None)
+        if getter is not None:
+            return getter(**_accepted_kwargs(getter, kwargs))
+    raise TypeError(f"{stub.__class__.__name__} has no method to get its full object, expected one of {FULL_OBJECT_GETTERS}")
+
+
+def hydrate(stubs: Iterable[DynatraceObject], workers: int = 8, **kwargs) -> List[Any]:
+    """Fetches the full objects for a list of stubs concurrently, keeping the order of the stubs.
+
+    Works with any stub that offers one of FULL_OBJECT_GETTERS, e.g. DashboardStub, AutoTagShortRepresentation,
+    MaintenanceWindowStub or ManagementZoneShortRepresentation. Stubs of different types can be mixed.
+    Every request goes through the client, so the too_many_requests_strategy and retries still apply.
+
+    :param stubs: the stubs, any iterable including a PaginatedList
+    :param workers: how many requests are in flight at the same time
+    :param kwargs: passed to the getters that accept them, e.g. extension_id for ExtensionShortRepresentation
+    :return: the full objects, in the same order as the stubs
+    """
+    return list(iter_hydrate(stubs, workers, **kwargs))
+
+
+def iter_hydrate(stubs: Iterable[DynatraceObject], workers: int = 8, **kwargs) -> Iterator[Any]:
+    """Same as hydrate, but yields the full objects in order while the next ones are being fetched"""
+    return parallel_map(lambda stub: get_full_object(stub, **kwargs), stubs, workers)
+
+
+def hydrate_as_completed(stubs: Iterable[DynatraceObject], workers: int = 8, **kwargs) -> Iterator[Tuple[DynatraceObject, Any]]:
+    """Same as hydrate, but yields (stub, full object) tuples as soon as each request completes, in any order"""
+    return parallel_map_unordered(lambda stub: get_full_object(stub, **kwargs), stubs, workers)
+
+
+def _accepted_kwargs(func: Callable, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    parameters = inspect.signature(func).parameters
+    if any(p.kind == inspect.Parameter.VAR_KEYWORD for p in parameters.values()):
+        return kwargs
+    return {key: value for key, value in kwargs.items() if key in parameters}
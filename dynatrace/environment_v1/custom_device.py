@@ -14,13 +14,15 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+import threading
 from datetime import datetime, timedelta, timezone
 from collections.abc import MutableSequence
-from typing import Optional, List, Dict, Tuple
+from typing import Optional, List, Dict, Tuple, Any
 
 
 from dynatrace.dynatrace_object import DynatraceObject
 from dynatrace.http_client import HttpClient
+from dynatrace.utils import parallel_map_unordered
 
 
 class CustomDeviceService:
@@ -58,18 +60,24 @@ class CustomDeviceService:
             host_names=host_names,
         )
 
+    def pusher(self, workers: int = 8) -> "CustomDevicePusher":
+        return CustomDevicePusher(self, workers)
+
 
 class Series(MutableSequence):
     def __init__(self, *args):
         self.list: List["EntityTimeseriesData"] = []
+        # Series by (timeseries_id, dimensions), so appending to a big push message doesn't scan all series
+        self.__index: Dict[Tuple, "EntityTimeseriesData"] = {}
         self.extend(list(args))
 
     def append(self, time_series: "EntityTimeseriesData") -> None:
-        for element in self.list:
-            if time_series.timeseries_id == element.timeseries_id and time_series.dimensions == element.dimensions:
-                element.data_points.extend(time_series.data_points)
-                return
+        element = self.__index.get(_series_key(time_series))
+        if element is not None:
+            element.data_points.extend(time_series.data_points)
+            return
         self.list.append(time_series)
+        self.__index[_series_key(time_series)] = time_series
 
     def __len__(self):
         return len(self.list)
@@ -79,12 +87,20 @@ class Series(MutableSequence):
 
     def __delitem__(self, i):
         del self.list[i]
+        self.__reindex()
 
     def __setitem__(self, i, v):
         self.list[i] = v
+        self.__reindex()
 
     def insert(self, i, v):
         self.list.insert(i, v)
+        self.__reindex()
+
+    def __reindex(self):
+        self.__index = {}
+        for element in self.list:
+            self.__index.setdefault(_series_key(element), element)
 
     def __str__(self):
         return str(self.list)
@@ -146,7 +162,17 @@ class CustomDevicePushMessage(DynatraceObject):
         self.__series = series
         self._raw_element["series"] = [s._raw_element for s in self.__series]
 
+    def json(self):
+        self.__sync_series()
+        return self._raw_element
+
+    def __sync_series(self):
+        # Data points are added in place (absolute, Series.append), the payload is only rebuilt when it is sent
+        if self.__series:
+            self._raw_element["series"] = [s.json() for s in self.__series]
+
     def post(self, only_valid_data_points=False):
+        self.__sync_series()
         try:
             response = self._http_client.make_request(f"/api/v1/entity/infrastructure/custom/{self.device_id}", params=self._raw_element, method="POST")
             return response
@@ -168,7 +194,6 @@ class CustomDevicePushMessage(DynatraceObject):
     def absolute(self, key: str, value: float, timestamp: Optional[datetime] = None, dimensions: Optional[Dict[str, str]] = None):
         data_point = DataPoint(value, timestamp)
         self.series.append(EntityTimeseriesData(self._http_client, key, [data_point], dimensions))
-        self.series = self.series  # Ugly as hell hack because of setter, and I don't want to subclass list
 
 
 class EntityTimeseriesData(DynatraceObject):
@@ -195,6 +220,11 @@ class EntityTimeseriesData(DynatraceObject):
         self.__data_points = data_points
         self._raw_element["dataPoints"] = [[int(data_point.timestamp.timestamp() * 1000), data_point.value] for data_point in self.__data_points]
 
+    def json(self):
+        # data_points can be extended in place when series are merged, so the raw data points are refreshed here
+        self.data_points = self.__data_points
+        return self._raw_element
+
 
 class DataPoint:
     def __init__(self, value: float, timestamp: Optional[datetime] = None):
@@ -205,3 +235,59 @@ class DataPoint:
 
     def __repr__(self):
         return f"[{self.timestamp}, {self.value}]"
+
+
+def _series_key(time_series: EntityTimeseriesData) -> Tuple:
+    dimensions = time_series.dimensions
+    return time_series.timeseries_id, None if dimensions is None else tuple(sorted(dimensions.items()))
+
+
+class CustomDevicePusher:
+    """Collects data points for many custom devices and pushes one message per device concurrently.
+
+    Data points recorded between two flushes are coalesced into a single push message per device.
+    Device properties set with device() are sent with every message of that device.
+
+    :param custom_devices: the custom device service
+    :param workers: how many devices are pushed at the same time
+    """
+
+    def __init__(self, custom_devices: CustomDeviceService, workers: int = 8):
+        self.__custom_devices = custom_devices
+        self.workers = workers
+        self.__lock = threading.Lock()
+        self.__properties: Dict[str, Dict[str, Any]] = {}
+        self.__pending: Dict[str, CustomDevicePushMessage] = {}
+
+    def device(self, device_id: str, **properties):
+        """Sets the properties of a device, the same keyword arguments as CustomDeviceService.create, e.g. display_name"""
+        with self.__lock:
+            self.__properties.setdefault(device_id, {}).update(properties)
+            message = self.__pending.get(device_id)
+            if message is not None:
+                pending_series = message.series
+                self.__pending[device_id] = self.__custom_devices.create(device_id, series=pending_series, **self.__properties[device_id])
+
+    def absolute(self, device_id: str, key: str, value: float, timestamp: Optional[datetime] = None, dimensions: Optional[Dict[str, str]] = None):
+        with self.__lock:
+            message = self.__pending.get(device_id)
+            if message is None:
+                message = self.__custom_devices.create(device_id, **self.__properties.get(device_id, {}))
+                self.__pending[device_id] = message
+            message.absolute(key, value, timestamp, dimensions)
+
+    def flush(self, only_valid_data_points: bool = False) -> Dict[str, Any]:
+        """Pushes the data points recorded since the last flush, one request per device
+
+        :return: the response, or the exception raised, for every device pushed
+        """
+        with self.__lock:
+            pending, self.__pending = self.__pending, {}
+
+        def push(message: CustomDevicePushMessage):
+            try:
+                return message.post(only_valid_data_points)
+            except Exception as e:
+                return e
+
+        return {message.device_id: result for message, result in parallel_map_unordered(push, pending.values(), self.workers)}
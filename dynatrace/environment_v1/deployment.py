@@ -13,10 +13,12 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
-from typing import Optional, Dict, List, Any
+from pathlib import Path
+from typing import Optional, Dict, List, Any, Tuple, Union
 from requests import Response
 
 from dynatrace.dynatrace_object import DynatraceObject
+from dynatrace.streaming import DEFAULT_CHUNK_SIZE, DEFAULT_PART_SIZE, Destination, DownloadResult, write_response, download_ranged
 from dynatrace.http_client import HttpClient
 
 
@@ -75,6 +77,7 @@ class DeploymentService:
         skip_metadata: Optional[bool] = None,
         network_zone: Optional[str] = None,
         if_none_match: Optional[str] = None,
+        stream: bool = False,
     ) -> "Response":
         """Downloads OneAgent installer of the specified version.
         The installer is avaialable in the "content" attribute of the response.
@@ -105,9 +108,26 @@ class DeploymentService:
         :param network_zone: the network zone you want the result to be configured with.
         :param if_none_match: The ETag of the previous request. Do not download if it matches the ETag of the installer.
             The ETag is available in the headers of the response.
+        :param stream: set true to not load the body in memory, read it with the "iter_content" method of the response.
 
         :returns Response: HTTP Response to the request. Can be written to file from the "content" attribute.
         """
+        path, params = self.__agent_installer_request(os_type, installer_type, version, flavor, arch, bitness, include, skip_metadata, network_zone)
+        headers = {"If-None-Match": if_none_match} if if_none_match else None
+        return self.__http_client.make_request(path=path, params=params, headers=headers, stream=stream)
+
+    def __agent_installer_request(
+        self,
+        os_type: str,
+        installer_type: str,
+        version: str,
+        flavor: Optional[str],
+        arch: Optional[str],
+        bitness: Optional[str],
+        include: Optional[List[str]],
+        skip_metadata: Optional[bool],
+        network_zone: Optional[str],
+    ) -> Tuple[str, Dict[str, Any]]:
         if version != "latest":
             version = "version/" + version
         params = {
@@ -118,8 +138,66 @@ class DeploymentService:
             "skipMetadata": skip_metadata,
             "networkZone": network_zone,
         }
-        headers = {"If-None-Match": if_none_match} if if_none_match else None
-        return self.__http_client.make_request(path=f"{self.ENDPOINT_INSTALLER_AGENT}/{os_type}/{installer_type}/{version}", params=params, headers=headers)
+        return f"{self.ENDPOINT_INSTALLER_AGENT}/{os_type}/{installer_type}/{version}", params
+
+    def download_agent_installer(
+        self,
+        destination: Destination,
+        os_type: str,
+        installer_type: str,
+        version: str = "latest",
+        flavor: Optional[str] = None,
+        arch: Optional[str] = None,
+        bitness: Optional[str] = None,
+        include: Optional[List[str]] = None,
+        skip_metadata: Optional[bool] = None,
+        network_zone: Optional[str] = None,
+        if_none_match: Optional[str] = None,
+        expected_sha256: Optional[str] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> Optional[DownloadResult]:
+        """Downloads a OneAgent installer to a file or file-like object in chunks, without holding it in memory.
+        The parameters are the same as get_agent_installer.
+
+        :param destination: a file path, or a binary file-like object
+        :param expected_sha256: the sha256 the installer must have, a ValueError is raised if it doesn't
+        :param chunk_size: how many bytes are held in memory at a time
+
+        :returns DownloadResult: the size, sha256 and ETag of the installer. None if if_none_match matched and nothing was downloaded
+        """
+        response = self.get_agent_installer(
+            os_type, installer_type, version, flavor, arch, bitness, include, skip_metadata, network_zone, if_none_match, stream=True
+        )
+        return _write_download(response, destination, expected_sha256, chunk_size)
+
+    def download_agent_installer_parallel(
+        self,
+        destination: Union[str, Path],
+        os_type: str,
+        installer_type: str,
+        version: str = "latest",
+        flavor: Optional[str] = None,
+        arch: Optional[str] = None,
+        bitness: Optional[str] = None,
+        include: Optional[List[str]] = None,
+        skip_metadata: Optional[bool] = None,
+        network_zone: Optional[str] = None,
+        expected_sha256: Optional[str] = None,
+        workers: int = 4,
+        part_size: int = DEFAULT_PART_SIZE,
+    ) -> DownloadResult:
+        """Downloads a OneAgent installer to a file with parallel range requests, resuming an interrupted download.
+        The parameters are the same as get_agent_installer, see streaming.download_ranged for the details.
+
+        :param destination: the file path to write to
+        :param expected_sha256: the sha256 the installer must have, a ValueError is raised if it doesn't
+        :param workers: how many parts are downloaded at the same time
+        :param part_size: the size in bytes of every part
+
+        :returns DownloadResult: the size, sha256 and ETag of the installer
+        """
+        path, params = self.__agent_installer_request(os_type, installer_type, version, flavor, arch, bitness, include, skip_metadata, network_zone)
+        return download_ranged(self.__http_client, path, destination, params, workers=workers, part_size=part_size, expected_sha256=expected_sha256)
 
     def get_agent_installer_connection_info(self, network_zone: Optional[str] = "default", version: Optional[str] = None) -> "ConnectionInfo":
         """Gets the connectivity information for OneAgent.
@@ -199,7 +277,7 @@ class DeploymentService:
         response = self.__http_client.make_request(path=f"{self.ENDPOINT_INSTALLER_GATEWAY}/versions/{os_type}")
         return ActiveGateInstallerVersions(raw_element=response.json())
 
-    def get_gateway_installer(self, os_type: str, version: str = "latest", if_none_match: Optional[str] = None) -> "Response":
+    def get_gateway_installer(self, os_type: str, version: str = "latest", if_none_match: Optional[str] = None, stream: bool = False) -> "Response":
         """Downloads the configured standard ActiveGate installer.
 
         :param os_type: The operating system of the installer. Use one of:
@@ -209,13 +287,59 @@ class DeploymentService:
             If none is specified, latest available version is used.
         :param if_none_match: The ETag of the previous request. Do not download if it matches the ETag of the installer.
             The ETag is available in the headers of the response.
+        :param stream: set true to not load the body in memory, read it with the "iter_content" method of the response.
 
         :returns Response: HTTP Response to the request. Can be written to file from the "content" attribute.
         """
         if version != "latest":
             version = "version/" + version
         headers = {"If-None-Match": if_none_match} if if_none_match else None
-        return self.__http_client.make_request(path=f"{self.ENDPOINT_INSTALLER_GATEWAY}/{os_type}/{version}", headers=headers)
+        return self.__http_client.make_request(path=f"{self.ENDPOINT_INSTALLER_GATEWAY}/{os_type}/{version}", headers=headers, stream=stream)
+
+    def download_gateway_installer(
+        self,
+        destination: Destination,
+        os_type: str,
+        version: str = "latest",
+        if_none_match: Optional[str] = None,
+        expected_sha256: Optional[str] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> Optional[DownloadResult]:
+        """Downloads an ActiveGate installer to a file or file-like object in chunks, without holding it in memory.
+        The parameters are the same as get_gateway_installer.
+
+        :param destination: a file path, or a binary file-like object
+        :param expected_sha256: the sha256 the installer must have, a ValueError is raised if it doesn't
+        :param chunk_size: how many bytes are held in memory at a time
+
+        :returns DownloadResult: the size, sha256 and ETag of the installer. None if if_none_match matched and nothing was downloaded
+        """
+        response = self.get_gateway_installer(os_type, version, if_none_match, stream=True)
+        return _write_download(response, destination, expected_sha256, chunk_size)
+
+    def download_gateway_installer_parallel(
+        self,
+        destination: Union[str, Path],
+        os_type: str,
+        version: str = "latest",
+        expected_sha256: Optional[str] = None,
+        workers: int = 4,
+        part_size: int = DEFAULT_PART_SIZE,
+    ) -> DownloadResult:
+        """Downloads an ActiveGate installer to a file with parallel range requests, resuming an interrupted download.
+        The parameters are the same as get_gateway_installer, see streaming.download_ranged for the details.
+
+        :param destination: the file path to write to
+        :param expected_sha256: the sha256 the installer must have, a ValueError is raised if it doesn't
+        :param workers: how many parts are downloaded at the same time
+        :param part_size: the size in bytes of every part
+
+        :returns DownloadResult: the size, sha256 and ETag of the installer
+        """
+        if version != "latest":
+            version = "version/" + version
+        path = f"{self.ENDPOINT_INSTALLER_GATEWAY}/{os_type}/{version}"
+        return download_ranged(self.__http_client, path, destination, workers=workers, part_size=part_size, expected_sha256=expected_sha256)
 
     def list_boshrelease_agent_versions(self, os_type: str) -> "BoshReleaseAvailableVersions":
         """Lists available OneAgent versions for BOSH release tarballs.
@@ -249,7 +373,9 @@ class DeploymentService:
 
         return BoshReleaseChecksum(raw_element=response.json())
 
-    def get_boshrelease_agent(self, os_type: str, version: str, skip_metadata: Optional[bool] = None, network_zone: Optional[str] = None) -> "Response":
+    def get_boshrelease_agent(
+        self, os_type: str, version: str, skip_metadata: Optional[bool] = None, network_zone: Optional[str] = None, stream: bool = False
+    ) -> "Response":
         """Downloads the BOSH release tarballs of the specified version, OneAgent included.
         For SaaS, the call is executed on an Environment ActiveGate. *Be sure to use the base URL of an ActiveGate, not the environment*
 
@@ -259,11 +385,35 @@ class DeploymentService:
         :param version: The required version of the OneAgent in the 1.155.275.20181112-084458 format.
         :param skip_metadata: Set true to omit the OneAgent connectivity information from the installer. If not set, false is used.
         :param network_zone: The network zone you want the result to be configured with.
+        :param stream: set true to not load the body in memory, read it with the "iter_content" method of the response.
 
         :returns Response: HTTP Response to the request. Can be written to file from the "content" attribute.
         """
         params = {"skipMetadata": skip_metadata, "networkZone": network_zone}
-        return self.__http_client.make_request(path=f"{self.ENDPOINT_BOSHRELEASE}/agent/{os_type}/version/{version}", params=params)
+        return self.__http_client.make_request(path=f"{self.ENDPOINT_BOSHRELEASE}/agent/{os_type}/version/{version}", params=params, stream=stream)
+
+    def download_boshrelease_agent(
+        self,
+        destination: Destination,
+        os_type: str,
+        version: str,
+        skip_metadata: Optional[bool] = None,
+        network_zone: Optional[str] = None,
+        verify: bool = True,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> DownloadResult:
+        """Downloads a BOSH release tarball to a file or file-like object in chunks, without holding it in memory.
+        The parameters are the same as get_boshrelease_agent.
+
+        :param destination: a file path, or a binary file-like object
+        :param verify: check the tarball against get_boshrelease_agent_checksum, a ValueError is raised if it doesn't match
+        :param chunk_size: how many bytes are held in memory at a time
+
+        :returns DownloadResult: the size and sha256 of the tarball
+        """
+        expected_sha256 = self.get_boshrelease_agent_checksum(os_type, version, skip_metadata, network_zone).sha_256 if verify else None
+        response = self.get_boshrelease_agent(os_type, version, skip_metadata, network_zone, stream=True)
+        return _write_download(response, destination, expected_sha256, chunk_size)
 
     def get_lambda_agent_versions(self) -> "LatestLambdaLayerNames":
         """Get the latest version names of the OneAgent for AWS Lambda.
@@ -273,7 +423,7 @@ class DeploymentService:
         """
         return LatestLambdaLayerNames(raw_element=self.__http_client.make_request(path=f"{self.ENDPOINT_LAMBDA}").json())
 
-    def get_orchestration_agent(self, orchestration_type: str, version: str = "latest") -> "Response":
+    def get_orchestration_agent(self, orchestration_type: str, version: str = "latest", stream: bool = False) -> "Response":
         """Downloads the OneAgent deployment orchestration tarball.
 
         :param orchestration_type: The Orchestration Type of the orchestration deployment script. Use one of:
@@ -281,12 +431,33 @@ class DeploymentService:
             - puppet \n
         :param version: The requested version of the OneAgent orchestration deployment tarball in 0.1.0.20200925-120822 format.
             If none is provided, the latest available is used.
+        :param stream: set true to not load the body in memory, read it with the "iter_content" method of the response.
 
         :returns Response: HTTP Response to the request. Can be written to file from the "content" attribute.
         """
         if version != "latest":
             version = "version/" + version
-        return self.__http_client.make_request(path=f"{self.ENDPOINT_ORCHESTRATION}/{orchestration_type}/{version}")
+        return self.__http_client.make_request(path=f"{self.ENDPOINT_ORCHESTRATION}/{orchestration_type}/{version}", stream=stream)
+
+    def download_orchestration_agent(
+        self,
+        destination: Destination,
+        orchestration_type: str,
+        version: str = "latest",
+        expected_sha256: Optional[str] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> DownloadResult:
+        """Downloads the OneAgent deployment orchestration tarball to a file or file-like object in chunks.
+        The parameters are the same as get_orchestration_agent.
+
+        :param destination: a file path, or a binary file-like object
+        :param expected_sha256: the sha256 the tarball must have, a ValueError is raised if it doesn't
+        :param chunk_size: how many bytes are held in memory at a time
+
+        :returns DownloadResult: the size and sha256 of the tarball
+        """
+        response = self.get_orchestration_agent(orchestration_type, version, stream=True)
+        return _write_download(response, destination, expected_sha256, chunk_size)
 
     def get_orchestration_agent_signature(self, orchestration_type: str, version: str = "latest") -> "Response":
         """ ""Downloads the signature matching the OneAgent deployment orchestration tarball.
@@ -304,6 +475,14 @@ class DeploymentService:
         return self.__http_client.make_request(path=f"{self.ENDPOINT_ORCHESTRATION}/{orchestration_type}/{version}/signature")
 
 
+def _write_download(response: Response, destination: Destination, expected_sha256: Optional[str], chunk_size: int) -> Optional[DownloadResult]:
+    if response.status_code == 304:
+        # Not modified, the caller already has the artifact matching its ETag
+        response.close()
+        return None
+    return write_response(response, destination, expected_sha256, chunk_size)
+
+
 class ConnectionInfo(DynatraceObject):
     def _create_from_raw_data(self, raw_element: Dict[str, Any]):
         self.tenant_uuid: str = raw_element["tenantUUID"]
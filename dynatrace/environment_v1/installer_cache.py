@@ -0,0 +1,139 @@
+"""
+Copyright 2021 Dynatrace LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import json
+import threading
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from dynatrace.environment_v1.deployment import DeploymentService
+from dynatrace.streaming import DownloadResult
+from dynatrace.utils import atomic_write, datetime_to_int64
+
+
+class CachedInstaller:
+    def __init__(self, path: Path, sha256: str, etag: Optional[str], version: str, downloaded: bool):
+        self.path: Path = path
+        self.sha256: str = sha256
+        self.etag: Optional[str] = etag
+        self.version: str = version
+        self.downloaded: bool = downloaded
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(path={self.path}, version={self.version}, downloaded={self.downloaded})"
+
+
+class InstallerCache:
+    """Keeps OneAgent and ActiveGate installers on disk, and only downloads them again when they changed.
+
+    Installers are indexed by OS type, installer type, version, flavor, arch, bitness, included modules and
+    network zone. "latest" OneAgent installers are first resolved to a version with the metainfo endpoint.
+    Cached installers are revalidated with their ETag (If-None-Match), so an unchanged installer costs a
+    single request without a body. Files are stored by the sha256 of their content, so identical installers
+    reached through different keys are only stored once.
+    """
+
+    INDEX_FILE = "index.json"
+
+    def __init__(self, deployment: DeploymentService, directory: Union[str, Path]):
+        self.__deployment = deployment
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.__lock = threading.Lock()
+        self.__index: Dict[str, Dict[str, Any]] = {}
+        index_path = self.directory / self.INDEX_FILE
+        if index_path.exists():
+            with open(index_path, encoding="utf-8") as f:
+                self.__index = json.load(f)
+
+    def agent_installer(
+        self,
+        os_type: str,
+        installer_type: str,
+        version: str = "latest",
+        flavor: Optional[str] = None,
+        arch: Optional[str] = None,
+        bitness: Optional[str] = None,
+        include: Optional[List[str]] = None,
+        skip_metadata: Optional[bool] = None,
+        network_zone: Optional[str] = None,
+        revalidate: bool = True,
+    ) -> CachedInstaller:
+        """Gets a OneAgent installer, the parameters are the same as DeploymentService.get_agent_installer
+
+        :param revalidate: check with the ETag that the cached installer is still current. Installers of a given version
+                           only change when their embedded connectivity information changes
+        """
+        if version == "latest":
+            version = self.__deployment.get_agent_installer_latest_metainfo(os_type, installer_type, flavor, arch, bitness).latest_agent_version
+        key = "|".join(
+            f"{part}"
+            for part in ("agent", os_type, installer_type, version, flavor, arch, bitness, ",".join(sorted(include or [])), skip_metadata, network_zone)
+        )
+
+        def download(destination: Path, if_none_match: Optional[str]) -> Optional[DownloadResult]:
+            return self.__deployment.download_agent_installer(
+                destination, os_type, installer_type, version, flavor, arch, bitness, include, skip_metadata, network_zone, if_none_match
+            )
+
+        return self.__get(key, version, download, revalidate)
+
+    def gateway_installer(self, os_type: str, version: str = "latest", revalidate: bool = True) -> CachedInstaller:
+        """Gets an ActiveGate installer, the parameters are the same as DeploymentService.get_gateway_installer
+
+        There is no metainfo endpoint for ActiveGate installers, so "latest" is always revalidated with its ETag.
+        """
+        key = f"gateway|{os_type}|{version}"
+
+        def download(destination: Path, if_none_match: Optional[str]) -> Optional[DownloadResult]:
+            return self.__deployment.download_gateway_installer(destination, os_type, version, if_none_match)
+
+        return self.__get(key, version, download, revalidate or version == "latest")
+
+    def __get(self, key: str, version: str, download: Callable[[Path, Optional[str]], Optional[DownloadResult]], revalidate: bool) -> CachedInstaller:
+        with self.__lock:
+            entry = self.__index.get(key)
+        if entry is not None and not self.__object_path(entry["sha256"]).exists():
+            entry = None
+        if entry is not None and not revalidate:
+            return CachedInstaller(self.__object_path(entry["sha256"]), entry["sha256"], entry.get("etag"), version, False)
+
+        tmp_path = self.directory / f"download-{uuid.uuid4().hex}"
+        try:
+            result = download(tmp_path, entry.get("etag") if entry is not None else None)
+            if result is None:
+                return CachedInstaller(self.__object_path(entry["sha256"]), entry["sha256"], entry.get("etag"), version, False)
+            path = self.__object_path(result.sha256)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if path.exists():
+                tmp_path.unlink()
+            else:
+                tmp_path.replace(path)
+        finally:
+            # The download writes to a .part file next to its destination, which is left behind if it fails
+            for leftover in (tmp_path, tmp_path.with_name(f"{tmp_path.name}.part")):
+                if leftover.exists():
+                    leftover.unlink()
+
+        with self.__lock:
+            self.__index[key] = {"sha256": result.sha256, "etag": result.etag, "size": result.size, "fetchedAt": datetime_to_int64(datetime.now(timezone.utc))}
+            atomic_write(self.directory / self.INDEX_FILE, json.dumps(self.__index, indent=2, sort_keys=True))
+        return CachedInstaller(path, result.sha256, result.etag, version, True)
+
+    def __object_path(self, sha256: str) -> Path:
+        return self.directory / "objects" / sha256[:2] / sha256
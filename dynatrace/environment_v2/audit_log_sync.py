@@ -0,0 +1,193 @@
+"""
+Copyright 2021 Dynatrace LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import json
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from dynatrace.environment_v2.audit_logs import AuditLogEntry, AuditLogsService, EventType
+from dynatrace.utils import datetime_to_int64
+
+
+class AuditLogStore:
+    """An incrementally synchronized copy of the audit log in a SQLite database.
+
+    The first sync() downloads the entries since initial_from. The newest timestamp and log ID are kept as a
+    watermark, so every following sync() only asks for the entries from that timestamp on, which is usually a
+    single small request. Entries are indexed by user, category and entity, so compliance checks can query the
+    local copy instead of scanning the audit log again.
+
+    :param audit_logs: the audit logs service
+    :param path: the SQLite database file, created if it doesn't exist. ":memory:" keeps it in memory
+    :param log_filter: the filter of the synchronized entries, it can't change once the database was synced
+    :param initial_from: where the first sync starts, the audit log keeps 30 days of entries
+    """
+
+    def __init__(
+        self,
+        audit_logs: AuditLogsService,
+        path: Union[str, Path],
+        log_filter: Optional[str] = None,
+        initial_from: Union[datetime, str] = "now-30d",
+    ):
+        self.__audit_logs = audit_logs
+        self.log_filter = log_filter
+        self.initial_from = initial_from
+        self.__connection = sqlite3.connect(str(path))
+        with self.__connection:
+            self.__connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS audit_logs (
+                    log_id TEXT PRIMARY KEY,
+                    timestamp INTEGER NOT NULL,
+                    event_type TEXT,
+                    category TEXT,
+                    entity_id TEXT,
+                    user TEXT,
+                    user_type TEXT,
+                    success INTEGER,
+                    raw TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS audit_logs_timestamp ON audit_logs (timestamp);
+                CREATE INDEX IF NOT EXISTS audit_logs_user ON audit_logs (user, timestamp);
+                CREATE INDEX IF NOT EXISTS audit_logs_category ON audit_logs (category, timestamp);
+                CREATE INDEX IF NOT EXISTS audit_logs_entity ON audit_logs (entity_id, timestamp);
+                CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT);
+                """
+            )
+        state = self.__state()
+        if "filter" in state and state["filter"] != log_filter:
+            raise ValueError(f"{path} was synced with the filter {state['filter']!r}, not {log_filter!r}")
+
+    @property
+    def watermark(self) -> Optional[Tuple[int, str]]:
+        """The timestamp, in milliseconds since epoch, and the log ID of the newest synced entry"""
+        state = self.__state()
+        if "timestamp" not in state:
+            return None
+        return state["timestamp"], state["logId"]
+
+    def sync(self) -> int:
+        """Downloads the entries newer than the watermark
+
+        :return: the number of new entries
+        """
+        watermark = self.watermark
+        time_from = f"{watermark[0]}" if watermark is not None else self.initial_from
+        rows = []
+        newest = watermark
+        for entry in self.__audit_logs.list(self.log_filter, time_from, sort="timestamp"):
+            raw = entry.json()
+            key = (raw["timestamp"], raw["logId"])
+            if newest is None or key > newest:
+                newest = key
+            rows.append(
+                (
+                    raw["logId"],
+                    raw["timestamp"],
+                    raw.get("eventType"),
+                    raw.get("category"),
+                    raw.get("entityId"),
+                    raw.get("user"),
+                    raw.get("userType"),
+                    raw.get("success"),
+                    json.dumps(raw, separators=(",", ":")),
+                )
+            )
+
+        # The entries at the watermark timestamp are returned again, the primary key drops them
+        with self.__connection:
+            cursor = self.__connection.executemany("INSERT OR IGNORE INTO audit_logs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            state = {"filter": self.log_filter}
+            if newest is not None:
+                state.update({"timestamp": newest[0], "logId": newest[1]})
+            self.__connection.executemany("INSERT OR REPLACE INTO sync_state VALUES (?, ?)", [(key, json.dumps(value)) for key, value in state.items()])
+        return cursor.rowcount if rows else 0
+
+    def query(
+        self,
+        user: Optional[str] = None,
+        category: Optional[str] = None,
+        entity_id: Optional[str] = None,
+        event_type: Optional[Union[EventType, str]] = None,
+        time_from: Optional[datetime] = None,
+        time_to: Optional[datetime] = None,
+        limit: Optional[int] = None,
+    ) -> List[AuditLogEntry]:
+        """Gets the synced entries matching all the given criteria, newest first"""
+        where, params = self.__where(user, category, entity_id, event_type, time_from, time_to)
+        sql = f"SELECT raw FROM audit_logs{where} ORDER BY timestamp DESC, log_id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [AuditLogEntry(raw_element=json.loads(raw)) for (raw,) in self.__connection.execute(sql, params)]
+
+    def count(
+        self,
+        user: Optional[str] = None,
+        category: Optional[str] = None,
+        entity_id: Optional[str] = None,
+        event_type: Optional[Union[EventType, str]] = None,
+        time_from: Optional[datetime] = None,
+        time_to: Optional[datetime] = None,
+    ) -> int:
+        """Counts the synced entries matching all the given criteria"""
+        where, params = self.__where(user, category, entity_id, event_type, time_from, time_to)
+        return self.__connection.execute(f"SELECT COUNT(*) FROM audit_logs{where}", params).fetchone()[0]
+
+    def count_by(self, column: str, time_from: Optional[datetime] = None, time_to: Optional[datetime] = None) -> Dict[str, int]:
+        """Counts the synced entries per user, category, entity_id or event_type"""
+        if column not in ("user", "category", "entity_id", "event_type"):
+            raise ValueError(f"Can't count by {column}, use one of user, category, entity_id or event_type")
+        where, params = self.__where(time_from=time_from, time_to=time_to)
+        sql = f"SELECT {column}, COUNT(*) FROM audit_logs{where} GROUP BY {column} ORDER BY COUNT(*) DESC"
+        return {value: count for value, count in self.__connection.execute(sql, params)}
+
+    def close(self):
+        self.__connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __state(self) -> Dict[str, Any]:
+        return {key: json.loads(value) for key, value in self.__connection.execute("SELECT key, value FROM sync_state")}
+
+    @staticmethod
+    def __where(
+        user: Optional[str] = None,
+        category: Optional[str] = None,
+        entity_id: Optional[str] = None,
+        event_type: Optional[Union[EventType, str]] = None,
+        time_from: Optional[datetime] = None,
+        time_to: Optional[datetime] = None,
+    ) -> Tuple[str, List[Any]]:
+        conditions, params = [], []
+        for column, value in (("user", user), ("category", category), ("entity_id", entity_id), ("event_type", event_type)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value.value if isinstance(value, EventType) else value)
+        if time_from is not None:
+            conditions.append("timestamp >= ?")
+            params.append(datetime_to_int64(time_from))
+        if time_to is not None:
+            conditions.append("timestamp <= ?")
+            params.append(datetime_to_int64(time_to))
+        return (f" WHERE {' AND '.join(conditions)}" if conditions else ""), params
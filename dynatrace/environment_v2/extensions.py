@@ -14,12 +14,16 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+import io
+import re
+import zipfile
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Union
 
 from dynatrace.dynatrace_object import DynatraceObject
 from dynatrace.http_client import HttpClient
 from dynatrace.pagination import PaginatedList
+from dynatrace.streaming import DEFAULT_CHUNK_SIZE, MultipartFileEncoder, ProgressCallback
 
 
 class ExtensionsServiceV2:
@@ -88,23 +92,34 @@ class ExtensionsServiceV2:
         response = self.__http_client.make_request(f"{self.ENDPOINT}/{extension_name}/{extension_version}").json()
         return Extension(raw_element=response)
 
-    def post(self, zip_file_path: Union[str, Path], validate_only: Optional[bool] = False):
+    def post(
+        self,
+        zip_file_path: Union[str, Path],
+        validate_only: Optional[bool] = False,
+        validate_locally: bool = False,
+        progress: Optional[ProgressCallback] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ):
         """Post the specified version of the extension 2.0
 
+        The archive is streamed from disk, so it is never fully loaded in memory.
+
         :param zip_file_path: path to zipped extension 2.0
         :param validate_only: optionally run validation but do not persist the extension even if validation was successful
+        :param validate_locally: check the archive and its manifest with validate_extension_package before uploading it
+        :param progress: called with (bytes sent, total bytes) while the archive is uploaded
+        :param chunk_size: how many bytes of the archive are read at a time
 
         :return: newly created Extension class object
         """
+        if validate_locally:
+            validate_extension_package(zip_file_path)
         params = {"validateOnly": validate_only}
-        file = Path(zip_file_path)
-        with open(file, "rb") as f:
-            response = self.__http_client.make_request(f"{self.ENDPOINT}",
-                                                       query_params=params,
-                                                       headers={"Content-Type": "application/octet-stream"},
-                                                       method="POST",
-                                                       files={"file": f}).json()
-            return Extension(raw_element=response)
+        with MultipartFileEncoder(zip_file_path, progress=progress, chunk_size=chunk_size) as body:
+            response = self.__http_client.make_request(
+                f"{self.ENDPOINT}", query_params=params, headers={"Content-Type": body.content_type}, method="POST", data=body
+            ).json()
+        return Extension(raw_element=response)
 
     def delete(self, extension_name: str, extension_version: str):
         """Deletes the specified version of the extension 2.0
@@ -200,6 +215,53 @@ class ExtensionsServiceV2:
         url = f"{self.ENDPOINT}/{extension_name}/monitoringConfigurations/{config_id}"
         return self.__http_client.make_request(url, method="DELETE")
 
+
+def validate_extension_package(zip_file_path: Union[str, Path]) -> Dict[str, str]:
+    """Checks that an extension 2.0 archive is a valid zip file with a manifest, without uploading it
+
+    Accepts both a signed package (extension.zip and its signature) and a bare extension.zip. The CRC of every file
+    is checked, and the extension.yaml manifest must declare a name and a version.
+
+    :param zip_file_path: path to zipped extension 2.0
+
+    :return: the name and version declared in the manifest
+    """
+    try:
+        with zipfile.ZipFile(zip_file_path) as package:
+            names = package.namelist()
+            if "extension.zip" in names:
+                _check_zip(package, zip_file_path)
+                # Reading a zip from a member of another one needs a seekable file, which ZipFile.open only gives on 3.7+
+                with zipfile.ZipFile(io.BytesIO(package.read("extension.zip"))) as inner:
+                    _check_zip(inner, f"{zip_file_path}!extension.zip")
+                    manifest = _read_manifest(inner, f"{zip_file_path}!extension.zip")
+            else:
+                _check_zip(package, zip_file_path)
+                manifest = _read_manifest(package, zip_file_path)
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"{zip_file_path} is not a valid zip file: {e}")
+
+    keys = {}
+    for key in ("name", "version"):
+        match = re.search(rf"^{key}:[ \t]*['\"]?([^'\"\s#]+)", manifest, re.MULTILINE)
+        if match is None:
+            raise ValueError(f"The extension.yaml of {zip_file_path} does not declare a {key}")
+        keys[key] = match.group(1)
+    return keys
+
+
+def _check_zip(archive: zipfile.ZipFile, name: Union[str, Path]):
+    corrupted = archive.testzip()
+    if corrupted is not None:
+        raise ValueError(f"{name} is corrupted, the CRC of {corrupted} does not match")
+
+
+def _read_manifest(archive: zipfile.ZipFile, name: Union[str, Path]) -> str:
+    if "extension.yaml" not in archive.namelist():
+        raise ValueError(f"{name} does not contain an extension.yaml at its root")
+    return archive.read("extension.yaml").decode("utf-8")
+
+
 class SchemaFiles(DynatraceObject):
     def _create_from_raw_data(self, raw_element: Dict[str, Any]):
         self.files: List[str] = raw_element.get("files", [])
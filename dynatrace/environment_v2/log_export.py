@@ -0,0 +1,192 @@
+"""
+Copyright 2021 Dynatrace LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import gzip
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional, Union
+
+from dynatrace.environment_v2.logs import LogService
+from dynatrace.utils import atomic_write
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSION_EXTENSIONS = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+
+class NdjsonLogSink:
+    """Writes raw log records to compressed NDJSON files, one record per line, exactly as the API returned them.
+
+    A new file is started when the current one holds max_bytes of uncompressed NDJSON, or when its records span
+    more than max_span of log time. Every file is listed in manifest.json with its record count and the time range
+    of its records, so an archive can be searched by time without decompressing it. Writing into a directory that
+    already has a manifest appends new files to it.
+
+    :param directory: the directory of the files and the manifest, created if it doesn't exist
+    :param prefix: the file names are "<prefix>-<index>.ndjson" plus the extension of the compression
+    :param compression: "gzip", "zstd" (needs the zstd extra) or None
+    :param max_bytes: rotate after this many bytes of uncompressed NDJSON
+    :param max_span: rotate before a record that would make a file span more than this much log time
+    :param level: the compression level, defaults to 6 for gzip and 3 for zstd, which favour speed over size
+    """
+
+    MANIFEST_FILE = "manifest.json"
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        prefix: str = "logs",
+        compression: Optional[str] = "gzip",
+        max_bytes: Optional[int] = None,
+        max_span: Optional[timedelta] = None,
+        level: Optional[int] = None,
+    ):
+        if compression not in COMPRESSION_EXTENSIONS:
+            raise ValueError(f"Unsupported compression {compression}, use one of {', '.join(str(c) for c in COMPRESSION_EXTENSIONS)}")
+        if compression == "zstd" and zstandard is None:
+            raise ImportError("zstd compression needs zstandard, install it with 'pip install dt[zstd]'")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.prefix = prefix
+        self.compression = compression
+        self.max_bytes = max_bytes
+        self.max_span_ms = int(max_span.total_seconds() * 1000) if max_span is not None else None
+        self.level = level
+        self.records_written = 0
+
+        self.manifest: List[Dict[str, Any]] = []
+        manifest_path = self.directory / self.MANIFEST_FILE
+        if manifest_path.exists():
+            with open(manifest_path, encoding="utf-8") as f:
+                self.manifest = json.load(f)["files"]
+        self.__file: Optional[BinaryIO] = None
+        self.__raw_file: Optional[BinaryIO] = None
+        self.__entry: Optional[Dict[str, Any]] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def write_page(self, page: Dict[str, Any]) -> int:
+        """Writes the records of a raw /logs/export page
+
+        :return: the number of records written
+        """
+        return self.write_records(page.get("results", []))
+
+    def write_records(self, records: List[Dict[str, Any]]) -> int:
+        lines = []
+        lines_size = 0
+        for record in records:
+            line = (json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n").encode("utf-8")
+            timestamp = record.get("timestamp")
+            if self.__entry is not None and self.__must_rotate(len(line) + lines_size, timestamp):
+                self.__write(lines)
+                lines, lines_size = [], 0
+                self.__close_file()
+            if self.__entry is None:
+                self.__open_file()
+            lines.append(line)
+            lines_size += len(line)
+            self.__entry["records"] += 1
+            if timestamp is not None:
+                self.__entry["from"] = timestamp if self.__entry["from"] is None else min(self.__entry["from"], timestamp)
+                self.__entry["to"] = timestamp if self.__entry["to"] is None else max(self.__entry["to"], timestamp)
+        self.__write(lines)
+        self.records_written += len(records)
+        return len(records)
+
+    def files_between(self, time_from: Optional[int] = None, time_to: Optional[int] = None) -> List[Path]:
+        """The files that may hold records between two timestamps, in milliseconds since epoch"""
+        return [
+            self.directory / entry["file"]
+            for entry in self.manifest
+            if entry["from"] is not None
+            and (time_to is None or entry["from"] <= time_to)
+            and (time_from is None or entry["to"] >= time_from)
+        ]
+
+    def close(self):
+        if self.__entry is not None:
+            self.__close_file()
+
+    def __must_rotate(self, pending_bytes: int, timestamp: Optional[int]) -> bool:
+        entry = self.__entry
+        if self.max_bytes is not None and entry["bytes"] + pending_bytes > self.max_bytes:
+            return True
+        if self.max_span_ms is not None and timestamp is not None and entry["from"] is not None:
+            return max(entry["to"], timestamp) - min(entry["from"], timestamp) > self.max_span_ms
+        return False
+
+    def __write(self, lines: List[bytes]):
+        if lines:
+            data = b"".join(lines)
+            self.__file.write(data)
+            self.__entry["bytes"] += len(data)
+
+    def __open_file(self):
+        name = f"{self.prefix}-{len(self.manifest):05d}.ndjson{COMPRESSION_EXTENSIONS[self.compression]}"
+        path = self.directory / name
+        if self.compression == "gzip":
+            self.__raw_file = None
+            self.__file = gzip.open(path, "wb", compresslevel=6 if self.level is None else self.level)
+        elif self.compression == "zstd":
+            self.__raw_file = open(path, "wb")
+            compressor = zstandard.ZstdCompressor(level=3 if self.level is None else self.level)
+            self.__file = compressor.stream_writer(self.__raw_file)
+        else:
+            self.__raw_file = None
+            self.__file = open(path, "wb")
+        self.__entry = {"file": name, "records": 0, "bytes": 0, "from": None, "to": None}
+        self.manifest.append(self.__entry)
+
+    def __close_file(self):
+        self.__file.close()
+        if self.__raw_file is not None:
+            self.__raw_file.close()
+        self.__file, self.__raw_file, self.__entry = None, None, None
+        self.__write_manifest()
+
+    def __write_manifest(self):
+        atomic_write(self.directory / self.MANIFEST_FILE, json.dumps({"files": self.manifest}, indent=2))
+
+
+def export_logs(
+    logs: LogService,
+    sink: NdjsonLogSink,
+    query: Optional[str] = None,
+    time_from: Optional[Union[datetime, str]] = None,
+    time_to: Optional[Union[datetime, str]] = None,
+    sort: Optional[str] = None,
+    page_size: Optional[int] = None,
+) -> int:
+    """Streams the records of a log export into a sink, holding a single page in memory at a time
+
+    The records are written as they were received, no LogRecord is built. The sink is not closed,
+    so several exports can be written into the same archive.
+
+    :return: the number of records written
+    """
+    records = 0
+    for page in logs.export_pages(query, time_from, time_to, sort, page_size):
+        records += sink.write_page(page)
+    return records
@@ -0,0 +1,110 @@
+"""
+Copyright 2021 Dynatrace LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from dynatrace.environment_v2.logs import LogRecord, LogService
+from dynatrace.utils import datetime_to_int64, fingerprint, now_utc, resolution_to_timedelta
+
+
+class LogFollower:
+    """Follows the log records matching a query, like tail -f, emitting every record exactly once.
+
+    Every poll exports the records from the watermark (the newest timestamp seen so far) minus the overlap
+    until now. The overlap catches records that are ingested late with an older timestamp, and the records
+    seen again because of it are dropped using a fingerprint of their content. Identical records (same
+    timestamp and content) are told apart by how often they occur in a poll, so a record logged twice is
+    emitted twice. Fingerprints older than the overlap can't be returned again and are forgotten, and at most
+    max_fingerprints are kept.
+
+    The poll interval halves, down to min_interval, after a poll that returned records, and doubles, up to
+    max_interval, after one that returned nothing.
+
+    :param logs: the log service
+    :param query: the log search query
+    :param time_from: where to start following, defaults to now minus the overlap
+    :param overlap: how far before the watermark each poll starts, records ingested later than that are missed
+    :param min_interval: the shortest time between polls, in seconds
+    :param max_interval: the longest time between polls, in seconds
+    :param max_fingerprints: how many fingerprints of recently seen records are kept at most
+    :param page_size: the page size of the export requests
+    """
+
+    def __init__(
+        self,
+        logs: LogService,
+        query: Optional[str] = None,
+        time_from: Optional[datetime] = None,
+        overlap: Union[str, timedelta] = "1m",
+        min_interval: float = 1.0,
+        max_interval: float = 30.0,
+        max_fingerprints: int = 100000,
+        page_size: Optional[int] = None,
+    ):
+        self.__logs = logs
+        self.query = query
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_fingerprints = max_fingerprints
+        self.page_size = page_size
+        self.interval: float = min_interval
+        self.__overlap = int(resolution_to_timedelta(overlap).total_seconds() * 1000)
+        self.watermark: int = datetime_to_int64(time_from) if time_from is not None else datetime_to_int64(now_utc()) - self.__overlap
+        # Fingerprint -> (timestamp, how many identical records were emitted)
+        self.__fingerprints: "OrderedDict[bytes, Tuple[int, int]]" = OrderedDict()
+
+    def poll(self) -> List[LogRecord]:
+        """Exports the records since the watermark minus the overlap
+
+        :return: the records that were not seen before, oldest first
+        """
+        time_from = self.watermark - self.__overlap
+        new: List[Dict[str, Any]] = []
+        occurrences: Dict[bytes, int] = {}
+        for page in self.__logs.export_pages(self.query, f"{time_from}", None, "timestamp", self.page_size):
+            for record in page.get("results", []):
+                key = fingerprint(record)
+                occurrences[key] = occurrences.get(key, 0) + 1
+                if occurrences[key] <= self.__fingerprints.get(key, (0, 0))[1]:
+                    continue
+                self.__fingerprints[key] = (record.get("timestamp") or 0, occurrences[key])
+                new.append(record)
+
+        new.sort(key=lambda record: record.get("timestamp") or 0)
+        if new:
+            self.watermark = max(self.watermark, new[-1].get("timestamp") or 0)
+            self.interval = max(self.min_interval, self.interval / 2)
+        else:
+            self.interval = min(self.max_interval, self.interval * 2)
+        self.__forget(self.watermark - self.__overlap)
+        return [LogRecord(raw_element=record) for record in new]
+
+    def follow(self, stop: Optional[threading.Event] = None) -> Iterator[LogRecord]:
+        """Polls forever, or until stop is set, yielding the new records as they arrive"""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            for record in self.poll():
+                yield record
+            stop.wait(self.interval)
+
+    def __forget(self, oldest: int):
+        # Fingerprints are inserted roughly in timestamp order, so the old ones are at the front
+        fingerprints = self.__fingerprints
+        while fingerprints and (len(fingerprints) > self.max_fingerprints or next(iter(fingerprints.values()))[0] < oldest):
+            fingerprints.popitem(last=False)
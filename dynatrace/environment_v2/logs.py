@@ -13,21 +13,21 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+from collections import Counter
 from enum import Enum
-from typing import Dict, Any, Union, List
+from typing import Dict, Any, Iterator, Union, List
 
 from requests import Response
 from datetime import datetime
 from typing import Optional, Union, Dict, Any, List
 
-from dynatrace.http_client import HttpClient
+from dynatrace.http_client import HttpClient, HttpError
 from dynatrace.dynatrace_object import DynatraceObject
-from dynatrace.pagination import PaginatedList
+from dynatrace.pagination import PaginatedList, iter_pages
 from dynatrace.utils import timestamp_to_string
 
 
 class LogService:
-    # TODO - Add search and aggregate
     ENDPOINT = "/api/v2/logs"
 
     def __init__(self, http_client: HttpClient):
@@ -48,7 +48,7 @@ class LogService:
         :param time_from: Start of the requested timeframe
         :param time_to: End of the requested timefram
         :param sort: Defines the ordering of log records
-        :return A list of log records
+        :return The log records
         """
         params = {
             "query": query,
@@ -59,6 +59,116 @@ class LogService:
         }
         return PaginatedList(LogRecord, self.__http_client, "/api/v2/logs/export", params, list_item="results")
 
+    def export_pages(
+        self,
+        query: Optional[str] = None,
+        time_from: Optional[Union[datetime, str]] = None,
+        time_to: Optional[Union[datetime, str]] = None,
+        sort: Optional[str] = None,
+        page_size: Optional[int] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Same as export, but yields the raw JSON of each page instead of LogRecord objects.
+        The "results" key of each page holds the log records of that page.
+        """
+        params = {
+            "query": query,
+            "pageSize": page_size,
+            "from": timestamp_to_string(time_from),
+            "to": timestamp_to_string(time_to),
+            "sort": sort,
+        }
+        return iter_pages(self.__http_client, f"{self.ENDPOINT}/export", params)
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        time_from: Optional[Union[datetime, str]] = None,
+        time_to: Optional[Union[datetime, str]] = None,
+        limit: Optional[int] = None,
+        sort: Optional[str] = None,
+    ) -> Iterator["LogRecord"]:
+        """
+        Gets the log records matching the provided criteria, up to the limit.
+        The results are returned by the server in slices, the next one is only fetched once the previous was consumed.
+        :param query: The log search query
+        :param time_from: Start of the requested timeframe
+        :param time_to: End of the requested timeframe
+        :param limit: The maximum number of records to return
+        :param sort: Defines the ordering of log records
+        :return The log records
+        """
+        params = {
+            "query": query,
+            "from": timestamp_to_string(time_from),
+            "to": timestamp_to_string(time_to),
+            "limit": limit,
+            "sort": sort,
+        }
+        while True:
+            response = self.__http_client.make_request(f"{self.ENDPOINT}/search", params=params)
+            json_response = response.json()
+            for element in json_response.get("results", []):
+                yield LogRecord(self.__http_client, response.headers, element)
+            if not json_response.get("nextSliceKey"):
+                return
+            params = {"nextSliceKey": json_response["nextSliceKey"]}
+
+    def aggregate(
+        self,
+        group_by: Union[str, List[str]],
+        query: Optional[str] = None,
+        time_from: Optional[Union[datetime, str]] = None,
+        time_to: Optional[Union[datetime, str]] = None,
+        max_group_values: Optional[int] = None,
+        local_fallback: bool = True,
+    ) -> "LogAggregation":
+        """
+        Counts the log records matching the provided criteria for every value of the group by fields.
+        :param group_by: The fields to group by, e.g. "status" or ["status", "log.source"]
+        :param query: The log search query
+        :param time_from: Start of the requested timeframe
+        :param time_to: End of the requested timeframe
+        :param max_group_values: The maximum number of values returned for each field, the most frequent first
+        :param local_fallback: If the aggregate endpoint is not available (HTTP 404, 405 or 501), count the exported records with aggregate_locally
+        :return The counts of every field
+        """
+        if isinstance(group_by, str):
+            group_by = [group_by]
+        params = {
+            "query": query,
+            "from": timestamp_to_string(time_from),
+            "to": timestamp_to_string(time_to),
+            "groupBy": group_by,
+            "maxGroupValues": max_group_values,
+        }
+        try:
+            response = self.__http_client.make_request(f"{self.ENDPOINT}/aggregate", params=params)
+        except Exception as e:
+            # Only fall back when the endpoint doesn't exist, a bad query or a failing server must not trigger a full export
+            if not local_fallback or not _endpoint_unavailable(e):
+                raise
+            return self.aggregate_locally(group_by, query, time_from, time_to, max_group_values)
+        return LogAggregation(self.__http_client, response.headers, response.json())
+
+    def aggregate_locally(
+        self,
+        group_by: Union[str, List[str]],
+        query: Optional[str] = None,
+        time_from: Optional[Union[datetime, str]] = None,
+        time_to: Optional[Union[datetime, str]] = None,
+        max_group_values: Optional[int] = None,
+        page_size: Optional[int] = None,
+    ) -> "LogAggregation":
+        """
+        Same as aggregate, but counts the records of the export endpoint page by page.
+        Only the counters are kept in memory, so memory grows with the number of distinct values, not of records.
+        :param page_size: Number of records per export page
+        """
+        counter = LogCounter(group_by)
+        for page in self.export_pages(query, time_from, time_to, page_size=page_size):
+            counter.update(page.get("results", []))
+        return counter.result(max_group_values)
+
     def ingest(self, payload: Union[Dict[str, Any], List[Dict[str, Any]]]) -> Response:
         """
         Ingests logs into the Dynatrace log store.
@@ -67,7 +177,8 @@ class LogService:
         """
         headers = {"Content-Type": "application/json; charset=utf-8"}
         return self.__http_client.make_request(f"{self.ENDPOINT}/ingest", params=payload, method="POST", headers=headers)
-    
+
+
 class LogRecord(DynatraceObject):
     def _create_from_raw_data(self, raw_element: Dict[str, Any]):
         self.additional_columns: dict = raw_element.get("additionalColumns")
@@ -76,11 +187,57 @@ class LogRecord(DynatraceObject):
         self.content: str = raw_element.get("content")
         self.status: LogRecordStatus = LogRecordStatus(raw_element.get("status"))
 
+
+def _endpoint_unavailable(error: Exception) -> bool:
+    return isinstance(error, HttpError) and error.status_code in (404, 405, 501)
+
+
+class LogAggregation(DynatraceObject):
+    def _create_from_raw_data(self, raw_element: Dict[str, Any]):
+        self.aggregation_result: Dict[str, Dict[str, int]] = raw_element.get("aggregationResult", {})
+        # True when the records were counted by the client instead of the aggregate endpoint
+        self.local: bool = False
+
+    def counts(self, field: str) -> Dict[str, int]:
+        return self.aggregation_result.get(field, {})
+
+
+class LogCounter:
+    """Counts raw log records by the values of some fields, e.g. to aggregate export pages as they arrive.
+
+    Fields are looked up at the top level of the record first, then in its additionalColumns, where every value of a
+    multi-valued column is counted. Records without the field are not counted for it.
+    """
+
+    def __init__(self, group_by: Union[str, List[str]]):
+        self.group_by: List[str] = [group_by] if isinstance(group_by, str) else list(group_by)
+        self.counters: Dict[str, Counter] = {field: Counter() for field in self.group_by}
+        self.records: int = 0
+
+    def update(self, records: List[Dict[str, Any]]):
+        for record in records:
+            self.records += 1
+            additional_columns = record.get("additionalColumns") or {}
+            for field, counter in self.counters.items():
+                if field in record and not isinstance(record[field], dict):
+                    counter[str(record[field])] += 1
+                else:
+                    for value in additional_columns.get(field) or []:
+                        counter[str(value)] += 1
+
+    def result(self, max_group_values: Optional[int] = None) -> LogAggregation:
+        aggregation_result = {field: dict(counter.most_common(max_group_values)) for field, counter in self.counters.items()}
+        aggregation = LogAggregation(raw_element={"aggregationResult": aggregation_result})
+        aggregation.local = True
+        return aggregation
+
+
 class EventType(Enum):
     K8S = "K8S"
     LOG = "LOG"
     SFM = "SFM"
 
+
 class LogRecordStatus(Enum):
     ERROR = "ERROR"
     INFO = "INFO"
@@ -0,0 +1,187 @@
+"""
+Copyright 2021 Dynatrace LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import bisect
+import json
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Union
+
+from dynatrace.environment_v2.metrics import MetricService, MetricDescriptor
+from dynatrace.utils import atomic_write, int64_to_datetime, datetime_to_int64
+
+
+class MetricCatalog:
+    """A persistent, indexed copy of the metric descriptors of an environment.
+
+    The first load() pages through all descriptors, after that refresh() only asks for the metrics
+    written since the last sync, so warm starts don't download the whole catalog again.
+    Metrics that were deleted in the environment are only dropped by a full load().
+    """
+
+    FIELDS = (
+        "+tags,+dduBillable,+created,+lastWritten,+aggregationTypes,+defaultAggregation,"
+        "+dimensionDefinitions,+transformations,+entityType,+minimumValue,+maximumValue"
+    )
+
+    def __init__(self, metrics: MetricService, path: Union[str, Path], page_size: int = 500):
+        self.__metrics = metrics
+        self.path = Path(path)
+        self.page_size = page_size
+        self.synced_at: Optional[datetime] = None
+        self.__lock = threading.RLock()
+        self.__raw: Dict[str, Dict[str, Any]] = {}
+        self.__descriptors: Dict[str, MetricDescriptor] = {}
+        self.__sorted_ids: List[str] = []
+        self.__by_tag: Dict[str, Set[str]] = defaultdict(set)
+        self.__by_unit: Dict[str, Set[str]] = defaultdict(set)
+        self.__by_dimension: Dict[str, Set[str]] = defaultdict(set)
+
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                stored = json.load(f)
+            self.synced_at = int64_to_datetime(stored.get("syncedAt"))
+            self.__replace(stored.get("metrics", {}))
+
+    def load(self) -> int:
+        """Downloads all metric descriptors, replacing the cached ones
+
+        :return: the number of metrics in the catalog
+        """
+        started = datetime.now(timezone.utc)
+        raw = {m.metric_id: m.json() for m in self.__metrics.list(fields=self.FIELDS, page_size=self.page_size)}
+        with self.__lock:
+            self.__replace(raw)
+            self.synced_at = started
+            self.save()
+        return len(self.__raw)
+
+    def refresh(self) -> int:
+        """Downloads the descriptors of the metrics written since the last sync, or all of them on the first call
+
+        :return: the number of metrics added or updated
+        """
+        if self.synced_at is None:
+            return self.load()
+        started = datetime.now(timezone.utc)
+        changed = [m.json() for m in self.__metrics.list(fields=self.FIELDS, written_since=self.synced_at, page_size=self.page_size)]
+        with self.__lock:
+            for raw in changed:
+                self.__upsert(raw)
+            self.synced_at = started
+            self.save()
+        return len(changed)
+
+    def save(self):
+        with self.__lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write(self.path, json.dumps({"syncedAt": datetime_to_int64(self.synced_at), "metrics": self.__raw}))
+
+    def get(self, metric_id: str, fetch_missing: bool = False) -> Optional[MetricDescriptor]:
+        """Gets a metric descriptor from the catalog
+
+        :param metric_id: the metric key
+        :param fetch_missing: if true, a metric that is not in the catalog is fetched from the API and added to it
+        """
+        with self.__lock:
+            if metric_id in self.__raw:
+                return self.__descriptor(metric_id)
+        if not fetch_missing:
+            return None
+        raw = self.__metrics.get(metric_id).json()
+        with self.__lock:
+            self.__upsert(raw)
+            return self.__descriptor(raw["metricId"])
+
+    def by_prefix(self, prefix: str) -> List[MetricDescriptor]:
+        """All metrics whose key starts with prefix, e.g. "builtin:host.cpu." """
+        with self.__lock:
+            start = bisect.bisect_left(self.__sorted_ids, prefix)
+            end = start
+            while end < len(self.__sorted_ids) and self.__sorted_ids[end].startswith(prefix):
+                end += 1
+            return [self.__descriptor(metric_id) for metric_id in self.__sorted_ids[start:end]]
+
+    def by_tag(self, tag: str) -> List[MetricDescriptor]:
+        with self.__lock:
+            return [self.__descriptor(metric_id) for metric_id in sorted(self.__by_tag.get(tag, ()))]
+
+    def by_unit(self, unit: str) -> List[MetricDescriptor]:
+        with self.__lock:
+            return [self.__descriptor(metric_id) for metric_id in sorted(self.__by_unit.get(unit, ()))]
+
+    def by_dimension(self, dimension_key: str) -> List[MetricDescriptor]:
+        with self.__lock:
+            return [self.__descriptor(metric_id) for metric_id in sorted(self.__by_dimension.get(dimension_key, ()))]
+
+    def __len__(self):
+        return len(self.__raw)
+
+    def __contains__(self, metric_id: str):
+        return metric_id in self.__raw
+
+    def __iter__(self):
+        with self.__lock:
+            metric_ids = list(self.__sorted_ids)
+        return (self.__descriptor(metric_id) for metric_id in metric_ids)
+
+    def __descriptor(self, metric_id: str) -> MetricDescriptor:
+        descriptor = self.__descriptors.get(metric_id)
+        if descriptor is None:
+            descriptor = MetricDescriptor(raw_element=self.__raw[metric_id])
+            self.__descriptors[metric_id] = descriptor
+        return descriptor
+
+    def __replace(self, raw: Dict[str, Dict[str, Any]]):
+        self.__raw = {}
+        self.__descriptors = {}
+        self.__sorted_ids = []
+        self.__by_tag.clear()
+        self.__by_unit.clear()
+        self.__by_dimension.clear()
+        for element in raw.values():
+            self.__index(element)
+        self.__sorted_ids = sorted(self.__raw)
+
+    def __upsert(self, raw: Dict[str, Any]):
+        metric_id = raw["metricId"]
+        if metric_id in self.__raw:
+            self.__unindex(self.__raw[metric_id])
+        else:
+            bisect.insort(self.__sorted_ids, metric_id)
+        self.__descriptors.pop(metric_id, None)
+        self.__index(raw)
+
+    def __index(self, raw: Dict[str, Any]):
+        metric_id = raw["metricId"]
+        self.__raw[metric_id] = raw
+        for tag in raw.get("tags") or []:
+            self.__by_tag[tag].add(metric_id)
+        if raw.get("unit"):
+            self.__by_unit[raw["unit"]].add(metric_id)
+        for dimension in raw.get("dimensionDefinitions") or []:
+            self.__by_dimension[dimension.get("key")].add(metric_id)
+
+    def __unindex(self, raw: Dict[str, Any]):
+        metric_id = raw["metricId"]
+        for tag in raw.get("tags") or []:
+            self.__by_tag[tag].discard(metric_id)
+        if raw.get("unit"):
+            self.__by_unit[raw["unit"]].discard(metric_id)
+        for dimension in raw.get("dimensionDefinitions") or []:
+            self.__by_dimension[dimension.get("key")].discard(metric_id)
@@ -0,0 +1,229 @@
+"""
+Copyright 2021 Dynatrace LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import csv
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, TextIO, Union
+
+from dynatrace.environment_v2.metrics import MetricService
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+class MetricExportSink(ABC):
+    """Base class for the metric export sinks, every page of query results is written as one batch of rows.
+
+    Rows have the columns metric_id, one column per dimension key, timestamp (milliseconds since epoch) and value.
+    The dimension keys are either given, or the union of the dimension keys of the first page written. Given
+    dimension keys are the only ones exported, other dimensions are dropped. Inferred dimension keys can't change
+    once the file was started, so a later page with a new dimension key raises a ValueError.
+    Series that don't have one of the dimensions get an empty value. Dimension keys named like one of the other
+    columns get a "dimension." prefix, e.g. a "value" dimension is exported as "dimension.value".
+    """
+
+    def __init__(self, dimension_keys: Optional[Sequence[str]] = None):
+        self.dimension_keys: Optional[List[str]] = list(dimension_keys) if dimension_keys is not None else None
+        self.__inferred = dimension_keys is None
+        self.rows_written = 0
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def write_page(self, page: Dict[str, Any]) -> int:
+        """Writes the series of a raw /metrics/query page
+
+        :return: the number of rows written
+        """
+        collections = page.get("result", [])
+        if self.__inferred:
+            keys = {key for collection in collections for series in collection.get("data", []) for key in series.get("dimensionMap") or {}}
+            if self.dimension_keys is None:
+                if not any(collection.get("data") for collection in collections):
+                    return 0
+                self.dimension_keys = sorted(keys)
+                self._open()
+            elif not keys.issubset(self.dimension_keys):
+                raise ValueError(
+                    f"The dimensions {', '.join(sorted(keys - set(self.dimension_keys)))} were not in the first page, "
+                    f"pass all the dimension keys to the sink to export them"
+                )
+
+        columns = _to_columns(collections, self.dimension_keys)
+        rows = len(columns["timestamp"])
+        if rows:
+            self._write_columns(columns)
+            self.rows_written += rows
+        return rows
+
+    def close(self):
+        """Finishes the file, closing it twice does nothing"""
+        if not self.closed:
+            self.closed = True
+            self._close()
+
+    def _column_names(self) -> List[str]:
+        return ["metric_id", *(_dimension_column(key) for key in self.dimension_keys), "timestamp", "value"]
+
+    @abstractmethod
+    def _close(self):
+        pass
+
+    @abstractmethod
+    def _open(self):
+        pass
+
+    @abstractmethod
+    def _write_columns(self, columns: Dict[str, list]):
+        pass
+
+
+class CsvMetricSink(MetricExportSink):
+    def __init__(self, file: Union[str, Path, TextIO], dimension_keys: Optional[Sequence[str]] = None):
+        super().__init__(dimension_keys)
+        self.__owns_file = isinstance(file, (str, Path))
+        self.__file = open(file, "w", newline="", encoding="utf-8") if self.__owns_file else file
+        self.__writer = csv.writer(self.__file)
+        if self.dimension_keys is not None:
+            self._open()
+
+    def _open(self):
+        self.__writer.writerow(self._column_names())
+
+    def _write_columns(self, columns: Dict[str, list]):
+        self.__writer.writerows(zip(*(columns[name] for name in self._column_names())))
+
+    def _close(self):
+        if self.dimension_keys is None:
+            # Nothing was written, the header is still written
+            self.dimension_keys = []
+            self._open()
+        if self.__owns_file:
+            self.__file.close()
+        else:
+            self.__file.flush()
+
+
+class _ArrowMetricSink(MetricExportSink):
+    def __init__(self, path: Union[str, Path], dimension_keys: Optional[Sequence[str]] = None):
+        if pyarrow is None:
+            raise ImportError(f"{self.__class__.__name__} needs pyarrow, install it with 'pip install dt[arrow]'")
+        super().__init__(dimension_keys)
+        self.path = Path(path)
+        self._writer = None
+        self.schema = None
+        if self.dimension_keys is not None:
+            self._open()
+
+    def _open(self):
+        fields = [pyarrow.field("metric_id", pyarrow.string(), nullable=False)]
+        fields.extend(pyarrow.field(_dimension_column(key), pyarrow.string()) for key in self.dimension_keys)
+        fields.append(pyarrow.field("timestamp", pyarrow.timestamp("ms", tz="UTC"), nullable=False))
+        fields.append(pyarrow.field("value", pyarrow.float64()))
+        self.schema = pyarrow.schema(fields)
+        self._writer = self._new_writer()
+
+    @abstractmethod
+    def _new_writer(self):
+        pass
+
+    def _write_columns(self, columns: Dict[str, list]):
+        self._writer.write_table(pyarrow.Table.from_pydict(columns, schema=self.schema))
+
+    def _close(self):
+        if self._writer is None:
+            # Nothing was written, an empty file with the columns known so far is still created
+            if self.dimension_keys is None:
+                self.dimension_keys = []
+            self._open()
+        self._writer.close()
+
+
+class ParquetMetricSink(_ArrowMetricSink):
+    """Writes a Parquet file, with one row group per page of results"""
+
+    def __init__(self, path: Union[str, Path], dimension_keys: Optional[Sequence[str]] = None, compression: str = "snappy"):
+        self.compression = compression
+        super().__init__(path, dimension_keys)
+
+    def _new_writer(self):
+        return pyarrow.parquet.ParquetWriter(str(self.path), self.schema, compression=self.compression)
+
+
+class ArrowIpcMetricSink(_ArrowMetricSink):
+    """Writes an Arrow IPC (Feather v2) file, with one record batch per page of results"""
+
+    def _new_writer(self):
+        return pyarrow.ipc.new_file(str(self.path), self.schema)
+
+
+def export_metrics(
+    metrics: MetricService,
+    sink: MetricExportSink,
+    metric_selector: str,
+    resolution: str = None,
+    time_from: Optional[Union[datetime, str]] = None,
+    time_to: Optional[Union[datetime, str]] = None,
+    entity_selector: Optional[str] = None,
+    mz_selector: Optional[str] = None,
+) -> int:
+    """Streams the results of a metrics query into a sink, holding a single page in memory at a time
+
+    The sink is not closed, so several queries can be exported into the same file. They must have the same
+    dimension keys, unless they were given to the sink. If the export fails, the sink is closed so that the rows
+    written so far still form a valid file.
+
+    :return: the number of rows written
+    """
+    rows = 0
+    try:
+        for page in metrics.query_pages(metric_selector, resolution, time_from, time_to, entity_selector, mz_selector):
+            rows += sink.write_page(page)
+    except Exception:
+        sink.close()
+        raise
+    return rows
+
+
+def _to_columns(collections: List[Dict[str, Any]], dimension_keys: List[str]) -> Dict[str, list]:
+    columns: Dict[str, list] = {"metric_id": [], "timestamp": [], "value": []}
+    dimension_columns = [columns.setdefault(_dimension_column(key), []) for key in dimension_keys]
+    for collection in collections:
+        metric_id = collection.get("metricId")
+        for series in collection.get("data", []):
+            timestamps = series.get("timestamps", [])
+            dimension_map = series.get("dimensionMap") or {}
+            count = len(timestamps)
+            columns["metric_id"].extend([metric_id] * count)
+            for key, column in zip(dimension_keys, dimension_columns):
+                column.extend([dimension_map.get(key)] * count)
+            columns["timestamp"].extend(timestamps)
+            columns["value"].extend(series.get("values", []))
+    return columns
+
+
+def _dimension_column(dimension_key: str) -> str:
+    return f"dimension.{dimension_key}" if dimension_key in ("metric_id", "timestamp", "value") else dimension_key
@@ -0,0 +1,217 @@
+"""
+Copyright 2021 Dynatrace LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import math
+import re
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Union
+
+MAX_LINE_LENGTH = 50000
+MAX_DIMENSIONS = 50
+MAX_METRIC_KEY_LENGTH = 250
+MAX_DIMENSION_KEY_LENGTH = 100
+MAX_DIMENSION_VALUE_LENGTH = 250
+
+# Longest possible " gauge,min=...,max=...,sum=...,count=... <timestamp>" suffix with repr() floats
+_MAX_PAYLOAD_LENGTH = 160
+
+_METRIC_KEY_FIRST_SECTION_START = re.compile(r"^[^a-zA-Z_]+")
+_METRIC_KEY_INVALID = re.compile(r"[^a-zA-Z0-9_\-]+")
+_DIMENSION_KEY_SECTION_START = re.compile(r"^[^a-z_]+")
+_DIMENSION_KEY_INVALID = re.compile(r"[^a-z0-9_\-:]+")
+_CONTROL_CHARACTERS = re.compile(r"[\x00-\x1f\x7f]+")
+_DIMENSION_VALUE_ESCAPE = re.compile(r'([\\,= "])')
+
+Number = Union[int, float]
+Timestamp = Optional[Union[datetime, int]]
+
+
+@lru_cache(maxsize=4096)
+def normalize_metric_key(metric_key: str) -> str:
+    """Turns a metric key into a valid one, replacing invalid characters with underscores
+
+    Raises a ValueError if nothing valid is left, e.g. for an empty key.
+    """
+    sections = []
+    for i, section in enumerate(metric_key[:MAX_METRIC_KEY_LENGTH].split(".")):
+        if i == 0:
+            section = _METRIC_KEY_FIRST_SECTION_START.sub("", section)
+        section = _METRIC_KEY_INVALID.sub("_", section)
+        if section:
+            sections.append(section)
+        elif i == 0:
+            raise ValueError(f"Metric key '{metric_key}' must start with a letter or an underscore")
+    if not sections:
+        raise ValueError(f"Metric key '{metric_key}' is not valid")
+    return ".".join(sections)
+
+
+@lru_cache(maxsize=4096)
+def normalize_dimension_key(dimension_key: str) -> Optional[str]:
+    """Turns a dimension key into a valid one: lower case, invalid characters replaced with underscores
+
+    :return: the normalized key, or None if nothing valid is left
+    """
+    sections = []
+    for section in dimension_key[:MAX_DIMENSION_KEY_LENGTH].lower().split("."):
+        section = _DIMENSION_KEY_INVALID.sub("_", _DIMENSION_KEY_SECTION_START.sub("", section))
+        if section:
+            sections.append(section)
+    return ".".join(sections) or None
+
+
+@lru_cache(maxsize=16384)
+def escape_dimension_value(value: str) -> str:
+    """Removes control characters and escapes the characters that have a meaning in the line protocol"""
+    value = _CONTROL_CHARACTERS.sub("", value)[:MAX_DIMENSION_VALUE_LENGTH]
+    return _DIMENSION_VALUE_ESCAPE.sub(r"\\\1", value)
+
+
+def format_number(value: Number) -> str:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"Metric values must be numbers, got {value!r}")
+    if isinstance(value, float):
+        if not math.isfinite(value):
+            raise ValueError(f"Metric values must be finite, got {value!r}")
+        return repr(value)
+    return str(value)
+
+
+def format_timestamp(timestamp: Timestamp) -> str:
+    if timestamp is None:
+        return ""
+    if isinstance(timestamp, datetime):
+        # Naive datetimes are taken as UTC, aware ones keep their offset
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        return f" {int(round(timestamp.timestamp() * 1000))}"
+    if isinstance(timestamp, bool) or not isinstance(timestamp, int) or timestamp < 0:
+        raise ValueError(f"Timestamps must be datetimes or milliseconds since epoch, got {timestamp!r}")
+    return f" {timestamp}"
+
+
+class MetricLineEncoder:
+    """Encodes data points into lines of the metric ingestion protocol, ready for MetricService.ingest
+
+    Metric and dimension keys are normalized, dimension values escaped, and lines that would be rejected
+    by the API (non finite values, inconsistent summaries, too many dimensions, too long) raise a ValueError.
+
+    :param prefix: prepended to every metric key, e.g. "mycompany.myservice"
+    :param default_dimensions: added to every line, dimensions given per line take precedence
+    """
+
+    def __init__(self, prefix: Optional[str] = None, default_dimensions: Optional[Dict[str, str]] = None):
+        self.prefix = prefix
+        self.default_dimensions = dict(default_dimensions or {})
+        self.__prefixes: Dict[tuple, str] = {}
+
+    def gauge(self, metric_key: str, value: Number, dimensions: Optional[Dict[str, str]] = None, timestamp: Timestamp = None) -> str:
+        return self.__check(f"{self.line_prefix(metric_key, dimensions)} gauge,{format_number(value)}{format_timestamp(timestamp)}")
+
+    def count(self, metric_key: str, delta: Number, dimensions: Optional[Dict[str, str]] = None, timestamp: Timestamp = None) -> str:
+        return self.__check(f"{self.line_prefix(metric_key, dimensions)} count,delta={format_number(delta)}{format_timestamp(timestamp)}")
+
+    def summary(
+        self,
+        metric_key: str,
+        min: Number,
+        max: Number,
+        sum: Number,
+        count: int,
+        dimensions: Optional[Dict[str, str]] = None,
+        timestamp: Timestamp = None,
+    ) -> str:
+        """A gauge summarizing several observations, e.g. the ones made during the last minute"""
+        if isinstance(count, bool) or not isinstance(count, int) or count < 1:
+            raise ValueError(f"Summary count must be a positive integer, got {count!r}")
+        if min > max:
+            raise ValueError(f"Summary min {min} is greater than max {max}")
+        if not (min * count <= sum <= max * count) and not math.isclose(sum, min * count) and not math.isclose(sum, max * count):
+            raise ValueError(f"Summary sum {sum} is not possible for {count} values between {min} and {max}")
+        payload = f"gauge,min={format_number(min)},max={format_number(max)},sum={format_number(sum)},count={count}"
+        return self.__check(f"{self.line_prefix(metric_key, dimensions)} {payload}{format_timestamp(timestamp)}")
+
+    def gauges(
+        self,
+        metric_key: str,
+        values: Sequence[Number],
+        timestamps: Optional[Sequence[Timestamp]] = None,
+        dimensions: Optional[Dict[str, str]] = None,
+    ) -> List[str]:
+        """Encodes many gauge values of a single series at once, the metric key and dimensions are only encoded once"""
+        return self.__many(metric_key, "gauge,", values, timestamps, dimensions)
+
+    def counts(
+        self,
+        metric_key: str,
+        deltas: Sequence[Number],
+        timestamps: Optional[Sequence[Timestamp]] = None,
+        dimensions: Optional[Dict[str, str]] = None,
+    ) -> List[str]:
+        """Encodes many count deltas of a single series at once, the metric key and dimensions are only encoded once"""
+        return self.__many(metric_key, "count,delta=", deltas, timestamps, dimensions)
+
+    def line_prefix(self, metric_key: str, dimensions: Optional[Dict[str, str]] = None) -> str:
+        """The metric key and dimensions part of a line, cached per series"""
+        cache_key = (metric_key, tuple(dimensions.items()) if dimensions else ())
+        prefix = self.__prefixes.get(cache_key)
+        if prefix is None:
+            prefix = self.__build_prefix(metric_key, dimensions)
+            if len(self.__prefixes) >= 10000:
+                self.__prefixes.clear()
+            self.__prefixes[cache_key] = prefix
+        return prefix
+
+    def __build_prefix(self, metric_key: str, dimensions: Optional[Dict[str, str]]) -> str:
+        key = normalize_metric_key(f"{self.prefix}.{metric_key}" if self.prefix else metric_key)
+
+        merged: Dict[str, str] = {}
+        for source in (self.default_dimensions, dimensions or {}):
+            for dimension_key, value in source.items():
+                normalized = normalize_dimension_key(dimension_key)
+                if normalized is None or value is None:
+                    continue
+                escaped = escape_dimension_value(f"{value}")
+                if escaped:
+                    merged[normalized] = escaped
+                else:
+                    merged.pop(normalized, None)
+
+        if len(merged) > MAX_DIMENSIONS:
+            raise ValueError(f"A line can have at most {MAX_DIMENSIONS} dimensions, got {len(merged)} for '{key}'")
+        return "".join([key, *(f",{k}={v}" for k, v in merged.items())])
+
+    def __many(self, metric_key: str, payload: str, values: Sequence[Number], timestamps: Optional[Sequence[Timestamp]], dimensions: Optional[Dict[str, str]]) -> List[str]:
+        prefix = f"{self.line_prefix(metric_key, dimensions)} {payload}"
+        if len(prefix) + _MAX_PAYLOAD_LENGTH > MAX_LINE_LENGTH:
+            # Only series with very long dimensions can get close to the limit, those are checked line by line
+            return [self.__check(line) for line in self.__many_unchecked(prefix, values, timestamps)]
+        return self.__many_unchecked(prefix, values, timestamps)
+
+    @staticmethod
+    def __many_unchecked(prefix: str, values: Sequence[Number], timestamps: Optional[Sequence[Timestamp]]) -> List[str]:
+        if timestamps is None:
+            return [f"{prefix}{format_number(value)}" for value in values]
+        if len(timestamps) != len(values):
+            raise ValueError(f"Got {len(values)} values but {len(timestamps)} timestamps")
+        return [f"{prefix}{format_number(value)}{format_timestamp(timestamp)}" for value, timestamp in zip(values, timestamps)]
+
+    @staticmethod
+    def __check(line: str) -> str:
+        if len(line) > MAX_LINE_LENGTH:
+            raise ValueError(f"Line is {len(line)} characters long, the maximum is {MAX_LINE_LENGTH}")
+        return line
@@ -0,0 +1,168 @@
+"""
+Copyright 2021 Dynatrace LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Union
+
+from dynatrace.environment_v2.metrics import MetricService, MetricSeriesCollection, _split_selectors
+from dynatrace.utils import timestamp_to_string, parallel_map
+
+
+class MetricQueryFuture:
+    def __init__(self, multiplexer: "MetricQueryMultiplexer", metric_selector: str):
+        self.metric_selector = metric_selector
+        self.__multiplexer = multiplexer
+        self.__future = Future()
+
+    def done(self) -> bool:
+        return self.__future.done()
+
+    def result(self, timeout: Optional[float] = None) -> MetricSeriesCollection:
+        """Returns the result of the query, sending all queries pending in the multiplexer if it was not sent yet"""
+        if not self.__future.done():
+            self.__multiplexer.flush()
+        return self.__future.result(timeout)
+
+    def _set_result(self, result: MetricSeriesCollection):
+        self.__future.set_result(result)
+
+    def _set_exception(self, exception: Exception):
+        self.__future.set_exception(exception)
+
+
+class MetricQueryMultiplexer:
+    """Merges metric queries that share their time parameters into as few /metrics/query requests as possible.
+
+    Queries are collected with submit(), from one or many threads, and sent when flush() is called,
+    when the result of any of them is requested or when leaving the context manager.
+    Queries with the same resolution, timeframe, entity selector and management zone selector are sent
+    together as a comma separated metric selector, respecting max_selectors and max_selector_length per request.
+    If a merged request fails, its selectors are retried one by one so an invalid selector only fails its own query.
+    """
+
+    # The metrics query endpoint accepts up to 10 metric selectors in a single request
+    MAX_SELECTORS = 10
+    # Keeps the request line well below common URL length limits
+    MAX_SELECTOR_LENGTH = 4000
+
+    def __init__(
+        self,
+        metrics: MetricService,
+        max_selectors: int = MAX_SELECTORS,
+        max_selector_length: int = MAX_SELECTOR_LENGTH,
+        workers: int = 4,
+    ):
+        self.__metrics = metrics
+        self.max_selectors = max_selectors
+        self.max_selector_length = max_selector_length
+        self.workers = workers
+        self.requests_sent = 0
+        self.__lock = threading.Lock()
+        self.__pending: Dict[Tuple, "OrderedDict[str, List[MetricQueryFuture]]"] = OrderedDict()
+
+    def __enter__(self) -> "MetricQueryMultiplexer":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.flush()
+
+    def submit(
+        self,
+        metric_selector: str,
+        resolution: str = None,
+        time_from: Optional[Union[datetime, str]] = None,
+        time_to: Optional[Union[datetime, str]] = None,
+        entity_selector: Optional[str] = None,
+        mz_selector: Optional[str] = None,
+    ) -> MetricQueryFuture:
+        """Queues a query, the parameters are the same as MetricService.query
+
+        The metric selector must select a single metric, commas are only allowed inside transformations.
+
+        :return: a future, its result() is the MetricSeriesCollection of this selector
+        """
+        if len(_split_selectors(metric_selector)) > 1:
+            raise ValueError(f"'{metric_selector}' selects several metrics, submit each of them separately")
+        key = (resolution, timestamp_to_string(time_from), timestamp_to_string(time_to), entity_selector, mz_selector)
+        future = MetricQueryFuture(self, metric_selector)
+        with self.__lock:
+            self.__pending.setdefault(key, OrderedDict()).setdefault(metric_selector, []).append(future)
+        return future
+
+    def flush(self) -> int:
+        """Sends all pending queries
+
+        :return: the number of requests that were made
+        """
+        with self.__lock:
+            pending, self.__pending = self.__pending, OrderedDict()
+
+        batches = [(key, batch) for key, selectors in pending.items() for batch in self.__pack(selectors)]
+        requests = sum(parallel_map(lambda b: self.__execute(b[0], b[1]), batches, self.workers)) if batches else 0
+        with self.__lock:
+            self.requests_sent += requests
+        return requests
+
+    def __pack(self, selectors: "OrderedDict[str, List[MetricQueryFuture]]") -> List["OrderedDict[str, List[MetricQueryFuture]]"]:
+        batches = []
+        batch, length = OrderedDict(), 0
+        for selector, futures in selectors.items():
+            added_length = len(selector) + (1 if batch else 0)
+            if batch and (len(batch) >= self.max_selectors or length + added_length > self.max_selector_length):
+                batches.append(batch)
+                batch, added_length = OrderedDict(), len(selector)
+                length = 0
+            batch[selector] = futures
+            length += added_length
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def __execute(self, key: Tuple, batch: "OrderedDict[str, List[MetricQueryFuture]]") -> int:
+        selectors = list(batch)
+        try:
+            results = self.__query(key, selectors)
+        except Exception as e:
+            if len(selectors) == 1:
+                for future in batch[selectors[0]]:
+                    future._set_exception(e)
+                return 1
+            return 1 + sum(self.__execute(key, OrderedDict([(selector, futures)])) for selector, futures in batch.items())
+
+        for selector, futures in batch.items():
+            for future in futures:
+                future._set_result(results[selector])
+        return 1
+
+    def __query(self, key: Tuple, selectors: List[str]) -> Dict[str, MetricSeriesCollection]:
+        resolution, time_from, time_to, entity_selector, mz_selector = key
+        # The API answers with one collection per selector, in request order. Their metricId is the normalized
+        # selector, which can't be matched back reliably, so the results are routed by position.
+        collections: List[dict] = []
+        for page in self.__metrics.query_pages(",".join(selectors), resolution, time_from, time_to, entity_selector, mz_selector):
+            for index, raw in enumerate(page.get("result", [])):
+                if index == 0 and collections and collections[-1].get("metricId") == raw.get("metricId"):
+                    # Series of the same metric can be split across pages, they are merged back into one collection
+                    collections[-1]["data"].extend(raw.get("data", []))
+                else:
+                    collections.append(dict(raw, data=list(raw.get("data", []))))
+
+        if len(collections) != len(selectors):
+            raise Exception(f"Expected {len(selectors)} results for metric selectors {selectors}, got {len(collections)}")
+        return {selector: MetricSeriesCollection(raw_element=raw) for selector, raw in zip(selectors, collections)}
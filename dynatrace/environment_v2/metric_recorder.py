@@ -0,0 +1,170 @@
+"""
+Copyright 2021 Dynatrace LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from dynatrace.environment_v2.metric_line_protocol import MetricLineEncoder, Number, format_number
+from dynatrace.environment_v2.metrics import MetricService
+
+SeriesKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class MetricRecorder:
+    """Aggregates observations locally and ingests one line per series and flush interval.
+
+    Gauge observations of a series are folded into a min, max, sum and count summary, and counter increments
+    are added up into a single delta, so thousands of observations per second become one line per series.
+    flush() sends what was recorded since the previous flush, either when called or every flush_interval
+    seconds from a background thread started by start(). Lines that could not be ingested are folded back
+    into the aggregates and sent with the next flush.
+
+    :param metrics: the metric service used to ingest
+    :param encoder: encodes the lines, its prefix and default dimensions apply to every series
+    :param flush_interval: seconds between flushes of the background thread
+    :param max_lines_per_request: lines are ingested in chunks of this size
+    """
+
+    def __init__(
+        self,
+        metrics: MetricService,
+        encoder: Optional[MetricLineEncoder] = None,
+        flush_interval: float = 60,
+        max_lines_per_request: int = 1000,
+    ):
+        self.__metrics = metrics
+        self.encoder = encoder or MetricLineEncoder()
+        self.flush_interval = flush_interval
+        self.max_lines_per_request = max_lines_per_request
+        self.last_error: Optional[Exception] = None
+        self.__lock = threading.Lock()
+        self.__flush_lock = threading.Lock()
+        self.__gauges: Dict[SeriesKey, List[Number]] = {}
+        self.__counters: Dict[SeriesKey, Number] = {}
+        self.__stop = threading.Event()
+        self.__thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "MetricRecorder":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def gauge(self, metric_key: str, value: Number, dimensions: Optional[Dict[str, str]] = None):
+        """Records an observation of a gauge, e.g. a response time"""
+        format_number(value)
+        key = self.__series_key(metric_key, dimensions)
+        with self.__lock:
+            self.__fold_gauge(key, [value, value, value, 1])
+
+    def count(self, metric_key: str, delta: Number = 1, dimensions: Optional[Dict[str, str]] = None):
+        """Records an increment of a counter, e.g. a processed request"""
+        format_number(delta)
+        key = self.__series_key(metric_key, dimensions)
+        with self.__lock:
+            self.__counters[key] = self.__counters.get(key, 0) + delta
+
+    def flush(self) -> int:
+        """Ingests the aggregates recorded since the last flush
+
+        :return: the number of lines ingested
+        """
+        with self.__flush_lock:
+            with self.__lock:
+                gauges, self.__gauges = self.__gauges, {}
+                counters, self.__counters = self.__counters, {}
+            timestamp = datetime.now(timezone.utc)
+
+            entries = [("gauge", key, summary) for key, summary in gauges.items()] + [("count", key, delta) for key, delta in counters.items()]
+            encoded = []
+            for kind, key, value in entries:
+                try:
+                    encoded.append(((kind, key, value), self.__encode(kind, key, value, timestamp)))
+                except ValueError as e:
+                    # e.g. a sum that overflowed, it would fail again on every flush so it is dropped
+                    self.last_error = e
+                    logging.getLogger(__name__).warning(f"Dropping the aggregate of {key[0]}: {e}")
+
+            sent = 0
+            for start in range(0, len(encoded), self.max_lines_per_request):
+                lines = [line for _, line in encoded[start : start + self.max_lines_per_request]]
+                try:
+                    self.__metrics.ingest(lines)
+                except Exception as e:
+                    self.last_error = e
+                    # Only the aggregates that could be encoded are kept for the next flush
+                    self.__restore([entry for entry, _ in encoded[start:]])
+                    raise
+                sent += len(lines)
+            return sent
+
+    def start(self):
+        """Starts flushing every flush_interval seconds in a background thread"""
+        if self.__thread is not None:
+            return
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=self.__run, name="MetricRecorder", daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """Stops the background thread and flushes what is left"""
+        if self.__thread is not None:
+            self.__stop.set()
+            self.__thread.join()
+            self.__thread = None
+        self.flush()
+
+    def __run(self):
+        while not self.__stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                logging.getLogger(__name__).exception("Could not ingest metrics, they will be retried with the next flush")
+
+    def __series_key(self, metric_key: str, dimensions: Optional[Dict[str, str]]) -> SeriesKey:
+        # Encoding the line prefix here validates the key and dimensions when recording, not when flushing
+        self.encoder.line_prefix(metric_key, dimensions)
+        return metric_key, tuple(sorted((dimensions or {}).items()))
+
+    def __fold_gauge(self, key: SeriesKey, summary: List[Number]):
+        current = self.__gauges.get(key)
+        if current is None:
+            self.__gauges[key] = list(summary)
+        else:
+            current[0] = min(current[0], summary[0])
+            current[1] = max(current[1], summary[1])
+            current[2] += summary[2]
+            current[3] += summary[3]
+
+    def __restore(self, entries: List[Tuple[str, SeriesKey, object]]):
+        with self.__lock:
+            for kind, key, value in entries:
+                if kind == "gauge":
+                    self.__fold_gauge(key, value)
+                else:
+                    self.__counters[key] = self.__counters.get(key, 0) + value
+
+    def __encode(self, kind: str, key: SeriesKey, value, timestamp: datetime) -> str:
+        metric_key, dimensions = key
+        if kind == "count":
+            return self.encoder.count(metric_key, value, dict(dimensions), timestamp)
+        minimum, maximum, total, count = value
+        if count == 1:
+            return self.encoder.gauge(metric_key, total, dict(dimensions), timestamp)
+        return self.encoder.summary(metric_key, minimum, maximum, total, count, dict(dimensions), timestamp)
@@ -0,0 +1,184 @@
+"""
+Copyright 2021 Dynatrace LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import math
+import re
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from dynatrace.environment_v2.metrics import MetricSeries, MetricSeriesCollection, resolution_to_timedelta
+from dynatrace.utils import int64_to_datetime
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+AGGREGATIONS = ("min", "max", "sum", "count", "avg", "median", "percentile(N)")
+
+
+class RollupSeries:
+    def __init__(self, dimension_map: Dict[str, Any], timestamps: List[int], values: Dict[str, List[Optional[float]]]):
+        self.dimension_map: Dict[str, Any] = dimension_map
+        self.timestamps: List[datetime] = [int64_to_datetime(timestamp) for timestamp in timestamps]
+        self.values: Dict[str, List[Optional[float]]] = values
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(dimension_map={self.dimension_map}, points={len(self.timestamps)}, aggregations={list(self.values)})"
+
+
+def rollup(
+    series: Union[MetricSeriesCollection, Iterable[MetricSeries]],
+    resolution: Union[str, timedelta],
+    aggregations: Sequence[str] = ("avg",),
+    split_by: Optional[Sequence[str]] = None,
+) -> List[RollupSeries]:
+    """Downsamples metric series locally, e.g. hourly min, max and p95 out of a query made at 1 minute resolution.
+
+    Buckets are aligned to the epoch in UTC, so "1d" buckets start at midnight UTC, and each data point goes into
+    the bucket that contains its timestamp. Every bucket between the first and the last one is returned:
+    None values are ignored, and a bucket without any value is None (0 for count) instead of being dropped.
+    Uses NumPy when it is installed, and plain Python otherwise, both give the same results.
+
+    :param series: a query result, or any iterable of MetricSeries
+    :param resolution: the size of the buckets, e.g. "1h" or a timedelta
+    :param aggregations: any of min, max, sum, count, avg, median and percentile(N) with N between 0 and 100
+    :param split_by: None keeps every series apart. Otherwise series are merged by these dimension keys,
+                     and an empty list merges all series into one.
+    :return: one RollupSeries per series or group of merged series
+    """
+    step = int(resolution_to_timedelta(resolution).total_seconds() * 1000)
+    if step <= 0:
+        raise ValueError(f"Resolution must be positive, got '{resolution}'")
+    parsed = [_parse_aggregation(a) for a in aggregations]
+    if isinstance(series, MetricSeriesCollection):
+        series = series.data
+
+    groups: "OrderedDict[Tuple, Tuple[Dict[str, Any], List[int], List[Optional[float]]]]" = OrderedDict()
+    for s in series:
+        raw = s.json()
+        dimension_map = raw.get("dimensionMap") or {}
+        if split_by is None:
+            key = tuple(sorted(dimension_map.items()))
+            group_dimensions = dict(dimension_map)
+        else:
+            key = tuple(dimension_map.get(k) for k in split_by)
+            group_dimensions = {k: dimension_map.get(k) for k in split_by}
+        if key not in groups:
+            groups[key] = (group_dimensions, [], [])
+        groups[key][1].extend(raw.get("timestamps", []))
+        groups[key][2].extend(raw.get("values", []))
+
+    aggregate = _aggregate_numpy if numpy is not None else _aggregate_python
+    results = []
+    for dimension_map, timestamps, values in groups.values():
+        if not timestamps:
+            results.append(RollupSeries(dimension_map, [], {name: [] for name, _, _ in parsed}))
+            continue
+        origin = min(timestamps) // step * step
+        buckets = [(timestamp - origin) // step for timestamp in timestamps]
+        size = max(buckets) + 1
+        results.append(RollupSeries(dimension_map, [origin + i * step for i in range(size)], aggregate(buckets, values, size, parsed)))
+    return results
+
+
+def _parse_aggregation(aggregation: str) -> Tuple[str, str, Optional[float]]:
+    match = re.fullmatch(r"percentile\((\d+(?:\.\d+)?)\)", aggregation)
+    if match is not None:
+        q = float(match.group(1))
+        if not 0 <= q <= 100:
+            raise ValueError(f"Percentile must be between 0 and 100, got '{aggregation}'")
+        return aggregation, "percentile", q
+    if aggregation == "median":
+        return aggregation, "percentile", 50.0
+    if aggregation in ("min", "max", "sum", "count", "avg"):
+        return aggregation, aggregation, None
+    raise ValueError(f"Unknown aggregation '{aggregation}', use any of {AGGREGATIONS}")
+
+
+def _aggregate_python(buckets: List[int], values: List[Optional[float]], size: int, aggregations: List[Tuple[str, str, Optional[float]]]) -> Dict[str, list]:
+    grouped: Dict[int, List[float]] = defaultdict(list)
+    for bucket, value in zip(buckets, values):
+        if value is not None:
+            grouped[bucket].append(value)
+    if any(kind == "percentile" for _, kind, _ in aggregations):
+        for bucket_values in grouped.values():
+            bucket_values.sort()
+
+    results = {}
+    for name, kind, q in aggregations:
+        column = []
+        for i in range(size):
+            bucket_values = grouped.get(i)
+            if kind == "count":
+                column.append(len(bucket_values) if bucket_values else 0)
+            elif not bucket_values:
+                column.append(None)
+            elif kind == "min":
+                column.append(float(min(bucket_values)))
+            elif kind == "max":
+                column.append(float(max(bucket_values)))
+            elif kind == "sum":
+                column.append(float(math.fsum(bucket_values)))
+            elif kind == "avg":
+                column.append(math.fsum(bucket_values) / len(bucket_values))
+            else:
+                position = (len(bucket_values) - 1) * q / 100
+                low, high = bucket_values[math.floor(position)], bucket_values[math.ceil(position)]
+                column.append(float(low + (high - low) * (position - math.floor(position))))
+        results[name] = column
+    return results
+
+
+def _aggregate_numpy(buckets: List[int], values: List[Optional[float]], size: int, aggregations: List[Tuple[str, str, Optional[float]]]) -> Dict[str, list]:
+    indexes = numpy.asarray(buckets, dtype=numpy.int64)
+    data = numpy.array([numpy.nan if value is None else value for value in values], dtype=numpy.float64)
+    present = ~numpy.isnan(data)
+    indexes, data = indexes[present], data[present]
+
+    counts = numpy.bincount(indexes, minlength=size)
+    empty = counts == 0
+    sorted_data, starts = None, None
+
+    results = {}
+    for name, kind, q in aggregations:
+        if kind == "count":
+            results[name] = counts.tolist()
+            continue
+        if kind == "min":
+            column = numpy.full(size, numpy.inf)
+            numpy.minimum.at(column, indexes, data)
+        elif kind == "max":
+            column = numpy.full(size, -numpy.inf)
+            numpy.maximum.at(column, indexes, data)
+        elif kind == "sum":
+            column = numpy.bincount(indexes, weights=data, minlength=size)
+        elif kind == "avg":
+            column = numpy.bincount(indexes, weights=data, minlength=size) / numpy.maximum(counts, 1)
+        else:
+            if sorted_data is None:
+                sorted_data = data[numpy.lexsort((data, indexes))]
+                starts = numpy.cumsum(counts) - counts
+            position = (numpy.maximum(counts, 1) - 1) * q / 100
+            low = starts + numpy.floor(position).astype(numpy.int64)
+            high = starts + numpy.ceil(position).astype(numpy.int64)
+            column = numpy.full(size, numpy.nan)
+            filled = ~empty
+            low_values, high_values = sorted_data[low[filled]], sorted_data[high[filled]]
+            column[filled] = low_values + (high_values - low_values) * (position[filled] - numpy.floor(position[filled]))
+        results[name] = [None if is_empty else float(value) for value, is_empty in zip(column.tolist(), empty.tolist())]
+    return results
@@ -0,0 +1,134 @@
+"""
+Copyright 2021 Dynatrace LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from dynatrace.environment_v2.metrics import MetricService, MetricSeriesCollection
+from dynatrace.utils import datetime_to_int64, now_utc, resolution_to_timedelta
+
+SeriesKey = Tuple[str, Tuple[Tuple[str, Any], ...]]
+
+
+class MetricTail:
+    """Follows a metric query, only downloading the buckets that can still change on every poll.
+
+    The first poll queries the whole window. After that, buckets older than the lag are final and are never
+    requested again, each poll asks only for the buckets from the oldest non-final one until now.
+    Recent buckets are kept in the window but only emitted by poll() once they are final,
+    so every data point is emitted exactly once. Buckets without a value are not emitted.
+
+    :param metrics: the metric service
+    :param metric_selector: the metric selector, it can contain several metrics
+    :param resolution: the resolution of the query, it needs a fixed length such as "1m" or "5m"
+    :param window: how much history is kept in memory and queried on the first poll
+    :param lag: how long after its end a bucket is considered final, to account for ingestion delays
+    """
+
+    def __init__(
+        self,
+        metrics: MetricService,
+        metric_selector: str,
+        resolution: str = "1m",
+        window: Union[str, timedelta] = "2h",
+        lag: Union[str, timedelta] = "2m",
+        entity_selector: Optional[str] = None,
+        mz_selector: Optional[str] = None,
+    ):
+        self.__metrics = metrics
+        self.metric_selector = metric_selector
+        self.resolution = resolution
+        self.entity_selector = entity_selector
+        self.mz_selector = mz_selector
+        self.__step = int(resolution_to_timedelta(resolution).total_seconds() * 1000)
+        self.__window = int(resolution_to_timedelta(window).total_seconds() * 1000)
+        self.__lag = int(resolution_to_timedelta(lag).total_seconds() * 1000)
+        self.__final_until: Optional[int] = None
+        self.__series: "OrderedDict[SeriesKey, Dict[str, Any]]" = OrderedDict()
+
+    def poll(self) -> List[MetricSeriesCollection]:
+        """Queries the new buckets and merges them into the window
+
+        :return: the data points that became final since the previous poll, grouped like a query result
+        """
+        now = datetime_to_int64(now_utc())
+        final_until = (now - self.__lag) // self.__step * self.__step
+        time_from = self.__final_until if self.__final_until is not None else (now - self.__window) // self.__step * self.__step
+
+        new: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        # The new emitted watermarks are only stored once every page was read, so a failed poll emits its points again
+        emitted_until: Dict[SeriesKey, int] = {}
+        for page in self.__metrics.query_pages(self.metric_selector, self.resolution, f"{time_from}", None, self.entity_selector, self.mz_selector):
+            for collection in page.get("result", []):
+                metric_id = collection.get("metricId")
+                new.setdefault(metric_id, [])
+                for raw in collection.get("data", []):
+                    emitted = self.__merge(metric_id, raw, final_until, emitted_until)
+                    if emitted["timestamps"]:
+                        new[metric_id].append(emitted)
+
+        for key, timestamp in emitted_until.items():
+            self.__series[key]["emitted"] = timestamp
+        self.__final_until = final_until
+        self.__trim(now - self.__window)
+        return [MetricSeriesCollection(raw_element={"metricId": metric_id, "data": data}) for metric_id, data in new.items()]
+
+    def window(self) -> List[MetricSeriesCollection]:
+        """All data points in the window, including the ones that are not final yet"""
+        collections: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        for (metric_id, _), series in self.__series.items():
+            points = series["points"]
+            collections.setdefault(metric_id, []).append(
+                {"dimensionMap": series["dimensionMap"], "dimensions": series["dimensions"], "timestamps": list(points), "values": list(points.values())}
+            )
+        return [MetricSeriesCollection(raw_element={"metricId": metric_id, "data": data}) for metric_id, data in collections.items()]
+
+    def __merge(self, metric_id: str, raw: Dict[str, Any], final_until: int, emitted_until: Dict[SeriesKey, int]) -> Dict[str, Any]:
+        dimension_map = raw.get("dimensionMap") or {}
+        key = (metric_id, tuple(sorted(dimension_map.items())))
+        series = self.__series.get(key)
+        if series is None:
+            series = {"dimensionMap": dimension_map, "dimensions": raw.get("dimensions", []), "points": OrderedDict(), "emitted": None}
+            self.__series[key] = series
+
+        emitted = {"dimensionMap": dimension_map, "dimensions": series["dimensions"], "timestamps": [], "values": []}
+        points = series["points"]
+        unordered = False
+        last_emitted = emitted_until.get(key, series["emitted"])
+        for timestamp, value in zip(raw.get("timestamps", []), raw.get("values", [])):
+            if points and timestamp not in points and timestamp < next(reversed(points)):
+                unordered = True
+            points[timestamp] = value
+            final = timestamp + self.__step <= final_until
+            already_emitted = last_emitted is not None and timestamp <= last_emitted
+            if final and not already_emitted and value is not None:
+                emitted["timestamps"].append(timestamp)
+                emitted["values"].append(value)
+        if emitted["timestamps"]:
+            emitted_until[key] = emitted["timestamps"][-1]
+
+        if unordered:
+            series["points"] = OrderedDict(sorted(points.items()))
+        return emitted
+
+    def __trim(self, oldest: int):
+        for key in list(self.__series):
+            points = self.__series[key]["points"]
+            while points and next(iter(points)) < oldest:
+                points.popitem(last=False)
+            if not points:
+                del self.__series[key]
@@ -14,16 +14,122 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
-from datetime import datetime
+import math
+import re
+from datetime import datetime, timedelta, timezone
 from enum import Enum
-from typing import List, Optional, Union, Dict, Any
+from typing import List, Optional, Union, Dict, Any, Iterator
 
 from requests import Response
 
 from dynatrace.dynatrace_object import DynatraceObject
 from dynatrace.http_client import HttpClient
-from dynatrace.pagination import PaginatedList
-from dynatrace.utils import timestamp_to_string, int64_to_datetime
+from dynatrace.pagination import PaginatedList, iter_pages
+from dynatrace.utils import DURATION_UNITS, timestamp_to_string, int64_to_datetime, resolution_to_timedelta
+
+
+# Relative timeframes also accept months and years, approximated the same way the API does
+_RELATIVE_TIME_UNITS = dict(DURATION_UNITS, M=30 * 86400, q=91 * 86400, y=365 * 86400)
+
+# Resolutions the planner picks from, smallest first
+PLANNER_RESOLUTIONS = ("1m", "2m", "5m", "10m", "15m", "30m", "1h", "2h", "3h", "6h", "12h", "1d", "1w")
+
+_ISO_8601_FORMATS = ("%Y-%m-%dT%H:%M:%S.%f%z", "%Y-%m-%dT%H:%M:%S%z", "%Y-%m-%dT%H:%M%z", "%Y-%m-%dT%H:%M:%S.%f", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M", "%Y-%m-%d")
+
+
+def _to_timestamp(timestamp: Optional[Union[datetime, str]], now: datetime) -> datetime:
+    if timestamp is None:
+        return now
+    if isinstance(timestamp, datetime):
+        return timestamp if timestamp.tzinfo is not None else timestamp.replace(tzinfo=timezone.utc)
+    text = timestamp.strip()
+    if text.isdigit():
+        return int64_to_datetime(int(text))
+    match = re.fullmatch(r"now(?:-(\d+)([smhdwMqy]))?(?:/([smhdwMqy]))?", text)
+    if match is not None:
+        result = now
+        if match.group(1) is not None:
+            result = now - timedelta(seconds=int(match.group(1)) * _RELATIVE_TIME_UNITS[match.group(2)])
+        if match.group(3) is not None:
+            result = _round_down(result, match.group(3))
+        return result
+    # strptime only understands offsets without a colon before Python 3.7
+    text = re.sub(r"([+-]\d{2}):(\d{2})$", r"\1\2", re.sub(r"Z$", "+0000", text))
+    for date_format in _ISO_8601_FORMATS:
+        try:
+            parsed = datetime.strptime(text, date_format)
+        except ValueError:
+            continue
+        return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+    raise ValueError(
+        f"Cannot plan a resolution for the timestamp '{timestamp}', use a datetime, milliseconds, an ISO 8601 string or 'now-<n><unit>[/<unit>]'"
+    )
+
+
+def _round_down(timestamp: datetime, unit: str) -> datetime:
+    if unit == "s":
+        return timestamp.replace(microsecond=0)
+    if unit == "m":
+        return timestamp.replace(second=0, microsecond=0)
+    if unit == "h":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    day = timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    if unit == "d":
+        return day
+    if unit == "w":
+        return day - timedelta(days=day.weekday())
+    if unit == "M":
+        return day.replace(day=1)
+    if unit == "q":
+        return day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1)
+    return day.replace(month=1, day=1)
+
+
+class ResolutionPlan:
+    def __init__(self, resolution: str, timeframe: timedelta, series_count: int, points_per_series: int):
+        self.resolution: str = resolution
+        self.timeframe: timedelta = timeframe
+        self.series_count: int = series_count
+        self.points_per_series: int = points_per_series
+        self.total_points: int = series_count * points_per_series
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}(resolution='{self.resolution}', series_count={self.series_count}, "
+            f"points_per_series={self.points_per_series}, total_points={self.total_points})"
+        )
+
+
+def plan_resolution(
+    time_from: Optional[Union[datetime, str]] = None,
+    time_to: Optional[Union[datetime, str]] = None,
+    series_count: int = 1,
+    points_per_series: int = 120,
+    max_total_points: int = 1000000,
+) -> ResolutionPlan:
+    """Picks the finest resolution that keeps a query within a budget of data points
+
+    :param time_from: the start of the timeframe, as accepted by query. Defaults to the API default of now-2h
+    :param time_to: the end of the timeframe, defaults to now
+    :param series_count: how many series the query is expected to return
+    :param points_per_series: the maximum number of data points per series, e.g. the width of a chart in points
+    :param max_total_points: the maximum number of data points for all series together
+    :return: the plan, if even the coarsest resolution exceeds the budget it is returned anyway
+    """
+    now = datetime.now(timezone.utc)
+    timeframe = _to_timestamp(time_to, now) - _to_timestamp(time_from if time_from is not None else "now-2h", now)
+    if timeframe <= timedelta(0):
+        raise ValueError(f"The timeframe must end after it starts, got from '{time_from}' to '{time_to}'")
+    series_count = max(series_count, 1)
+    budget = max(min(points_per_series, max_total_points // series_count), 1)
+
+    plan = None
+    for resolution in PLANNER_RESOLUTIONS:
+        points = math.ceil(timeframe / resolution_to_timedelta(resolution))
+        plan = ResolutionPlan(resolution, timeframe, series_count, points)
+        if points <= budget:
+            break
+    return plan
 
 
 class MetricService:
@@ -50,6 +156,129 @@ class MetricService:
         }
         return PaginatedList(MetricSeriesCollection, self.__http_client, "/api/v2/metrics/query", params, list_item="result")
 
+    def query_pages(
+        self,
+        metric_selector: str,
+        resolution: str = None,
+        time_from: Optional[Union[datetime, str]] = None,
+        time_to: Optional[Union[datetime, str]] = None,
+        entity_selector: Optional[str] = None,
+        mz_selector: Optional[str] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Same as query, but yields the raw JSON of each page of results instead of MetricSeriesCollection objects.
+        The "result" key of each page holds the metric series collections of that page.
+        """
+        params = {
+            "metricSelector": metric_selector,
+            "resolution": resolution,
+            "from": timestamp_to_string(time_from),
+            "to": timestamp_to_string(time_to),
+            "entitySelector": entity_selector,
+            "mzSelector": mz_selector,
+        }
+        return iter_pages(self.__http_client, "/api/v2/metrics/query", params)
+
+    def aggregate(
+        self,
+        metric_selector: str,
+        aggregation: Union["AggregationType", str] = None,
+        time_from: Optional[Union[datetime, str]] = None,
+        time_to: Optional[Union[datetime, str]] = None,
+        entity_selector: Optional[str] = None,
+        mz_selector: Optional[str] = None,
+    ) -> PaginatedList["MetricSeriesCollection"]:
+        """Queries a single value per series, folding the whole timeframe on the server, e.g. the max over 24 hours
+
+        :param metric_selector: the metric selector, each of its comma separated selectors is folded
+        :param aggregation: the aggregation to fold with, e.g. AggregationType.MAX or "percentile(95)". Defaults to the metric's default aggregation
+        """
+        if aggregation is None:
+            transformation = f":{Transformation.FOLD.value}"
+        else:
+            transformation = _transformation(Transformation.FOLD, _aggregation_name(aggregation))
+        return self.query(_apply_transformations(metric_selector, transformation), None, time_from, time_to, entity_selector, mz_selector)
+
+    def top_n(
+        self,
+        metric_selector: str,
+        n: int = 10,
+        aggregation: Union["AggregationType", str] = "avg",
+        descending: bool = True,
+        time_from: Optional[Union[datetime, str]] = None,
+        time_to: Optional[Union[datetime, str]] = None,
+        entity_selector: Optional[str] = None,
+        mz_selector: Optional[str] = None,
+    ) -> PaginatedList["MetricSeriesCollection"]:
+        """Queries the n series with the highest (or lowest) value over the timeframe, one value per series
+
+        :param metric_selector: the metric selector, each of its comma separated selectors is reduced
+        :param n: how many series to return
+        :param aggregation: the aggregation used to fold and rank the series
+        :param descending: rank the highest values first, otherwise the lowest ones
+        """
+        name = _aggregation_name(aggregation)
+        direction = "descending" if descending else "ascending"
+        transformations = (
+            _transformation(Transformation.FOLD, name)
+            + _transformation(Transformation.SORT, f"value({name},{direction})")
+            + _transformation(Transformation.LIMIT, f"{n}")
+        )
+        return self.query(_apply_transformations(metric_selector, transformations), None, time_from, time_to, entity_selector, mz_selector)
+
+    def last(
+        self,
+        metric_selector: str,
+        time_from: Optional[Union[datetime, str]] = None,
+        time_to: Optional[Union[datetime, str]] = None,
+        entity_selector: Optional[str] = None,
+        mz_selector: Optional[str] = None,
+    ) -> PaginatedList["MetricSeriesCollection"]:
+        """Queries the most recent data point of every series in the timeframe
+
+        :param metric_selector: the metric selector, the last value of each of its comma separated selectors is returned
+        """
+        transformation = f":{Transformation.LAST.value}"
+        return self.query(_apply_transformations(metric_selector, transformation), None, time_from, time_to, entity_selector, mz_selector)
+
+    def query_planned(
+        self,
+        metric_selector: str,
+        time_from: Optional[Union[datetime, str]] = None,
+        time_to: Optional[Union[datetime, str]] = None,
+        entity_selector: Optional[str] = None,
+        mz_selector: Optional[str] = None,
+        points_per_series: int = 120,
+        series_count: Optional[int] = None,
+        max_total_points: int = 1000000,
+    ) -> PaginatedList["MetricSeriesCollection"]:
+        """Same as query, but picks the resolution with plan_resolution instead of taking it as a parameter
+
+        The chosen ResolutionPlan is in the "resolutionPlan" key of the metadata of the result.
+
+        :param points_per_series: the maximum number of data points per series
+        :param series_count: how many series the query returns, e.g. the number of entities. If not given,
+                             the series are counted with a cheap probe query at resolution Inf
+        :param max_total_points: the maximum number of data points for all series together
+        """
+        if series_count is None:
+            series_count = self.count_series(metric_selector, time_from, time_to, entity_selector, mz_selector)
+        plan = plan_resolution(time_from, time_to, series_count, points_per_series, max_total_points)
+        results = self.query(metric_selector, plan.resolution, time_from, time_to, entity_selector, mz_selector)
+        results.metadata["resolutionPlan"] = plan
+        return results
+
+    def count_series(
+        self,
+        metric_selector: str,
+        time_from: Optional[Union[datetime, str]] = None,
+        time_to: Optional[Union[datetime, str]] = None,
+        entity_selector: Optional[str] = None,
+        mz_selector: Optional[str] = None,
+    ) -> int:
+        """Counts the series a query returns, querying a single data point per series"""
+        pages = self.query_pages(metric_selector, "Inf", time_from, time_to, entity_selector, mz_selector)
+        return sum(len(collection.get("data", [])) for page in pages for collection in page.get("result", []))
+
     def list(
         self,
         metric_selector: Optional[str] = None,
@@ -83,6 +312,42 @@ class MetricService:
         ).json()
 
 
+def _aggregation_name(aggregation: Union["AggregationType", str]) -> str:
+    return aggregation.value if isinstance(aggregation, AggregationType) else aggregation
+
+
+def _transformation(transformation: "Transformation", argument: str) -> str:
+    return f":{transformation.value}({argument})"
+
+
+def _split_selectors(metric_selector: str) -> List[str]:
+    """Splits a metric selector on the commas that separate metrics, ignoring the ones inside parentheses and quotes"""
+    selectors, current, depth, quoted, escaped = [], [], 0, False, False
+    for char in metric_selector:
+        if escaped:
+            escaped = False
+        elif quoted and char == "~":
+            # Inside quotes, a tilde escapes the next character, e.g. ~" or ~~
+            escaped = True
+        elif char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            selectors.append("".join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    selectors.append("".join(current).strip())
+    return [selector for selector in selectors if selector]
+
+
+def _apply_transformations(metric_selector: str, transformations: str) -> str:
+    return ",".join(f"{selector}{transformations}" for selector in _split_selectors(metric_selector))
+
+
 class MetricSeries(DynatraceObject):
     def _create_from_raw_data(self, raw_element):
         self.timestamps: List[datetime] = [int64_to_datetime(timestamp) for timestamp in raw_element.get("timestamps", [])]
@@ -0,0 +1,123 @@
+"""
+Copyright 2021 Dynatrace LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from datetime import timedelta
+from enum import Enum
+from typing import Dict, List, Optional, Tuple, Union
+
+from dynatrace.environment_v2.problems import DETAIL_FIELDS, Problem, ProblemService, Status
+from dynatrace.utils import datetime_to_int64, fingerprint, now_utc, parallel_map, resolution_to_timedelta
+
+
+class ProblemEventType(Enum):
+    OPENED = "OPENED"
+    UPDATED = "UPDATED"
+    CLOSED = "CLOSED"
+
+
+class ProblemEvent:
+    def __init__(self, event_type: ProblemEventType, problem: Problem, previous_status: Optional[Status]):
+        self.event_type: ProblemEventType = event_type
+        self.problem: Problem = problem
+        self.previous_status: Optional[Status] = previous_status
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.event_type.value}, {self.problem.problem_id})"
+
+
+class ProblemFeed:
+    """Turns polls of the problem list into opened, updated and closed events.
+
+    The problems are listed without details, and only a fingerprint and the status of each one are kept.
+    The first poll covers the initial window. After that, every poll starts at the previous poll minus the
+    overlap, which still returns every open problem and every problem that closed since, but not the ones
+    that closed earlier. The details (evidenceDetails and impactAnalysis by default) are only fetched, in
+    parallel, for the problems whose fingerprint changed.
+
+    Problems that are closed when they are first seen are reported as closed, unless it is the first poll,
+    which only reports the problems that are open.
+
+    :param problems: the problem service
+    :param problem_selector: the problem selector of the list requests
+    :param entity_selector: the entity selector of the list requests
+    :param initial_window: how far back the first poll looks
+    :param overlap: how far before the previous poll every following poll starts
+    :param detail_fields: the fields of the problems that are fetched for the changed problems
+    :param workers: how many problems details are fetched at the same time
+    """
+
+    def __init__(
+        self,
+        problems: ProblemService,
+        problem_selector: Optional[str] = None,
+        entity_selector: Optional[str] = None,
+        initial_window: Union[str, timedelta] = "1d",
+        overlap: Union[str, timedelta] = "5m",
+        detail_fields: Optional[str] = DETAIL_FIELDS,
+        workers: int = 4,
+    ):
+        self.__problems = problems
+        self.problem_selector = problem_selector
+        self.entity_selector = entity_selector
+        self.detail_fields = detail_fields
+        self.workers = workers
+        self.__initial_window = int(resolution_to_timedelta(initial_window).total_seconds() * 1000)
+        self.__overlap = int(resolution_to_timedelta(overlap).total_seconds() * 1000)
+        self.__last_poll: Optional[int] = None
+        # problemId -> (fingerprint, status)
+        self.__known: Dict[str, Tuple[bytes, Status]] = {}
+
+    @property
+    def tracked(self) -> int:
+        """How many problems are tracked"""
+        return len(self.__known)
+
+    def poll(self) -> List[ProblemEvent]:
+        """Lists the problems of the window and reports the ones that changed since the previous poll
+
+        :return: the events, in the order the problems were listed
+        """
+        now = datetime_to_int64(now_utc())
+        first = self.__last_poll is None
+        time_from = now - self.__initial_window if first else self.__last_poll - self.__overlap
+
+        changed: List[Tuple[str, Optional[Status]]] = []
+        listed: Dict[str, Tuple[bytes, Status]] = {}
+        for page in self.__problems.list_pages(self.problem_selector, self.entity_selector, None, f"{time_from}", None):
+            for raw in page.get("problems", []):
+                problem_id = raw.get("problemId")
+                status = Status(raw.get("status"))
+                listed[problem_id] = (fingerprint(raw), status)
+                previous = self.__known.get(problem_id)
+                if previous is not None and previous[0] == listed[problem_id][0]:
+                    continue
+                if previous is None and first and status == Status.CLOSED:
+                    continue
+                changed.append((problem_id, previous[1] if previous is not None else None))
+
+        details = list(parallel_map(lambda item: self.__problems.get(item[0], self.detail_fields), changed, self.workers))
+
+        # Only remember the new state once all the details were fetched, so a failed poll is repeated as a whole.
+        # Problems that are not listed anymore closed before the window, they can't change again
+        self.__known = listed
+        self.__last_poll = now
+        return [ProblemEvent(_event_type(problem.status, previous_status), problem, previous_status) for problem, (_, previous_status) in zip(details, changed)]
+
+
+def _event_type(status: Status, previous_status: Optional[Status]) -> ProblemEventType:
+    if status == Status.CLOSED:
+        return ProblemEventType.UPDATED if previous_status == Status.CLOSED else ProblemEventType.CLOSED
+    return ProblemEventType.OPENED if previous_status is None else ProblemEventType.UPDATED
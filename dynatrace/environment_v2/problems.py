@@ -18,7 +18,7 @@ limitations under the License.
 from enum import Enum
 from requests import Response
 from datetime import datetime
-from typing import Optional, Union, Dict, Any, List
+from typing import Optional, Union, Dict, Any, Callable, Iterable, Iterator, List
 
 from dynatrace.http_client import HttpClient
 from dynatrace.dynatrace_object import DynatraceObject
@@ -26,8 +26,10 @@ from dynatrace.environment_v2.schemas import ManagementZone
 from dynatrace.environment_v2.monitored_entities import EntityStub
 from dynatrace.environment_v2.custom_tags import METag
 from dynatrace.configuration_v1.alerting_profiles import AlertingProfileStub
-from dynatrace.pagination import PaginatedList
-from dynatrace.utils import int64_to_datetime, timestamp_to_string
+from dynatrace.pagination import PaginatedList, iter_pages
+from dynatrace.utils import int64_to_datetime, parallel_map, timestamp_to_string
+
+DETAIL_FIELDS = "+evidenceDetails,+impactAnalysis"
 
 
 class ProblemService:
@@ -61,6 +63,30 @@ class ProblemService:
         }
         return PaginatedList(target_class=Problem, http_client=self.__http_client, target_url=self.ENDPOINT, target_params=params, list_item="problems")
 
+    def list_pages(
+        self,
+        problem_selector: Optional[str] = None,
+        entity_selector: Optional[str] = None,
+        fields: Optional[str] = None,
+        time_from: Optional[Union[datetime, str]] = None,
+        time_to: Optional[Union[datetime, str]] = None,
+        sort: Optional[str] = None,
+        page_size: Optional[int] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Same as list, but yields the raw JSON of each page instead of Problem objects.
+        The "problems" key of each page holds the problems of that page.
+        """
+        params = {
+            "problemSelector": problem_selector,
+            "entitySelector": entity_selector,
+            "fields": fields,
+            "from": timestamp_to_string(time_from),
+            "to": timestamp_to_string(time_to),
+            "sort": sort,
+            "pageSize": page_size,
+        }
+        return iter_pages(self.__http_client, self.ENDPOINT, params)
+
     def get(self, problem_id: str, fields: Optional[str] = None) -> "Problem":
         """Gets a Problem by specifying its id.
 
@@ -71,6 +97,42 @@ class ProblemService:
         response = self.__http_client.make_request(path=f"{self.ENDPOINT}/{problem_id}", params=params).json()
         return Problem(raw_element=response)
 
+    def enrich(
+        self,
+        problems: Iterable[Union["Problem", str]],
+        fields: Optional[str] = DETAIL_FIELDS,
+        comments: bool = True,
+        select: Optional[Callable[["Problem"], bool]] = None,
+        workers: int = 4,
+        comments_page_size: int = 100,
+    ) -> Iterator["Problem"]:
+        """Fetches the details and the comments of problems listed without them, several problems at a time.
+
+        The problems are yielded in the order they were given, as soon as they are ready, so problems can be a
+        lazy PaginatedList. At most 2 * workers problems are in flight at any time.
+
+        :param problems: the problems, or problem IDs, to enrich
+        :param fields: the fields fetched with get, e.g. "+evidenceDetails,+impactAnalysis"
+        :param comments: fetch all the comments with list_comments, they replace the recent_comments of the problem
+        :param select: only the problems for which it returns True are enriched, the others are yielded unchanged.
+                       Problem IDs are always enriched
+        :param workers: how many problems are enriched at the same time
+        :param comments_page_size: the page size of the comment requests
+        :return: the enriched problems
+        """
+
+        def enrich_one(problem: Union[Problem, str]) -> Problem:
+            if isinstance(problem, Problem) and select is not None and not select(problem):
+                return problem
+            problem_id = problem.problem_id if isinstance(problem, Problem) else problem
+            raw = self.get(problem_id, fields).json()
+            if comments:
+                comment_list = [comment.json() for comment in self.list_comments(problem_id, comments_page_size)]
+                raw["recentComments"] = {"comments": comment_list, "totalCount": len(comment_list)}
+            return Problem(self.__http_client, None, raw)
+
+        return parallel_map(enrich_one, problems, workers)
+
     def close(self, problem_id: str, message: str) -> "ProblemCloseResult":
         """Closes an open Problem leaving a closing message as comment
 
@@ -79,8 +141,85 @@ class ProblemService:
         :return: details of the closed problem result. Blank details if the problem was already closed.
         """
         params = {"message": message}
-        response = self.__http_client.make_request(path=f"{self.ENDPOINT}/{problem_id}/close", method="POST", params=params).json()
-        return ProblemCloseResult(raw_element=response)
+        response = self.__http_client.make_request(path=f"{self.ENDPOINT}/{problem_id}/close", method="POST", params=params)
+        return ProblemCloseResult(raw_element=response.json() if response.status_code != 204 else None)
+
+    def close_many(
+        self,
+        message: str,
+        problems: Optional[Iterable[Union["Problem", str]]] = None,
+        problem_selector: Optional[str] = None,
+        time_from: Optional[Union[datetime, str]] = None,
+        workers: int = 8,
+    ) -> "ProblemBulkReport":
+        """Closes many problems concurrently, leaving the same closing message on each of them
+
+        The problems are either given, or listed with a problem selector. Problems known to be closed already are
+        skipped without a request, and so are the ones the server reports as already closed.
+        Failures are recorded in the report instead of raised.
+
+        :param message: message to leave as closing comment
+        :param problems: the problems, or problem IDs, to close
+        :param problem_selector: a problem selector listing the problems to close, e.g. 'status("open"),managementZones("Staging")'
+        :param time_from: the start of the timeframe the problem selector lists problems from
+        :param workers: how many problems are closed at the same time
+        :return: the result of every problem, in the order they were given or listed
+        """
+
+        def close_one(problem_id: str) -> Dict[str, Any]:
+            result = self.close(problem_id, message)
+            return {"action": "close", "problemId": problem_id, "skipped": result.already_closed, "error": None}
+
+        return self.__bulk("close", close_one, problems, problem_selector, time_from, workers)
+
+    def comment_many(
+        self,
+        message: str,
+        problems: Optional[Iterable[Union["Problem", str]]] = None,
+        problem_selector: Optional[str] = None,
+        time_from: Optional[Union[datetime, str]] = None,
+        context: Optional[str] = None,
+        skip_closed: bool = True,
+        workers: int = 8,
+    ) -> "ProblemBulkReport":
+        """Adds the same comment to many problems concurrently, see close_many for the parameters
+
+        :param context: the optional context to attach to the comments
+        :param skip_closed: don't comment on problems known to be closed, only problems listed or given as Problem
+                            objects have a known status
+        """
+
+        def comment_one(problem_id: str) -> Dict[str, Any]:
+            self.add_comment(problem_id, message, context)
+            return {"action": "comment", "problemId": problem_id, "skipped": False, "error": None}
+
+        return self.__bulk("comment", comment_one, problems, problem_selector, time_from, workers, skip_closed)
+
+    def __bulk(
+        self,
+        action: str,
+        func: Callable[[str], Dict[str, Any]],
+        problems: Optional[Iterable[Union["Problem", str]]],
+        problem_selector: Optional[str],
+        time_from: Optional[Union[datetime, str]],
+        workers: int,
+        skip_closed: bool = True,
+    ) -> "ProblemBulkReport":
+        if (problems is None) == (problem_selector is None):
+            raise ValueError("Either problems or problem_selector must be given")
+        if problems is None:
+            problems = self.list(problem_selector=problem_selector, time_from=time_from)
+
+        def run(problem: Union[Problem, str]) -> Dict[str, Any]:
+            problem_id = problem.problem_id if isinstance(problem, Problem) else problem
+            if skip_closed and isinstance(problem, Problem) and problem.status == Status.CLOSED:
+                return {"action": action, "problemId": problem_id, "skipped": True, "error": None}
+            try:
+                return func(problem_id)
+            except Exception as e:
+                return {"action": action, "problemId": problem_id, "skipped": False, "error": f"{e}"}
+
+        return ProblemBulkReport(list(parallel_map(run, problems, workers)))
 
     def list_comments(self, problem_id: str, page_size: Optional[int] = 10) -> PaginatedList["Comment"]:
         """Gets a list of comments belonging to a given Problem.
@@ -162,12 +301,34 @@ class Problem(DynatraceObject):
         self.entity_tags: Optional[List[METag]] = [METag(raw_element=t) for t in raw_element.get("entityTags", [])]
 
 
+class ProblemBulkReport:
+    def __init__(self, results: List[Dict[str, Any]]):
+        self.results: List[Dict[str, Any]] = results
+
+    @property
+    def done(self) -> List[Dict[str, Any]]:
+        return [r for r in self.results if not r["skipped"] and not r["error"]]
+
+    @property
+    def skipped(self) -> List[Dict[str, Any]]:
+        return [r for r in self.results if r["skipped"]]
+
+    @property
+    def errors(self) -> List[Dict[str, Any]]:
+        return [r for r in self.results if r["error"]]
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(done={len(self.done)}, skipped={len(self.skipped)}, errors={len(self.errors)})"
+
+
 class ProblemCloseResult(DynatraceObject):
     def _create_from_raw_data(self, raw_element: Dict[str, Any]):
         self.problem_id: str = raw_element.get("problemId")
         self.closing: bool = raw_element.get("closing")
         self.close_timestamp: datetime = int64_to_datetime(raw_element.get("closeTimestamp"))
         self.comment: Optional[Comment] = Comment(raw_element=raw_element.get("comment"))
+        # The server answers with 204 and no body when the problem was already closed
+        self.already_closed: bool = not raw_element
 
 
 class LinkedProblem(DynatraceObject):
@@ -1,15 +1,22 @@
-from typing import Optional, Dict, Any, List, Union
+from collections import defaultdict
+from typing import Optional, Dict, Any, List, Union, Tuple
 from datetime import datetime
 
 from dynatrace.dynatrace_object import DynatraceObject
 from dynatrace.http_client import HttpClient
 from dynatrace.pagination import PaginatedList
-from dynatrace.utils import int64_to_datetime
+from dynatrace.utils import fingerprint, int64_to_datetime, parallel_map
+
+
+def value_hash(value: dict) -> str:
+    """Returns a stable hash of a settings value, independent of key order"""
+    return fingerprint(value).hex()
 
 
 class SettingService:
     OBJECTS_ENDPOINT = "/api/v2/settings/objects"
     SCHEMAS_ENDPOINT = "/api/v2/settings/schemas"
+    RECONCILE_FIELDS = "objectId,value,externalId,updateToken,schemaId,scope,schemaVersion"
 
     def __init__(self, http_client: HttpClient):
         self.__http_client = http_client
@@ -25,6 +32,16 @@ class SettingService:
             list_item="items"
         )
 
+    def get_schema(self, schema_id: str, schema_version: Optional[str] = None) -> "SchemaDefinition":
+        """Gets the definition of the specified settings schema
+
+        :param schema_id: the ID of the schema
+        :param schema_version: the version of the schema. Defaults to the latest version
+        :return: the schema definition
+        """
+        params = {"schemaVersion": schema_version}
+        response = self.__http_client.make_request(f"{self.SCHEMAS_ENDPOINT}/{schema_id}", params=params).json()
+        return SchemaDefinition(raw_element=response)
 
     def list_objects(
         self,
@@ -63,18 +80,24 @@ class SettingService:
         body: Union[
             Optional[List["SettingsObjectCreate"]], Optional["SettingsObjectCreate"]
         ] = [],
+        schema_cache: Optional["SettingsSchemaCache"] = None,
     ):
         """
         Creates a new settings object or validates the provided settigns object
 
         :param validate_only: If true, the request runs only validation of the submitted settings objects, without saving them
         :param body: The JSON body of the request. Contains the settings objects
+        :param schema_cache: If provided, the settings objects are first validated locally against the cached schemas.
+            Invalid objects raise a ValueError and nothing is sent.
         """
         query_params = {"validateOnly": validate_only}
 
         if isinstance(body, SettingsObjectCreate):
             body = [body]
 
+        if schema_cache is not None:
+            schema_cache.check(body)
+
         body = [o.json() for o in body]
 
         response = self.__http_client.make_request(
@@ -119,6 +142,160 @@ class SettingService:
             query_params=query_params,
         )
 
+    def plan(
+        self,
+        desired: Union[List["SettingsObjectCreate"], "SettingsObjectCreate"],
+        schema_ids: Optional[List[str]] = None,
+        scopes: Optional[List[str]] = None,
+        delete_missing: bool = False,
+        workers: int = 4,
+    ) -> "SettingsReconcilePlan":
+        """Compares a desired state against the settings objects currently in the environment
+
+        Desired objects are matched to existing ones by object ID, then by external ID, and finally by value.
+        Values are compared by hash, so they should be complete (as returned by the API), otherwise
+        defaults filled in by the server will show up as a difference on every run.
+
+        :param desired: the settings objects that should exist
+        :param schema_ids: the schemas to reconcile. Defaults to the schemas used in desired
+        :param scopes: the scopes to reconcile. Defaults to the scopes used in desired
+        :param delete_missing: if true, existing objects in these schemas and scopes that are not desired are deleted
+        :param workers: how many schemas are listed in parallel
+        :return: the changes needed, without applying them
+        """
+        if isinstance(desired, SettingsObjectCreate):
+            desired = [desired]
+        if schema_ids is None:
+            schema_ids = sorted({d.schema_id for d in desired})
+        if scopes is None:
+            scopes = sorted({d.scope for d in desired})
+
+        def list_schema(schema_id: str) -> List[SettingsObject]:
+            return list(
+                self.list_objects(schema_id=schema_id, scope=",".join(scopes) or None, fields=self.RECONCILE_FIELDS, page_size=500)
+            )
+
+        current = [o for objects in parallel_map(list_schema, schema_ids, workers) for o in objects]
+
+        by_object_id = {o.object_id: o for o in current}
+        by_external_id = {(o.schema_id, o.scope, o.external_id): o for o in current if o.external_id}
+        by_value = defaultdict(list)
+        for o in current:
+            by_value[(o.schema_id, o.scope, value_hash(o.value))].append(o)
+
+        plan = SettingsReconcilePlan()
+        matched = set()
+
+        # Objects with an identity are matched first, so that value matching can't take their counterpart
+        for d in sorted(desired, key=lambda d: not (d.object_id or d.external_id)):
+            desired_hash = value_hash(d.value)
+            target = None
+            if d.object_id:
+                target = by_object_id.get(d.object_id)
+            elif d.external_id:
+                target = by_external_id.get((d.schema_id, d.scope, d.external_id))
+            else:
+                candidates = [o for o in by_value.get((d.schema_id, d.scope, desired_hash), []) if o.object_id not in matched]
+                target = candidates[0] if candidates else None
+
+            if target is None or target.object_id in matched:
+                plan.creates.append(d)
+                continue
+
+            matched.add(target.object_id)
+            if value_hash(target.value) == desired_hash:
+                plan.unchanged.append(target)
+            else:
+                plan.updates.append((target, d))
+
+        if delete_missing:
+            plan.deletes = [o for o in current if o.object_id not in matched]
+        return plan
+
+    def apply(self, plan: "SettingsReconcilePlan", workers: int = 4) -> "SettingsReconcilePlan":
+        """Applies a plan created with plan()
+
+        All creates are sent in a single request. Updates and deletes use the update token of the listed object,
+        so objects modified in the meantime are not overwritten. Failures are recorded in plan.results instead of raised.
+
+        :param plan: the plan to apply
+        :param workers: how many updates and deletes are sent in parallel
+        :return: the same plan, with results filled in
+        """
+        if plan.creates:
+            try:
+                for d, response in zip(plan.creates, self.create_object(body=plan.creates)):
+                    plan.results.append(
+                        {"action": "create", "objectId": response.get("objectId"), "code": response.get("code"), "error": response.get("error")}
+                    )
+            except Exception as e:
+                plan.results.extend({"action": "create", "objectId": d.object_id, "code": None, "error": f"{e}"} for d in plan.creates)
+
+        def update(change: Tuple[SettingsObject, SettingsObjectCreate]) -> Dict[str, Any]:
+            current, d = change
+            body = SettingsObjectUpdate(d.value, schema_version=d.schema_version, update_token=current.update_token)
+            try:
+                response = self.update_object(current.object_id, body)
+                return {"action": "update", "objectId": current.object_id, "code": response.status_code, "error": None}
+            except Exception as e:
+                return {"action": "update", "objectId": current.object_id, "code": None, "error": f"{e}"}
+
+        def delete(current: SettingsObject) -> Dict[str, Any]:
+            try:
+                response = self.delete_object(current.object_id, update_token=current.update_token)
+                return {"action": "delete", "objectId": current.object_id, "code": response.status_code, "error": None}
+            except Exception as e:
+                return {"action": "delete", "objectId": current.object_id, "code": None, "error": f"{e}"}
+
+        plan.results.extend(parallel_map(update, plan.updates, workers))
+        plan.results.extend(parallel_map(delete, plan.deletes, workers))
+        return plan
+
+    def reconcile(
+        self,
+        desired: Union[List["SettingsObjectCreate"], "SettingsObjectCreate"],
+        schema_ids: Optional[List[str]] = None,
+        scopes: Optional[List[str]] = None,
+        delete_missing: bool = False,
+        dry_run: bool = False,
+        workers: int = 4,
+    ) -> "SettingsReconcilePlan":
+        """Makes the settings in the environment match the desired state, writing only what differs
+
+        A run where nothing changed costs one list call per schema and no writes.
+        See plan() for the parameters.
+
+        :param dry_run: if true, the plan is returned without being applied
+        :return: the plan, with results filled in if it was applied
+        """
+        plan = self.plan(desired, schema_ids, scopes, delete_missing, workers)
+        if dry_run or not plan.has_changes:
+            return plan
+        return self.apply(plan, workers)
+
+
+class SettingsReconcilePlan:
+    def __init__(self):
+        self.creates: List[SettingsObjectCreate] = []
+        self.updates: List[Tuple[SettingsObject, SettingsObjectCreate]] = []
+        self.deletes: List[SettingsObject] = []
+        self.unchanged: List[SettingsObject] = []
+        self.results: List[Dict[str, Any]] = []
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.creates or self.updates or self.deletes)
+
+    @property
+    def errors(self) -> List[Dict[str, Any]]:
+        return [r for r in self.results if r.get("error")]
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}(creates={len(self.creates)}, updates={len(self.updates)}, "
+            f"deletes={len(self.deletes)}, unchanged={len(self.unchanged)})"
+        )
+
 
 class ModificationInfo(DynatraceObject):
     def _create_from_raw_data(self, raw_element: Dict[str, Any]):
@@ -134,7 +311,8 @@ class SettingsObject(DynatraceObject):
     def _create_from_raw_data(self, raw_element: Dict[str, Any]):
         # Mandatory
         self.object_id: str = raw_element["objectId"]
-        self.value: dict = raw_element["value"]
+        # Only missing if excluded with the fields parameter when listing
+        self.value: dict = raw_element.get("value")
         # Optional
         self.author: str = raw_element.get("author")
         self.created: datetime = (
@@ -230,3 +408,18 @@ class SchemaStub(DynatraceObject):
         self.display_name = raw_element["displayName"]
         self.latest_schema_version = raw_element["latestSchemaVersion"]
         self.schema_id = raw_element["schemaId"]
+
+
+class SchemaDefinition(DynatraceObject):
+    def _create_from_raw_data(self, raw_element: Dict[str, Any]):
+        self.schema_id: str = raw_element.get("schemaId")
+        self.version: str = raw_element.get("version")
+        self.display_name: str = raw_element.get("displayName")
+        self.description: Optional[str] = raw_element.get("description")
+        self.allowed_scopes: List[str] = raw_element.get("allowedScopes", [])
+        self.multi_object: bool = raw_element.get("multiObject", False)
+        self.max_objects: Optional[int] = raw_element.get("maxObjects")
+        # Kept as raw dictionaries, they are only walked by the local validation
+        self.properties: Dict[str, Any] = raw_element.get("properties", {})
+        self.types: Dict[str, Any] = raw_element.get("types", {})
+        self.enums: Dict[str, Any] = raw_element.get("enums", {})
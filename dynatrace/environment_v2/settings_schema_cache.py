@@ -0,0 +1,255 @@
+"""
+Copyright 2021 Dynatrace LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import json
+import re
+import threading
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Union
+
+from dynatrace.environment_v2.settings import SettingService, SchemaDefinition, SettingsObjectCreate
+from dynatrace.utils import atomic_write, slugify, parallel_map
+
+
+class SettingsSchemaCache:
+    """Keeps settings schema definitions on disk, so settings objects can be validated without a network call.
+
+    Definitions are stored per schema and version, a version never changes once published.
+    The latest version of every schema is recorded by sync(), which only downloads versions not yet on disk.
+    """
+
+    INDEX_FILE = "index.json"
+
+    def __init__(self, settings: SettingService, directory: Union[str, Path]):
+        self.__settings = settings
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.__lock = threading.Lock()
+        self.__definitions: Dict[tuple, SchemaDefinition] = {}
+        self.__latest: Dict[str, str] = {}
+        index_path = self.directory / self.INDEX_FILE
+        if index_path.exists():
+            with open(index_path, encoding="utf-8") as f:
+                self.__latest = json.load(f)
+
+    def sync(self, schema_ids: Optional[List[str]] = None, workers: int = 8) -> List[str]:
+        """Downloads the latest version of every schema that is not cached yet
+
+        :param schema_ids: only sync these schemas. Defaults to all schemas in the environment
+        :param workers: how many definitions are downloaded in parallel
+        :return: the IDs of the schemas that were downloaded
+        """
+        latest = {s.schema_id: s.latest_schema_version for s in self.__settings.list_schemas()}
+        if schema_ids is not None:
+            latest = {schema_id: version for schema_id, version in latest.items() if schema_id in schema_ids}
+
+        missing = [(schema_id, version) for schema_id, version in latest.items() if not self.__path(schema_id, version).exists()]
+        downloaded = [d.schema_id for d in parallel_map(lambda s: self.__download(*s), missing, workers)]
+
+        with self.__lock:
+            self.__latest.update(latest)
+            self.__write_index()
+        return downloaded
+
+    def get(self, schema_id: str, schema_version: Optional[str] = None) -> SchemaDefinition:
+        """Gets a schema definition, from memory, disk or the API in that order
+
+        :param schema_id: the ID of the schema
+        :param schema_version: the version of the schema. Defaults to the latest version known to the cache
+        """
+        version = schema_version or self.__latest.get(schema_id)
+        if version is not None:
+            definition = self.__definitions.get((schema_id, version))
+            if definition is not None:
+                return definition
+            path = self.__path(schema_id, version)
+            if path.exists():
+                with open(path, encoding="utf-8") as f:
+                    definition = SchemaDefinition(raw_element=json.load(f))
+                self.__definitions[(schema_id, version)] = definition
+                return definition
+
+        definition = self.__download(schema_id, version)
+        if schema_version is None:
+            with self.__lock:
+                self.__latest[schema_id] = definition.version
+                self.__write_index()
+        return definition
+
+    def validate(self, settings_object: SettingsObjectCreate) -> List[str]:
+        """Validates a settings object against its schema
+
+        Types, enums, required properties, preconditions and the most common constraints are checked.
+        Constraints that need server side data (e.g. custom validators) are left to the API.
+
+        :return: a list of errors, empty if the object is valid
+        """
+        schema = self.get(settings_object.schema_id, settings_object.schema_version)
+        errors = []
+        if schema.allowed_scopes and _scope_type(settings_object.scope) not in schema.allowed_scopes:
+            errors.append(f"scope '{settings_object.scope}' is not allowed, use one of {schema.allowed_scopes}")
+        _validate_properties(schema, schema.properties, settings_object.value, "", errors)
+        return [f"{settings_object.schema_id}: {e}" for e in errors]
+
+    def check(self, settings_objects: Union[List[SettingsObjectCreate], SettingsObjectCreate]):
+        """Validates settings objects, raising a ValueError with all the errors found if any is invalid"""
+        if isinstance(settings_objects, SettingsObjectCreate):
+            settings_objects = [settings_objects]
+        errors = [e for o in settings_objects for e in self.validate(o)]
+        if errors:
+            raise ValueError("Invalid settings objects:\n" + "\n".join(errors))
+
+    def __download(self, schema_id: str, schema_version: Optional[str]) -> SchemaDefinition:
+        definition = self.__settings.get_schema(schema_id, schema_version)
+        path = self.__path(schema_id, definition.version)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(path, json.dumps(definition.json()))
+        self.__definitions[(schema_id, definition.version)] = definition
+        return definition
+
+    def __path(self, schema_id: str, schema_version: str) -> Path:
+        return self.directory / slugify(schema_id) / f"{slugify(schema_version)}.json"
+
+    def __write_index(self):
+        atomic_write(self.directory / self.INDEX_FILE, json.dumps(self.__latest, indent=2, sort_keys=True))
+
+
+def _scope_type(scope: str) -> str:
+    if scope == "environment":
+        return scope
+    return scope.split("-")[0]
+
+
+def _precondition_met(precondition: Optional[Dict[str, Any]], value: Dict[str, Any]) -> bool:
+    if not precondition:
+        return True
+    precondition_type = precondition.get("type")
+    if precondition_type == "EQUALS":
+        return value.get(precondition.get("property")) == precondition.get("expectedValue")
+    if precondition_type == "IN":
+        return value.get(precondition.get("property")) in precondition.get("expectedValues", [])
+    if precondition_type == "NULL":
+        return value.get(precondition.get("property")) is None
+    if precondition_type == "NOT":
+        return not _precondition_met(precondition.get("precondition"), value)
+    if precondition_type == "AND":
+        return all(_precondition_met(p, value) for p in precondition.get("preconditions", []))
+    if precondition_type == "OR":
+        return any(_precondition_met(p, value) for p in precondition.get("preconditions", []))
+    # Unknown preconditions are assumed to hold, the API has the final word
+    return True
+
+
+def _validate_properties(schema: SchemaDefinition, properties: Dict[str, Any], value: Any, path: str, errors: List[str]):
+    if not isinstance(value, dict):
+        errors.append(f"{path or 'value'}: expected an object")
+        return
+    for key in value:
+        if key not in properties:
+            errors.append(f"{path}{key}: unknown property")
+    for key, definition in properties.items():
+        if not _precondition_met(definition.get("precondition"), value):
+            continue
+        if value.get(key) is None:
+            if not definition.get("nullable", False):
+                errors.append(f"{path}{key}: required property is missing")
+            continue
+        _validate_value(schema, definition, value[key], f"{path}{key}", errors)
+
+
+def _validate_value(schema: SchemaDefinition, definition: Dict[str, Any], value: Any, path: str, errors: List[str]):
+    value_type = definition.get("type")
+
+    if isinstance(value_type, dict):
+        ref = value_type.get("$ref", "")
+        if ref.startswith("#/enums/"):
+            enum = schema.enums.get(ref[len("#/enums/"):], {})
+            allowed = [item.get("value") for item in enum.get("items", [])]
+            if value not in allowed:
+                errors.append(f"{path}: '{value}' is not one of {allowed}")
+        elif ref.startswith("#/types/"):
+            struct = schema.types.get(ref[len("#/types/"):], {})
+            _validate_properties(schema, struct.get("properties", {}), value, f"{path}.", errors)
+        return
+
+    if value_type in ("list", "set"):
+        if not isinstance(value, list):
+            errors.append(f"{path}: expected a {value_type}")
+            return
+        if definition.get("minObjects") is not None and len(value) < definition["minObjects"]:
+            errors.append(f"{path}: needs at least {definition['minObjects']} items")
+        if definition.get("maxObjects") is not None and len(value) > definition["maxObjects"]:
+            errors.append(f"{path}: allows at most {definition['maxObjects']} items")
+        if value_type == "set" and len({json.dumps(v, sort_keys=True) for v in value}) != len(value):
+            errors.append(f"{path}: contains duplicate items")
+        for i, item in enumerate(value):
+            _validate_value(schema, definition.get("items", {}), item, f"{path}[{i}]", errors)
+        return
+
+    if value_type == "boolean":
+        if not isinstance(value, bool):
+            errors.append(f"{path}: expected a boolean")
+            return
+    elif value_type == "integer":
+        if isinstance(value, bool) or not isinstance(value, int):
+            errors.append(f"{path}: expected an integer")
+            return
+    elif value_type == "float":
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            errors.append(f"{path}: expected a number")
+            return
+    elif value_type is not None:
+        # text, secret, dates and times are all sent as strings
+        if not isinstance(value, str):
+            errors.append(f"{path}: expected a string")
+            return
+
+    for constraint in definition.get("constraints", []):
+        _check_constraint(constraint, value, path, errors)
+
+
+def _check_constraint(constraint: Dict[str, Any], value: Any, path: str, errors: List[str]):
+    constraint_type = constraint.get("type")
+    if constraint_type == "LENGTH" and isinstance(value, str):
+        if constraint.get("minLength") is not None and len(value) < constraint["minLength"]:
+            errors.append(f"{path}: must be at least {constraint['minLength']} characters long")
+        if constraint.get("maxLength") is not None and len(value) > constraint["maxLength"]:
+            errors.append(f"{path}: must be at most {constraint['maxLength']} characters long")
+    elif constraint_type == "RANGE" and isinstance(value, (int, float)):
+        if constraint.get("minimum") is not None and value < constraint["minimum"]:
+            errors.append(f"{path}: must be at least {constraint['minimum']}")
+        if constraint.get("maximum") is not None and value > constraint["maximum"]:
+            errors.append(f"{path}: must be at most {constraint['maximum']}")
+    elif constraint_type == "NOT_BLANK" and isinstance(value, str):
+        if not value.strip():
+            errors.append(f"{path}: must not be blank")
+    elif constraint_type == "NOT_EMPTY" and isinstance(value, (str, list)):
+        if len(value) == 0:
+            errors.append(f"{path}: must not be empty")
+    elif constraint_type == "TRIMMED" and isinstance(value, str):
+        if value != value.strip():
+            errors.append(f"{path}: must not start or end with whitespace")
+    elif constraint_type == "NO_WHITESPACE" and isinstance(value, str):
+        if re.search(r"\s", value):
+            errors.append(f"{path}: must not contain whitespace")
+    elif constraint_type == "PATTERN" and isinstance(value, str) and constraint.get("pattern"):
+        try:
+            matches = re.fullmatch(constraint["pattern"], value) is not None
+        except re.error:
+            # Schema patterns are Java regexes, the ones Python can't compile are left for the API to check
+            matches = True
+        if not matches:
+            errors.append(f"{path}: must match '{constraint['pattern']}'")
@@ -29,6 +29,15 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 TOO_MANY_REQUESTS_WAIT = "wait"
 
 
+class HttpError(Exception):
+    """Raised by HttpClient.make_request for responses with a status code of 400 or more"""
+
+    def __init__(self, message: str, response: requests.Response):
+        super().__init__(message)
+        self.response = response
+        self.status_code: int = response.status_code
+
+
 class DynatraceRetry(Retry):
     def get_backoff_time(self):
         return self.backoff_factor
@@ -107,7 +116,15 @@ class HttpClient:
         self.mc_sso_csrf_cookie = mc_sso_csrf_cookie
 
     def make_request(
-        self, path: str, params: Optional[Any] = None, headers: Optional[Dict] = None, method="GET", data=None, files=None, query_params=None
+        self,
+        path: str,
+        params: Optional[Any] = None,
+        headers: Optional[Dict] = None,
+        method="GET",
+        data=None,
+        files=None,
+        query_params=None,
+        stream: bool = False,
     ) -> requests.Response:
         url = f"{self.base_url}{path}"
 
@@ -133,16 +150,27 @@ class HttpClient:
             print(method, url)
             if body:
                 print(json.dumps(body, indent=2))
-        r = self.session.request(method, url, headers=request_headers, params=params, json=body, verify=False, proxies=self.proxies, data=data, cookies=cookies, files=files, timeout=self.timeout)
+        request_kwargs = dict(headers=request_headers, params=params, json=body, verify=False, proxies=self.proxies, data=data, cookies=cookies, files=files, timeout=self.timeout, stream=stream)
+        r = self.session.request(method, url, **request_kwargs)
         self.log.debug(f"Received response '{r}'")
 
         while r.status_code == 429 and self.too_many_requests_strategy == TOO_MANY_REQUESTS_WAIT:
             sleep_amount = int(r.headers.get("retry-after", 5))
             self.log.warning(f"Sleeping for {sleep_amount}s because we have received an HTTP 429")
             time.sleep(sleep_amount)
-            r = self.session.request(method, url, headers=request_headers, params=params, json=body, verify=False, proxies=self.proxies, timeout=self.timeout)
+            _rewind(data, files)
+            r = self.session.request(method, url, **request_kwargs)
 
         if r.status_code >= 400:
-            raise Exception(f"Error making request to {url}: {r}. Response: {r.text}")
+            raise HttpError(f"Error making request to {url}: {r}. Response: {r.text}", r)
 
         return r
+
+
+def _rewind(data, files):
+    """Seeks the file objects of a request body back to their start, so the body can be sent again"""
+    # files is a dict or a list of (field, value) tuples, values are a file or a (filename, file, ...) tuple
+    values = list(files.values()) if isinstance(files, dict) else [value for _, value in files or []]
+    for body in [data, *(value[1] if isinstance(value, tuple) else value for value in values)]:
+        if hasattr(body, "seek"):
+            body.seek(0)
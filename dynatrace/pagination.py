@@ -14,7 +14,7 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
-from typing import Generic, TypeVar, Iterator, TYPE_CHECKING
+from typing import Generic, TypeVar, Iterator, TYPE_CHECKING, Dict, Any
 
 from dynatrace.dynatrace_object import DynatraceObject
 from dynatrace.http_client import HttpClient
@@ -33,6 +33,8 @@ class PaginatedList(Generic[T]):
         self._has_next_page = True
         self.__total_count = None
         self.__page_size = None
+        # Top level fields of the responses other than the elements, e.g. the resolution of a metric query
+        self.metadata: Dict[str, Any] = {}
 
         self.__elements = self._get_next_page()
 
@@ -61,6 +63,8 @@ class PaginatedList(Generic[T]):
         else:
             self._has_next_page = False
 
+        self.metadata.update({key: value for key, value in json_response.items() if key not in (self.__list_item, "nextPageKey")})
+
         if self.__list_item in json_response:
             elements = json_response[self.__list_item]
             self.__total_count = json_response.get("totalCount") or len(elements)
@@ -69,6 +73,19 @@ class PaginatedList(Generic[T]):
         return data
 
 
+def iter_pages(http_client: HttpClient, target_url: str, target_params=None, headers=None) -> Iterator[Dict[str, Any]]:
+    """Yields the raw JSON of every page of a paginated endpoint, fetching the next page only when it is needed.
+
+    Useful to process large results page by page without building a DynatraceObject per element.
+    """
+    while True:
+        json_response = http_client.make_request(target_url, params=target_params, headers=headers).json()
+        yield json_response
+        if not json_response.get("nextPageKey", None):
+            return
+        target_params = {"nextPageKey": json_response["nextPageKey"]}
+
+
 class HeaderPaginatedList(Generic[T]):
     def __init__(self, target_class, http_client, target_url, target_params=None, headers=None):
         self.__elements = list()
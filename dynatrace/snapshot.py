@@ -0,0 +1,236 @@
+"""
+Copyright 2021 Dynatrace LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import hashlib
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from dynatrace.configuration_v1.hydration import get_full_object
+from dynatrace.main import Dynatrace
+from dynatrace.utils import atomic_write, parallel_map, parallel_map_unordered
+
+CONFIG_V1_KINDS = (
+    "auto_tags",
+    "management_zones",
+    "dashboards",
+    "alerting_profiles",
+    "notifications",
+    "metric_events",
+    "maintenance_windows",
+)
+
+
+class SnapshotResult:
+    def __init__(self):
+        self.fetched: int = 0
+        self.written: int = 0
+        self.unchanged: int = 0
+        self.removed: int = 0
+        self.errors: List[str] = []
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}(fetched={self.fetched}, written={self.written}, unchanged={self.unchanged}, "
+            f"removed={self.removed}, errors={len(self.errors)})"
+        )
+
+
+class ConfigurationSnapshot:
+    """Backs up the configuration of a tenant to a directory, only transferring and writing what changed.
+
+    Every object is stored once under objects/, named after the hash of its content, and manifest.json maps
+    each object key (e.g. "dashboards/<id>" or "settings/<schemaId>/<objectId>") to its content hash.
+    A copy of the manifest is kept per run under manifests/, so older snapshots can still be restored.
+
+    Settings objects are first listed without their value, and only fetched if their updateToken changed.
+    Config v1 lists only return stubs without a version, so those objects are always fetched (concurrently)
+    and skipped on write when their content hash is unchanged.
+    """
+
+    MANIFEST_FILE = "manifest.json"
+    SETTINGS_LIST_FIELDS = "objectId,updateToken,schemaId,scope"
+
+    def __init__(
+        self,
+        dt: Dynatrace,
+        directory: Union[str, Path],
+        kinds: Iterable[str] = CONFIG_V1_KINDS,
+        include_settings: bool = True,
+        workers: int = 8,
+    ):
+        self.__dt = dt
+        self.directory = Path(directory)
+        self.kinds = list(kinds)
+        self.include_settings = include_settings
+        self.workers = workers
+
+        unknown = set(self.kinds) - set(CONFIG_V1_KINDS)
+        if unknown:
+            raise ValueError(f"Unknown kinds {sorted(unknown)}, use any of {CONFIG_V1_KINDS}")
+
+    def __listers(self) -> Dict[str, Callable[[], Iterable]]:
+        return {
+            "auto_tags": self.__dt.auto_tags.list,
+            "management_zones": self.__dt.management_zones.list,
+            "dashboards": self.__dt.dashboards.list,
+            "alerting_profiles": self.__dt.alerting_profiles.list,
+            "notifications": self.__dt.notifications.list,
+            "metric_events": self.__dt.anomaly_detection_metric_events.list,
+            "maintenance_windows": self.__dt.maintenance_windows.list,
+        }
+
+    def run(self) -> SnapshotResult:
+        """Takes a snapshot, reusing whatever is already in the directory
+
+        Listing or fetching errors don't abort the run, they are reported in the result
+        and the previous entries for the affected objects are kept in the manifest.
+        """
+        previous = self.read_manifest()
+        manifest: Dict[str, Dict[str, Any]] = {}
+        result = SnapshotResult()
+
+        self.__snapshot_config_v1(previous, manifest, result)
+        if self.include_settings:
+            self.__snapshot_settings(previous, manifest, result)
+
+        result.removed = len(set(previous) - set(manifest))
+        self.__write_manifest(manifest)
+        return result
+
+    def read_manifest(self) -> Dict[str, Dict[str, Any]]:
+        path = self.directory / self.MANIFEST_FILE
+        if not path.exists():
+            return {}
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def read_object(self, key: str) -> Dict[str, Any]:
+        """Reads the content of an object of the current snapshot, e.g. read_object("dashboards/<id>")"""
+        content_hash = self.read_manifest()[key]["hash"]
+        with open(self.__object_path(content_hash), encoding="utf-8") as f:
+            return json.load(f)
+
+    def __snapshot_config_v1(self, previous: Dict[str, Dict[str, Any]], manifest: Dict[str, Dict[str, Any]], result: SnapshotResult):
+        listers = self.__listers()
+
+        def list_kind(kind: str) -> Tuple[str, Optional[List], Optional[str]]:
+            try:
+                return kind, list(listers[kind]()), None
+            except Exception as e:
+                return kind, None, f"{e}"
+
+        stubs = []
+        for kind, kind_stubs, error in parallel_map(list_kind, self.kinds, self.workers):
+            if error is not None:
+                result.errors.append(f"Could not list {kind}: {error}")
+                self.__keep_previous(previous, manifest, f"{kind}/")
+                continue
+            stubs.extend((kind, stub) for stub in kind_stubs)
+
+        def fetch(item: Tuple[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+            try:
+                return get_full_object(item[1]).json(), None
+            except Exception as e:
+                return None, f"{e}"
+
+        for (kind, stub), (raw, error) in parallel_map_unordered(fetch, stubs, self.workers):
+            key = f"{kind}/{stub.id}"
+            if error is not None:
+                result.errors.append(f"Could not fetch {key}: {error}")
+                if key in previous:
+                    manifest[key] = previous[key]
+                continue
+            result.fetched += 1
+            versions = (raw.get("metadata") or {}).get("configurationVersions")
+            manifest[key] = self.__store(raw, previous.get(key), result)
+            manifest[key]["configurationVersions"] = versions
+
+    def __snapshot_settings(self, previous: Dict[str, Dict[str, Any]], manifest: Dict[str, Dict[str, Any]], result: SnapshotResult):
+        settings = self.__dt.settings
+        try:
+            schema_ids = [s.schema_id for s in settings.list_schemas()]
+        except Exception as e:
+            result.errors.append(f"Could not list settings schemas: {e}")
+            self.__keep_previous(previous, manifest, "settings/")
+            return
+
+        def list_schema(schema_id: str) -> Tuple[str, Optional[List], Optional[str]]:
+            try:
+                return schema_id, list(settings.list_objects(schema_id=schema_id, fields=self.SETTINGS_LIST_FIELDS, page_size=500)), None
+            except Exception as e:
+                return schema_id, None, f"{e}"
+
+        changed = []
+        for schema_id, objects, error in parallel_map(list_schema, schema_ids, self.workers):
+            if error is not None:
+                result.errors.append(f"Could not list settings of {schema_id}: {error}")
+                self.__keep_previous(previous, manifest, f"settings/{schema_id}/")
+                continue
+            for o in objects:
+                key = f"settings/{schema_id}/{o.object_id}"
+                if o.update_token and previous.get(key, {}).get("updateToken") == o.update_token:
+                    manifest[key] = previous[key]
+                    result.unchanged += 1
+                else:
+                    changed.append((key, o.object_id))
+
+        def fetch(item: Tuple[str, str]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+            try:
+                return settings.get_object(item[1]).json(), None
+            except Exception as e:
+                return None, f"{e}"
+
+        for (key, object_id), (raw, error) in parallel_map_unordered(fetch, changed, self.workers):
+            if error is not None:
+                result.errors.append(f"Could not fetch {key}: {error}")
+                if key in previous:
+                    manifest[key] = previous[key]
+                continue
+            result.fetched += 1
+            manifest[key] = self.__store(raw, previous.get(key), result)
+            manifest[key]["updateToken"] = raw.get("updateToken")
+
+    def __store(self, raw: Dict[str, Any], previous_entry: Optional[Dict[str, Any]], result: SnapshotResult) -> Dict[str, Any]:
+        content = json.dumps(raw, sort_keys=True, indent=2, ensure_ascii=False).encode("utf-8")
+        content_hash = hashlib.sha256(content).hexdigest()
+        if previous_entry is not None and previous_entry.get("hash") == content_hash:
+            result.unchanged += 1
+        path = self.__object_path(content_hash)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write(path, content)
+            result.written += 1
+        return {"hash": content_hash}
+
+    def __object_path(self, content_hash: str) -> Path:
+        return self.directory / "objects" / content_hash[:2] / f"{content_hash}.json"
+
+    @staticmethod
+    def __keep_previous(previous: Dict[str, Dict[str, Any]], manifest: Dict[str, Dict[str, Any]], prefix: str):
+        manifest.update({key: entry for key, entry in previous.items() if key.startswith(prefix)})
+
+    def __write_manifest(self, manifest: Dict[str, Dict[str, Any]]):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        content = json.dumps(manifest, sort_keys=True, indent=2)
+
+        history = self.directory / "manifests"
+        history.mkdir(exist_ok=True)
+        timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        (history / f"{timestamp}.json").write_text(content, encoding="utf-8")
+
+        atomic_write(self.directory / self.MANIFEST_FILE, content)
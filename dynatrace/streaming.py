@@ -0,0 +1,299 @@
+"""
+Copyright 2021 Dynatrace LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Optional, Union
+
+from requests import Response
+
+from dynatrace.http_client import HttpClient
+from dynatrace.utils import atomic_write, parallel_map_unordered
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+DEFAULT_PART_SIZE = 16 * 1024 * 1024
+
+Destination = Union[str, Path, BinaryIO]
+ProgressCallback = Callable[[int, int], None]
+
+
+class DownloadResult:
+    def __init__(self, path: Optional[Path], size: int, sha256: str, etag: Optional[str], verified: bool):
+        self.path: Optional[Path] = path
+        self.size: int = size
+        self.sha256: str = sha256
+        self.etag: Optional[str] = etag
+        self.verified: bool = verified
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(path={self.path}, size={self.size}, sha256={self.sha256}, verified={self.verified})"
+
+
+def write_response(
+    response: Response,
+    destination: Destination,
+    expected_sha256: Optional[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> DownloadResult:
+    """Writes the body of a streamed response in chunks, computing its sha256 along the way
+
+    When the destination is a path, the body is written to "<path>.part" and only moved to the path once it is
+    complete and verified, so a failed download never leaves a truncated or corrupted file behind.
+
+    :param response: a response of a request made with stream=True
+    :param destination: a file path, or a binary file-like object that is written to but not closed
+    :param expected_sha256: the expected sha256 of the body, as a hex string. Raises a ValueError if it doesn't match
+    :param chunk_size: how many bytes are held in memory at a time
+    """
+    digest = hashlib.sha256()
+    size = 0
+    path = None
+    try:
+        if isinstance(destination, (str, Path)):
+            path = Path(destination)
+            part_path = path.with_name(f"{path.name}.part")
+            with open(part_path, "wb") as f:
+                size = _copy(response, f, digest, chunk_size)
+        else:
+            size = _copy(response, destination, digest, chunk_size)
+    finally:
+        response.close()
+
+    sha256 = digest.hexdigest()
+    if expected_sha256 is not None and sha256 != expected_sha256.strip().lower():
+        if path is not None:
+            part_path.unlink()
+        raise ValueError(f"Checksum mismatch for {path or 'download'}: expected sha256 {expected_sha256}, got {sha256}")
+    if path is not None:
+        part_path.replace(path)
+    return DownloadResult(path, size, sha256, response.headers.get("ETag"), expected_sha256 is not None)
+
+
+def _copy(response: Response, f: BinaryIO, digest, chunk_size: int) -> int:
+    size = 0
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        if chunk:
+            f.write(chunk)
+            digest.update(chunk)
+            size += len(chunk)
+    return size
+
+
+def download_ranged(
+    http_client: HttpClient,
+    path: str,
+    destination: Union[str, Path],
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    workers: int = 4,
+    part_size: int = DEFAULT_PART_SIZE,
+    expected_sha256: Optional[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> DownloadResult:
+    """Downloads a file with parallel HTTP Range requests, resuming a previous attempt if one was interrupted
+
+    The parts are written in place into "<destination>.part", and the parts already written are recorded in
+    "<destination>.part.json". Calling this again after a failure only downloads the missing parts, as long as
+    the size and ETag of the file did not change. Once all parts are there, the file is hashed, verified and
+    moved to the destination. Servers that don't support ranges, or reject the HEAD request, get a single streamed
+    download instead.
+
+    :param http_client: the client used for the requests
+    :param path: the path of the file, e.g. "/api/v1/deployment/installer/gateway/unix/latest"
+    :param destination: the file path to write to
+    :param params: the query parameters of the request
+    :param headers: additional headers of the request
+    :param workers: how many parts are downloaded at the same time
+    :param part_size: the size in bytes of every range request
+    :param expected_sha256: the sha256 the file must have, a ValueError is raised if it doesn't
+    :param chunk_size: how many bytes each worker holds in memory at a time
+    """
+    destination = Path(destination)
+    try:
+        head = http_client.make_request(path, params=params, headers=headers, method="HEAD")
+    except Exception:
+        # Some servers and proxies reject HEAD (405, 403), the file can still be downloaded in one piece
+        head = None
+    size = int(head.headers.get("Content-Length") or 0) if head is not None else 0
+    etag = head.headers.get("ETag") if head is not None else None
+    if head is None or head.headers.get("Accept-Ranges", "").lower() != "bytes" or size <= 0:
+        return write_response(http_client.make_request(path, params=params, headers=headers, stream=True), destination, expected_sha256, chunk_size)
+
+    part_path = destination.with_name(f"{destination.name}.part")
+    state_path = destination.with_name(f"{destination.name}.part.json")
+    state = _read_state(state_path)
+    if not part_path.exists() or state.get("size") != size or state.get("etag") != etag or state.get("partSize") != part_size:
+        state = {"size": size, "etag": etag, "partSize": part_size, "done": []}
+        with open(part_path, "wb") as f:
+            f.truncate(size)
+        _write_state(state_path, state)
+
+    lock = threading.Lock()
+    done = set(state["done"])
+    missing = [i for i in range((size + part_size - 1) // part_size) if i not in done]
+
+    def fetch(index: int):
+        start = index * part_size
+        end = min(start + part_size, size) - 1
+        range_headers = dict(headers or {}, Range=f"bytes={start}-{end}")
+        if etag:
+            range_headers["If-Range"] = etag
+        response = http_client.make_request(path, params=params, headers=range_headers, stream=True)
+        try:
+            if response.status_code != 206:
+                raise Exception(f"Expected a partial response for bytes {start}-{end} of {path}, got HTTP {response.status_code}")
+            written = 0
+            with open(part_path, "r+b") as f:
+                f.seek(start)
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    f.write(chunk)
+                    written += len(chunk)
+            if written != end - start + 1:
+                raise Exception(f"Received {written} bytes for bytes {start}-{end} of {path}")
+        finally:
+            response.close()
+        with lock:
+            state["done"].append(index)
+            _write_state(state_path, state)
+
+    for _ in parallel_map_unordered(fetch, missing, workers):
+        pass
+
+    digest = hashlib.sha256()
+    with open(part_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    sha256 = digest.hexdigest()
+    if expected_sha256 is not None and sha256 != expected_sha256.strip().lower():
+        part_path.unlink()
+        state_path.unlink()
+        raise ValueError(f"Checksum mismatch for {destination}: expected sha256 {expected_sha256}, got {sha256}")
+
+    part_path.replace(destination)
+    state_path.unlink()
+    return DownloadResult(destination, size, sha256, etag, expected_sha256 is not None)
+
+
+def _read_state(state_path: Path) -> Dict[str, Any]:
+    if not state_path.exists():
+        return {}
+    try:
+        with open(state_path, encoding="utf-8") as f:
+            return json.load(f)
+    except ValueError:
+        return {}
+
+
+def _write_state(state_path: Path, state: Dict[str, Any]):
+    atomic_write(state_path, json.dumps(state))
+
+
+class MultipartFileEncoder:
+    """A multipart/form-data body with a single file field, read from disk in chunks while it is being sent
+
+    Pass it as the data of a request, together with its content_type header. Its length is known up front, so
+    the request is sent with a Content-Length instead of being chunked, and only one chunk of the file is held
+    in memory at a time.
+
+    :param path: the file to upload
+    :param field_name: the name of the form field
+    :param content_type: the content type of the file part
+    :param progress: called with (bytes sent, total bytes) every time a chunk is read
+    :param chunk_size: how many bytes are read from the file at a time
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        field_name: str = "file",
+        content_type: str = "application/octet-stream",
+        progress: Optional[ProgressCallback] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ):
+        self.path = Path(path)
+        self.boundary = uuid.uuid4().hex
+        self.progress = progress
+        self.chunk_size = chunk_size
+        self.__head = (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="{field_name}"; filename="{self.path.name}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode()
+        self.__tail = f"\r\n--{self.boundary}--\r\n".encode()
+        self.__file_size = os.path.getsize(self.path)
+        self.__file: Optional[BinaryIO] = None
+        self.__position = 0
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self):
+        return len(self.__head) + self.__file_size + len(self.__tail)
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = len(self)
+        size = min(size, self.chunk_size)
+        chunk = b""
+        head_end = len(self.__head)
+        file_end = head_end + self.__file_size
+        if self.__position < head_end:
+            chunk = self.__head[self.__position : self.__position + size]
+        elif self.__position < file_end:
+            if self.__file is None:
+                self.__file = open(self.path, "rb")
+            chunk = self.__file.read(min(size, file_end - self.__position))
+            if not chunk:
+                raise IOError(f"{self.path} was truncated while it was being uploaded")
+        elif self.__position < len(self):
+            chunk = self.__tail[self.__position - file_end : self.__position - file_end + size]
+        if not chunk:
+            self.close()
+            return chunk
+        self.__position += len(chunk)
+        if self.progress is not None:
+            self.progress(self.__position, len(self))
+        return chunk
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        """Only rewinding and seeking to the end are supported, which is what requests needs to resend a body"""
+        if whence == os.SEEK_END:
+            self.__position = len(self) + offset
+        elif offset == 0 and whence == os.SEEK_SET:
+            self.__position = 0
+            self.close()
+        else:
+            raise ValueError("MultipartFileEncoder can only be rewound")
+        return self.__position
+
+    def tell(self) -> int:
+        return self.__position
+
+    def close(self):
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -16,15 +16,27 @@ limitations under the License.
 
 import warnings
 import functools
-from datetime import datetime, timezone
-from typing import Union, Optional
+import hashlib
+import json
+import os
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Union, Optional, Callable, Iterable, Iterator, TypeVar, Tuple
 import unicodedata
 import re
 
 
+T = TypeVar("T")
+R = TypeVar("R")
+
 ISO_8601 = "%Y-%m-%dT%H:%M:%S.%fZ"
 ISO_8601_NO_MS = "%Y-%m-%dT%H:%M:%SZ"
 
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
 
 def slugify(value):
     value = str(value)
@@ -72,3 +84,79 @@ def datetime_to_int64(timestamp: Optional[datetime]) -> Optional[int]:
     if not isinstance(timestamp, datetime):
         return timestamp
     return int(timestamp.replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def now_utc() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def resolution_to_timedelta(resolution: Union[str, timedelta]) -> timedelta:
+    """Converts a duration like "5m", "1h" or "1d", as used for query resolutions, into a timedelta
+
+    Durations without a fixed length ("Inf", months, quarters and years) raise a ValueError.
+    """
+    if isinstance(resolution, timedelta):
+        return resolution
+    match = re.fullmatch(r"(\d+)([smhdw])", resolution.strip())
+    if match is None:
+        raise ValueError(f"Resolution '{resolution}' does not have a fixed length, use a number followed by one of {list(DURATION_UNITS)}")
+    return timedelta(seconds=int(match.group(1)) * DURATION_UNITS[match.group(2)])
+
+
+def fingerprint(raw: Dict[str, Any]) -> bytes:
+    """A short digest of a JSON object, independent of the order of its keys"""
+    return hashlib.blake2b(json.dumps(raw, sort_keys=True, separators=(",", ":")).encode("utf-8"), digest_size=16).digest()
+
+
+def atomic_write(path: Union[str, Path], content: Union[str, bytes]):
+    """Writes content to path through a temporary file next to it, so readers never see a partially written file
+
+    :param path: the file to write, its directory must exist
+    :param content: text is written as UTF-8
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(content.encode("utf-8") if isinstance(content, str) else content)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def parallel_map(func: Callable[[T], R], items: Iterable[T], workers: int = 8) -> Iterator[R]:
+    """Applies func to every item using a pool of threads, yielding the results in the same order as items.
+
+    At most 2 * workers calls are in flight at any time, so items can be a lazy iterable (e.g. a PaginatedList)
+    and results are streamed back as soon as the next one in order is ready.
+    Exceptions raised by func are re-raised when the corresponding result is reached.
+    """
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def parallel_map_unordered(func: Callable[[T], R], items: Iterable[T], workers: int = 8) -> Iterator[Tuple[T, R]]:
+    """Applies func to every item using a pool of threads, yielding (item, result) tuples as soon as they complete.
+
+    Exceptions raised by func are re-raised when the corresponding result is reached.
+    """
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {}
+        for item in items:
+            pending[executor.submit(func, item)] = item
+            if len(pending) >= 2 * workers:
+                done = next(as_completed(pending))
+                yield pending.pop(done), done.result()
+        for future in as_completed(list(pending)):
+            yield pending.pop(future), future.result()
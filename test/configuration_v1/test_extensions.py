@@ -1,5 +1,10 @@
+import hashlib
+import json
+import zipfile
 from datetime import datetime
 
+import pytest
+
 from dynatrace import Dynatrace
 from dynatrace.configuration_v1.extensions import (
     ExtensionDto,
@@ -99,3 +104,25 @@ def test_list_activegate_extension_modules(dt: Dynatrace):
     assert isinstance(first, EntityShortRepresentation)
     assert first.id == "-7885258652650793909"
     assert first.name == "arch-david"
+
+
+def test_download_binary(dt: Dynatrace, tmp_path):
+    content = b'"' + b"binary-content-" * 100 + b'"'
+    result = dt.extensions.download_binary("custom.python.demo", tmp_path / "demo.zip", expected_sha256=hashlib.sha256(content).hexdigest())
+    assert result.verified
+    assert (tmp_path / "demo.zip").read_bytes() == content
+
+
+def test_post_and_validate_locally(dt: Dynatrace, tmp_path):
+    zip_path = tmp_path / "custom.python.ci_build.zip"
+    with zipfile.ZipFile(zip_path, "w") as archive:
+        archive.writestr("custom.python.ci_build/plugin.json", json.dumps({"name": "custom.python.ci_build", "version": "1.0", "type": "python"}))
+        archive.writestr("custom.python.ci_build/ci_build.py", "")
+    extension = dt.extensions.post(str(zip_path), validate_locally=True)
+    assert extension.id == "custom.python.ci_build"
+
+    broken_path = tmp_path / "broken.zip"
+    with zipfile.ZipFile(broken_path, "w") as archive:
+        archive.writestr("custom.python.broken/plugin.json", json.dumps({"name": "custom.python.broken"}))
+    with pytest.raises(ValueError, match="version, type"):
+        dt.extensions.validate(str(broken_path), validate_locally=True)
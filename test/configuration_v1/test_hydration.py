@@ -0,0 +1,50 @@
+import pytest
+
+from dynatrace import Dynatrace
+from dynatrace.configuration_v1.alerting_profiles import AlertingProfile
+from dynatrace.configuration_v1.extensions import ExtensionConfigurationDto, ExtensionShortRepresentation
+from dynatrace.configuration_v1.hydration import hydrate, iter_hydrate, hydrate_as_completed
+from dynatrace.configuration_v1.maintenance_windows import MaintenanceWindow
+from dynatrace.configuration_v1.metric_events import MetricEvent
+
+METRIC_EVENT_IDS = ["ruxit.python.rabbitmq:node_status:node_failed", "d3baaaed-3441-4931-bf24-25c4e12e137f"]
+ALERTING_PROFILE_ID = "b1f379d9-98b4-4efe-be38-0289609c9295"
+MAINTENANCE_WINDOW_ID = "b6376a12-0b82-4069-9a41-0e55ef9a1f44"
+
+
+def mixed_stubs(dt: Dynatrace):
+    metric_events = [m for m in dt.anomaly_detection_metric_events.list() if m.id in METRIC_EVENT_IDS]
+    alerting_profiles = [a for a in dt.alerting_profiles.list() if a.id == ALERTING_PROFILE_ID]
+    maintenance_windows = [m for m in dt.maintenance_windows.list() if m.id == MAINTENANCE_WINDOW_ID]
+    return metric_events + alerting_profiles + maintenance_windows
+
+
+def test_hydrate_keeps_order(dt: Dynatrace):
+    stubs = mixed_stubs(dt)
+    full = hydrate(stubs, workers=3)
+    assert [type(f) for f in full] == [MetricEvent, MetricEvent, AlertingProfile, MaintenanceWindow]
+    assert [f.id for f in full] == [s.id for s in stubs]
+
+
+def test_iter_hydrate(dt: Dynatrace):
+    stubs = mixed_stubs(dt)
+    assert [f.id for f in iter_hydrate(iter(stubs), workers=1)] == [s.id for s in stubs]
+
+
+def test_hydrate_as_completed(dt: Dynatrace):
+    stubs = mixed_stubs(dt)
+    pairs = list(hydrate_as_completed(stubs, workers=2))
+    assert len(pairs) == len(stubs)
+    assert all(stub.id == full.id for stub, full in pairs)
+
+
+def test_hydrate_passes_only_accepted_kwargs(dt: Dynatrace):
+    stubs = mixed_stubs(dt)
+    extension_instance = ExtensionShortRepresentation(stubs[0]._http_client, raw_element={"id": "5649014104314746667", "name": "salesforce"})
+    full = hydrate(stubs + [extension_instance], extension_id="custom.remote.python.salesforce_eventstream")
+    assert [type(f) for f in full] == [MetricEvent, MetricEvent, AlertingProfile, MaintenanceWindow, ExtensionConfigurationDto]
+
+
+def test_hydrate_unknown_stub(dt: Dynatrace):
+    with pytest.raises(TypeError):
+        hydrate([object()])
@@ -17,12 +17,22 @@ current_file_path = os.path.dirname(os.path.realpath(__file__))
 class MockResponse:
     def __init__(self, json_data):
         self.json_data = json_data
+        # An empty mock file stands for a response without a body
+        self.status_code = 200 if json_data is not None else 204
         self.headers = {}
         self.content = json.dumps(json_data).encode() if json_data else None
 
     def json(self):
         return self.json_data
 
+    def iter_content(self, chunk_size=1):
+        content = self.content or b""
+        for start in range(0, len(content), chunk_size):
+            yield content[start : start + chunk_size]
+
+    def close(self):
+        pass
+
 
 def local_make_request(
     self, path: str, params: Optional[Dict] = None, headers: Optional[Dict] = None, method="GET", data=None, query_params=None, **kwargs
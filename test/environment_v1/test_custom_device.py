@@ -0,0 +1,58 @@
+from datetime import datetime, timezone
+
+from unittest import mock
+
+from dynatrace import Dynatrace
+from dynatrace.environment_v1.custom_device import Series, EntityTimeseriesData, DataPoint, CustomDevicePushMessage
+
+TIMESTAMP = datetime(2021, 5, 14, 22, 0, tzinfo=timezone.utc)
+
+
+def series(key, value, dimensions=None):
+    return EntityTimeseriesData(None, key, [DataPoint(value, TIMESTAMP)], dimensions)
+
+
+def test_series_merges_by_id_and_dimensions():
+    s = Series(series("cpu", 1, {"a": "1", "b": "2"}), series("cpu", 2, {"b": "2", "a": "1"}), series("cpu", 3), series("cpu", 4, {}))
+    assert len(s) == 3
+    assert [d.value for d in s[0].data_points] == [1, 2]
+
+    del s[0]
+    s.append(series("cpu", 5, {"a": "1", "b": "2"}))
+    assert len(s) == 3
+
+    s.insert(0, series("mem", 6))
+    s.append(series("mem", 7))
+    assert [d.value for d in s[0].data_points] == [6, 7]
+
+
+def test_absolute_keeps_payload_in_sync(dt: Dynatrace):
+    message = dt.custom_devices.create("device-1", display_name="Device 1")
+    for i in range(3):
+        message.absolute("cpu", i, TIMESTAMP, {"core": "0"})
+    message.absolute("mem", 10, TIMESTAMP)
+
+    payload = message.json()
+    assert payload["displayName"] == "Device 1"
+    assert len(payload["series"]) == 2
+    assert payload["series"][0]["dataPoints"] == [[1621029600000, 0], [1621029600000, 1], [1621029600000, 2]]
+
+
+def test_pusher(dt: Dynatrace):
+    pusher = dt.custom_devices.pusher(workers=4)
+    pusher.device("switch-1", display_name="Switch 1", group="network")
+    for device in ("switch-1", "switch-2", "switch-3"):
+        pusher.absolute(device, "traffic", 1.0, TIMESTAMP, {"port": "1"})
+        pusher.absolute(device, "traffic", 2.0, TIMESTAMP, {"port": "1"})
+    pusher.device("switch-2", display_name="Switch 2")
+
+    with mock.patch.object(CustomDevicePushMessage, "post", autospec=True, side_effect=lambda message, *args: message.json()) as post:
+        results = pusher.flush()
+        assert pusher.flush() == {}
+
+    assert post.call_count == 3
+    assert sorted(results) == ["switch-1", "switch-2", "switch-3"]
+    assert results["switch-1"]["group"] == "network"
+    assert results["switch-2"]["displayName"] == "Switch 2"
+    assert results["switch-3"]["displayName"] is None
+    assert results["switch-2"]["series"][0]["dataPoints"] == [[1621029600000, 1.0], [1621029600000, 2.0]]
@@ -1,4 +1,10 @@
+import hashlib
+import io
+
+import pytest
+
 from dynatrace import Dynatrace
+from dynatrace.streaming import DownloadResult
 from dynatrace.environment_v1.deployment import (
     InstallerMetaInfoDto,
     ConnectionInfo,
@@ -122,3 +128,31 @@ def test_get_lambda_agent_versions(dt: Dynatrace):
     assert versions.java == "Dynatrace_OneAgent_1_221_103_20210713-172057"
     assert versions.python == "Dynatrace_OneAgent_1_221_3_20210624-164237"
     assert versions.nodejs == "Dynatrace_OneAgent_1_221_1_20210618-040655"
+
+
+CONTENT = b'"' + b"binary-content-" * 100 + b'"'
+
+
+def test_download_boshrelease_agent(dt: Dynatrace, tmp_path):
+    path = tmp_path / "agent.tgz"
+
+    # The mocked tarball doesn't match the mocked checksum
+    with pytest.raises(ValueError):
+        dt.deployment.download_boshrelease_agent(path, os_type="unix", version=VERSION)
+    assert list(tmp_path.iterdir()) == []
+
+    result = dt.deployment.download_boshrelease_agent(path, os_type="unix", version=VERSION, verify=False, chunk_size=100)
+    assert isinstance(result, DownloadResult)
+    assert result.path == path
+    assert result.size == len(CONTENT)
+    assert result.sha256 == hashlib.sha256(CONTENT).hexdigest()
+    assert not result.verified
+    assert path.read_bytes() == CONTENT
+
+
+def test_download_orchestration_agent(dt: Dynatrace):
+    out = io.BytesIO()
+    result = dt.deployment.download_orchestration_agent(out, "ansible", expected_sha256=hashlib.sha256(CONTENT).hexdigest().upper(), chunk_size=64)
+    assert result.verified
+    assert result.path is None
+    assert out.getvalue() == CONTENT
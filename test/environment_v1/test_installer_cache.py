@@ -0,0 +1,74 @@
+import hashlib
+from pathlib import Path
+
+from unittest import mock
+import pytest
+
+from dynatrace import Dynatrace
+from dynatrace.environment_v1.installer_cache import InstallerCache
+from dynatrace.streaming import DownloadResult
+
+VERSION = "1.215.159.20210428-145534"
+
+
+class FakeDownload:
+    def __init__(self, content: bytes, etag: str):
+        self.content = content
+        self.etag = etag
+        self.calls = []
+
+    def __call__(self, destination, *args):
+        if_none_match = args[-1]
+        self.calls.append((args, if_none_match))
+        if if_none_match == self.etag:
+            return None
+        Path(destination).write_bytes(self.content)
+        return DownloadResult(Path(destination), len(self.content), hashlib.sha256(self.content).hexdigest(), self.etag, False)
+
+
+def test_agent_installer(dt: Dynatrace, tmp_path):
+    fake = FakeDownload(b"installer-v1", '"etag-1"')
+    with mock.patch.object(dt.deployment, "download_agent_installer", side_effect=fake):
+        cache = InstallerCache(dt.deployment, tmp_path)
+        first = cache.agent_installer("unix", "paas", flavor="musl", arch="x86", bitness="64")
+        assert first.downloaded
+        assert first.version == VERSION
+        assert first.path.read_bytes() == b"installer-v1"
+        # "latest" was resolved before downloading
+        assert fake.calls[0][0][2] == VERSION
+
+        second = InstallerCache(dt.deployment, tmp_path).agent_installer("unix", "paas", flavor="musl", arch="x86", bitness="64")
+        assert not second.downloaded
+        assert second.path == first.path
+        assert fake.calls[1][1] == '"etag-1"'
+
+        InstallerCache(dt.deployment, tmp_path).agent_installer("unix", "paas", VERSION, flavor="musl", arch="x86", bitness="64", revalidate=False)
+        assert len(fake.calls) == 2
+
+        fake.content, fake.etag = b"installer-v2", '"etag-2"'
+        third = cache.agent_installer("unix", "paas", VERSION, flavor="musl", arch="x86", bitness="64")
+        assert third.downloaded
+        assert third.path.read_bytes() == b"installer-v2"
+
+
+def test_gateway_installer_deduplicates(dt: Dynatrace, tmp_path):
+    fake = FakeDownload(b"activegate", '"etag-ag"')
+    with mock.patch.object(dt.deployment, "download_gateway_installer", side_effect=fake):
+        cache = InstallerCache(dt.deployment, tmp_path)
+        latest = cache.gateway_installer("unix")
+        pinned = cache.gateway_installer("unix", "1.215.0.20210428-145534")
+        assert latest.downloaded and pinned.downloaded
+        assert latest.path == pinned.path
+        assert len([p for p in (tmp_path / "objects").rglob("*") if p.is_file()]) == 1
+        assert [p.name for p in tmp_path.iterdir() if p.is_file()] == ["index.json"]
+
+
+def test_failed_download_leaves_no_files(dt: Dynatrace, tmp_path):
+    def failing_download(destination, *args):
+        Path(f"{destination}.part").write_bytes(b"activ")
+        raise ValueError("Checksum mismatch")
+
+    with mock.patch.object(dt.deployment, "download_gateway_installer", side_effect=failing_download):
+        with pytest.raises(ValueError):
+            InstallerCache(dt.deployment, tmp_path).gateway_installer("unix", "1.215.0.20210428-145534")
+    assert [p for p in tmp_path.rglob("*") if p.is_file()] == []
@@ -0,0 +1,51 @@
+from datetime import datetime
+
+import pytest
+
+from dynatrace import Dynatrace
+from dynatrace.environment_v2.audit_log_sync import AuditLogStore
+from dynatrace.environment_v2.audit_logs import AuditLogEntry, EventType
+
+SUPPORT_USER = "Dynatrace support user #649982176"
+
+
+def test_sync_is_incremental(dt: Dynatrace, tmp_path):
+    path = tmp_path / "audit.db"
+    with AuditLogStore(dt.audit_logs, path) as store:
+        assert store.watermark is None
+        assert store.sync() == 6
+        assert store.watermark == (1621003148800, "162100314800090003")
+
+    with AuditLogStore(dt.audit_logs, path) as store:
+        # Only the entries from the watermark on are requested, the entry at the watermark is not stored twice
+        assert store.sync() == 1
+        assert store.watermark == (1621004000000, "162100400000090000")
+        assert store.sync() == 0
+        assert store.count() == 7
+
+
+def test_query(dt: Dynatrace):
+    store = AuditLogStore(dt.audit_logs, ":memory:")
+    store.sync()
+    store.sync()
+
+    latest = store.query(limit=1)[0]
+    assert isinstance(latest, AuditLogEntry)
+    assert latest.user == "jane.doe@example.com"
+    assert latest.patch[0]["value"] == "STAGING"
+
+    deletes = store.query(user=SUPPORT_USER, category="CONFIG", event_type=EventType.DELETE)
+    assert [entry.log_id for entry in deletes] == ["162100314800090003", "162100314800090002", "162100314800090001", "162100314800090000", "162100314400090000"]
+    assert store.count(entity_id="AUDIT_LOG") == 1
+    assert store.count(time_from=datetime.utcfromtimestamp(1621003148799 / 1000)) == 5
+    assert store.count_by("user") == {SUPPORT_USER: 6, "jane.doe@example.com": 1}
+
+    with pytest.raises(ValueError):
+        store.count_by("raw")
+
+
+def test_filter_cannot_change(dt: Dynatrace, tmp_path):
+    path = tmp_path / "audit.db"
+    AuditLogStore(dt.audit_logs, path).sync()
+    with pytest.raises(ValueError):
+        AuditLogStore(dt.audit_logs, path, log_filter='category("CONFIG")')
@@ -1,5 +1,11 @@
+import zipfile
+
+from unittest import mock
+import pytest
+
 from dynatrace import Dynatrace
 from dynatrace.environment_v2.extensions import MinimalExtension
+from dynatrace.http_client import HttpClient
 from dynatrace.pagination import PaginatedList
 
 import dynatrace.environment_v2.extensions as extensions_v2
@@ -66,3 +72,60 @@ def test_get_active_extension_version(dt: Dynatrace):
 
     # value checks
     assert environemnt_config.version == "1.2.3"
+
+
+def signed_package(tmp_path, manifest="name: custom:com.example.ci-build\nversion: 1.4.2\n"):
+    inner_path = tmp_path / "extension.zip"
+    with zipfile.ZipFile(inner_path, "w") as inner:
+        inner.writestr("extension.yaml", manifest)
+        inner.writestr("mibs/EXAMPLE-MIB.txt", "x" * 5000)
+    package_path = tmp_path / "package.zip"
+    with zipfile.ZipFile(package_path, "w") as package:
+        package.write(inner_path, "extension.zip")
+        package.writestr("extension.zip.sig", "signature")
+    return package_path
+
+
+def test_post_streams_archive(dt: Dynatrace, tmp_path):
+    package_path = signed_package(tmp_path)
+    bodies = []
+    progress = []
+    original = HttpClient.make_request
+
+    def make_request(self, path, *args, data=None, headers=None, **kwargs):
+        body = b"".join(iter(lambda: data.read(1024), b""))
+        bodies.append((headers["Content-Type"], body))
+        return original(self, path, *args, data=data, headers=headers, **kwargs)
+
+    with mock.patch.object(HttpClient, "make_request", new=make_request):
+        extension = dt.extensions_v2.post(package_path, validate_locally=True, progress=lambda sent, total: progress.append((sent, total)), chunk_size=1024)
+
+    assert extension.extension_name == "custom:com.example.ci-build"
+    content_type, body = bodies[0]
+    assert content_type.startswith("multipart/form-data; boundary=")
+    assert package_path.read_bytes() in body
+    assert body.endswith(f"--{content_type.split('=')[1]}--\r\n".encode())
+    assert progress[-1] == (len(body), len(body))
+    assert all(b - a <= 1024 for (a, _), (b, _) in zip([(0, 0)] + progress, progress))
+
+
+def test_validate_extension_package(tmp_path):
+    assert extensions_v2.validate_extension_package(signed_package(tmp_path)) == {"name": "custom:com.example.ci-build", "version": "1.4.2"}
+
+    with pytest.raises(ValueError, match="version"):
+        extensions_v2.validate_extension_package(signed_package(tmp_path, "name: custom:com.example.ci-build\n"))
+
+    not_a_zip = tmp_path / "broken.zip"
+    not_a_zip.write_bytes(b"not a zip")
+    with pytest.raises(ValueError, match="not a valid zip"):
+        extensions_v2.validate_extension_package(not_a_zip)
+
+
+def test_post_validates_locally(dt: Dynatrace, tmp_path):
+    package_path = tmp_path / "package.zip"
+    with zipfile.ZipFile(package_path, "w") as package:
+        package.writestr("README.md", "no manifest")
+    with mock.patch.object(HttpClient, "make_request") as make_request:
+        with pytest.raises(ValueError, match="extension.yaml"):
+            dt.extensions_v2.post(package_path, validate_locally=True)
+    make_request.assert_not_called()
@@ -0,0 +1,54 @@
+import gzip
+import json
+from datetime import timedelta
+
+import pytest
+
+from dynatrace import Dynatrace
+from dynatrace.environment_v2.log_export import NdjsonLogSink, export_logs
+
+
+def read_lines(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_export_logs_rotates_by_span(dt: Dynatrace, tmp_path):
+    with NdjsonLogSink(tmp_path, max_span=timedelta(minutes=5)) as sink:
+        assert export_logs(dt.logs, sink, time_from="now-10m") == 18
+
+    with open(tmp_path / "manifest.json") as f:
+        files = json.load(f)["files"]
+    assert [entry["file"] for entry in files] == ["logs-00000.ndjson.gz", "logs-00001.ndjson.gz"]
+    assert sum(entry["records"] for entry in files) == 18
+    for entry in files:
+        assert entry["to"] - entry["from"] <= 5 * 60 * 1000
+        records = read_lines(tmp_path / entry["file"])
+        assert len(records) == entry["records"]
+        assert min(r["timestamp"] for r in records) == entry["from"]
+
+    expected = dt.logs.export_pages(time_from="now-10m")
+    assert read_lines(tmp_path / files[0]["file"])[0] == next(expected)["results"][0]
+
+
+def test_rotates_by_size_and_appends(dt: Dynatrace, tmp_path):
+    with NdjsonLogSink(tmp_path, prefix="archive", compression=None, max_bytes=2000) as sink:
+        export_logs(dt.logs, sink, time_from="now-10m")
+    files = sink.manifest
+    assert len(files) > 1
+    assert all(entry["bytes"] <= 2000 for entry in files)
+    assert all((tmp_path / entry["file"]).stat().st_size == entry["bytes"] for entry in files)
+
+    with NdjsonLogSink(tmp_path, prefix="archive", compression=None) as sink:
+        sink.write_records([{"timestamp": 1683574999999, "content": "later"}])
+    assert len(sink.manifest) == len(files) + 1
+    assert sink.files_between(1683574990000) == [tmp_path / sink.manifest[-1]["file"]]
+
+
+def test_zstd(dt: Dynatrace, tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+    with NdjsonLogSink(tmp_path, compression="zstd") as sink:
+        export_logs(dt.logs, sink, time_from="now-10m")
+    with open(tmp_path / "logs-00000.ndjson.zst", "rb") as f:
+        lines = zstandard.ZstdDecompressor().stream_reader(f).read().splitlines()
+    assert len(lines) == 18
@@ -0,0 +1,83 @@
+import threading
+
+from unittest import mock
+
+from dynatrace import Dynatrace
+from dynatrace.environment_v2.log_tail import LogFollower
+from dynatrace.utils import int64_to_datetime
+
+SECOND = 1000
+START = 1683574800000
+
+
+def record(timestamp, content):
+    return {"timestamp": timestamp, "content": content, "status": "INFO", "eventType": "LOG", "additionalColumns": {}}
+
+
+class FakeExport:
+    def __init__(self, *polls):
+        self.polls = list(polls)
+        self.calls = []
+
+    def __call__(self, query, time_from, time_to, sort, page_size):
+        self.calls.append(int(time_from))
+        records = self.polls.pop(0)
+        # Two pages, to check that they are all read
+        return iter([{"results": records[:1], "nextPageKey": "next"}, {"results": records[1:]}])
+
+
+def test_poll_deduplicates_overlap(dt: Dynatrace):
+    fake = FakeExport(
+        [record(START + SECOND, "a"), record(START + 2 * SECOND, "b")],
+        [record(START + SECOND, "a"), record(START + 2 * SECOND, "b"), record(START + 2 * SECOND, "c"), record(START + 3 * SECOND, "d")],
+        [record(START + 3 * SECOND, "d")],
+        [],
+    )
+    with mock.patch.object(dt.logs, "export_pages", side_effect=fake), mock.patch(
+        "dynatrace.environment_v2.log_tail.now_utc", return_value=int64_to_datetime(START + 60 * SECOND)
+    ):
+        follower = LogFollower(dt.logs, 'status="ERROR"', overlap="1m", min_interval=1, max_interval=8)
+        assert follower.watermark == START
+
+        assert [r.content for r in follower.poll()] == ["a", "b"]
+        assert follower.watermark == START + 2 * SECOND
+        assert [r.content for r in follower.poll()] == ["c", "d"]
+        assert follower.poll() == []
+        assert follower.interval == 2
+        follower.poll()
+        assert follower.interval == 4
+
+    assert fake.calls == [START - 60 * SECOND, START - 58 * SECOND, START - 57 * SECOND, START - 57 * SECOND]
+
+
+def test_fingerprints_are_bounded(dt: Dynatrace):
+    records = [record(START + i, f"line {i}") for i in range(10)]
+    with mock.patch.object(dt.logs, "export_pages", side_effect=FakeExport(records, records)):
+        follower = LogFollower(dt.logs, time_from=int64_to_datetime(START), max_fingerprints=4)
+        assert len(follower.poll()) == 10
+        # Only the 4 newest records are remembered
+        assert [r.content for r in follower.poll()] == [f"line {i}" for i in range(6)]
+
+
+def test_follow(dt: Dynatrace):
+    stop = threading.Event()
+    fake = FakeExport([record(START, "a"), record(START + 1, "b")], [record(START + 2, "c")])
+    with mock.patch.object(dt.logs, "export_pages", side_effect=fake):
+        follower = LogFollower(dt.logs, time_from=int64_to_datetime(START), min_interval=0)
+        seen = []
+        for r in follower.follow(stop):
+            seen.append(r.content)
+            if len(seen) == 3:
+                stop.set()
+    assert seen == ["a", "b", "c"]
+
+
+def test_identical_records_are_all_emitted(dt: Dynatrace):
+    same = record(START + SECOND, "retrying")
+    fake = FakeExport([same, same], [same, same, same], [same, same, same])
+    with mock.patch.object(dt.logs, "export_pages", side_effect=fake):
+        follower = LogFollower(dt.logs, time_from=int64_to_datetime(START))
+        assert [r.content for r in follower.poll()] == ["retrying", "retrying"]
+        # The third one was ingested late
+        assert [r.content for r in follower.poll()] == ["retrying"]
+        assert follower.poll() == []
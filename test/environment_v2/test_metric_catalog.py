@@ -0,0 +1,60 @@
+import json
+
+from dynatrace import Dynatrace
+from dynatrace.environment_v2.metric_catalog import MetricCatalog
+from dynatrace.environment_v2.metrics import MetricDescriptor
+from dynatrace.utils import int64_to_datetime
+
+
+def test_first_refresh_loads_everything(dt: Dynatrace, tmp_path):
+    catalog = MetricCatalog(dt.metrics, tmp_path / "catalog.json")
+    assert catalog.synced_at is None
+    assert catalog.refresh() == 4
+    assert len(catalog) == 4
+    assert catalog.synced_at is not None
+    assert (tmp_path / "catalog.json").exists()
+
+
+def test_lookups(dt: Dynatrace, tmp_path):
+    catalog = MetricCatalog(dt.metrics, tmp_path / "catalog.json")
+    catalog.load()
+
+    metric = catalog.get("builtin:host.cpu.idle")
+    assert isinstance(metric, MetricDescriptor)
+    assert metric.display_name == "CPU idle"
+    assert catalog.get("builtin:unknown") is None
+
+    assert [m.metric_id for m in catalog.by_prefix("builtin:host.cpu.")] == ["builtin:host.cpu.idle", "builtin:host.cpu.usage"]
+    assert [m.metric_id for m in catalog.by_prefix("custom.")] == ["custom.app.requests"]
+    assert len(catalog.by_unit("Percent")) == 3
+    assert [m.metric_id for m in catalog.by_tag("team:a")] == ["custom.app.requests"]
+    assert [m.metric_id for m in catalog.by_dimension("endpoint")] == ["custom.app.requests"]
+
+
+def test_warm_start_and_incremental_refresh(dt: Dynatrace, tmp_path):
+    path = tmp_path / "catalog.json"
+    MetricCatalog(dt.metrics, path).load()
+
+    # Pin the sync time, the incremental request is made with writtenSince set to it
+    stored = json.loads(path.read_text())
+    stored["syncedAt"] = 1621029621000
+    path.write_text(json.dumps(stored))
+
+    catalog = MetricCatalog(dt.metrics, path)
+    assert len(catalog) == 4
+    assert catalog.synced_at == int64_to_datetime(1621029621000)
+
+    assert catalog.refresh() == 2
+    assert len(catalog) == 5
+    assert "custom.app.errors" in catalog
+    assert catalog.by_tag("team:a") == []
+    assert [m.metric_id for m in catalog.by_tag("team:b")] == ["custom.app.errors", "custom.app.requests"]
+    assert [m.metric_id for m in catalog.by_prefix("custom.app.")] == ["custom.app.errors", "custom.app.requests"]
+    assert catalog.get("custom.app.requests").tags == ["team:b"]
+
+
+def test_get_fetch_missing(dt: Dynatrace, tmp_path):
+    catalog = MetricCatalog(dt.metrics, tmp_path / "catalog.json")
+    metric = catalog.get("builtin:host.cpu.idle", fetch_missing=True)
+    assert metric.metric_id == "builtin:host.cpu.idle"
+    assert "builtin:host.cpu.idle" in catalog
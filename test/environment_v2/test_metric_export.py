@@ -0,0 +1,123 @@
+import csv
+import io
+
+import pytest
+
+from dynatrace import Dynatrace
+from dynatrace.environment_v2.metric_export import CsvMetricSink, MetricExportSink, ParquetMetricSink, ArrowIpcMetricSink, export_metrics
+
+
+def test_query_pages(dt: Dynatrace):
+    pages = list(dt.metrics.query_pages("builtin:host.cpu.usage,builtin:host.mem.usage", "1h", "now-2h"))
+    assert len(pages) == 2
+    assert pages[0]["result"][0]["metricId"] == "builtin:host.cpu.usage"
+    assert pages[1]["result"][0]["metricId"] == "builtin:host.mem.usage"
+
+
+def test_export_csv(dt: Dynatrace):
+    out = io.StringIO()
+    with CsvMetricSink(out) as sink:
+        rows = export_metrics(dt.metrics, sink, "builtin:host.cpu.usage,builtin:host.mem.usage", "1h", "now-2h")
+    assert rows == 6
+    assert sink.rows_written == 6
+
+    lines = list(csv.reader(io.StringIO(out.getvalue())))
+    assert lines[0] == ["metric_id", "dt.entity.host", "timestamp", "value"]
+    assert lines[1] == ["builtin:host.cpu.usage", "HOST-1", "1621029600000", "10.0"]
+    assert lines[2] == ["builtin:host.cpu.usage", "HOST-1", "1621033200000", ""]
+    assert lines[6] == ["builtin:host.mem.usage", "HOST-1", "1621033200000", "55.0"]
+
+
+def test_export_csv_dimension_keys(dt: Dynatrace, tmp_path):
+    path = tmp_path / "metrics.csv"
+    with CsvMetricSink(path, dimension_keys=["dt.entity.host", "dt.entity.process_group"]) as sink:
+        export_metrics(dt.metrics, sink, "builtin:host.cpu.usage,builtin:host.mem.usage", "1h", "now-2h")
+
+    with open(path, newline="") as f:
+        lines = list(csv.reader(f))
+    assert lines[0] == ["metric_id", "dt.entity.host", "dt.entity.process_group", "timestamp", "value"]
+    assert lines[3] == ["builtin:host.cpu.usage", "HOST-2", "", "1621029600000", "30.0"]
+
+
+@pytest.mark.parametrize("sink_class", [ParquetMetricSink, ArrowIpcMetricSink])
+def test_export_arrow(dt: Dynatrace, tmp_path, sink_class):
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    path = tmp_path / "metrics.out"
+    with sink_class(path) as sink:
+        export_metrics(dt.metrics, sink, "builtin:host.cpu.usage,builtin:host.mem.usage", "1h", "now-2h")
+
+    if sink_class is ParquetMetricSink:
+        parquet_file = pyarrow.parquet.ParquetFile(str(path))
+        assert parquet_file.num_row_groups == 2
+        table = parquet_file.read()
+    else:
+        table = pyarrow.ipc.open_file(str(path)).read_all()
+    assert table.column_names == ["metric_id", "dt.entity.host", "timestamp", "value"]
+    assert table.num_rows == 6
+    assert table.column("value").to_pylist()[:2] == [10.0, None]
+
+
+def series(dimension_map, value):
+    return {"dimensionMap": dimension_map, "timestamps": [1621029600000], "values": [value]}
+
+
+def test_dimension_keys_union_of_first_page():
+    out = io.StringIO()
+    sink = CsvMetricSink(out)
+    page = {"result": [{"metricId": "m", "data": [series({"host": "H1"}, 1.0), series({"host": "H2", "disk": "C:"}, 2.0)]}]}
+    assert sink.write_page(page) == 2
+    lines = list(csv.reader(io.StringIO(out.getvalue())))
+    assert lines == [["metric_id", "disk", "host", "timestamp", "value"], ["m", "", "H1", "1621029600000", "1.0"], ["m", "C:", "H2", "1621029600000", "2.0"]]
+
+    with pytest.raises(ValueError, match="process"):
+        sink.write_page({"result": [{"metricId": "m", "data": [series({"host": "H1", "process": "P1"}, 3.0)]}]})
+
+    # Given dimension keys are the only ones exported
+    given = CsvMetricSink(io.StringIO(), dimension_keys=["host"])
+    assert given.write_page({"result": [{"metricId": "m", "data": [series({"host": "H1", "process": "P1"}, 3.0)]}]}) == 1
+
+
+def test_sink_is_abstract():
+    with pytest.raises(TypeError):
+        MetricExportSink()
+
+
+def test_empty_csv_has_header():
+    out = io.StringIO()
+    with CsvMetricSink(out) as sink:
+        assert sink.write_page({"result": [{"metricId": "m", "data": []}]}) == 0
+    assert out.getvalue().splitlines() == ["metric_id,timestamp,value"]
+
+
+def test_dimension_keys_colliding_with_columns():
+    out = io.StringIO()
+    with CsvMetricSink(out) as sink:
+        sink.write_page({"result": [{"metricId": "m", "data": [series({"value": "v", "host": "H1"}, 1.0)]}]})
+    lines = list(csv.reader(io.StringIO(out.getvalue())))
+    assert lines == [["metric_id", "host", "dimension.value", "timestamp", "value"], ["m", "H1", "v", "1621029600000", "1.0"]]
+
+
+class FakeMetrics:
+    def __init__(self, *pages):
+        self.pages = pages
+
+    def query_pages(self, *args):
+        return iter(self.pages)
+
+
+def test_failed_export_closes_the_sink(tmp_path):
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.parquet
+
+    path = tmp_path / "metrics.parquet"
+    sink = ParquetMetricSink(path)
+    export_metrics(FakeMetrics({"result": [{"metricId": "m", "data": [series({"host": "H1"}, 1.0)]}]}), sink, "m")
+    with pytest.raises(ValueError, match="process"):
+        export_metrics(FakeMetrics({"result": [{"metricId": "p", "data": [series({"process": "P1"}, 2.0)]}]}), sink, "p")
+
+    assert sink.closed
+    sink.close()
+    assert pyarrow.parquet.read_table(str(path)).num_rows == 1
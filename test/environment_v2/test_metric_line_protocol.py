@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from dynatrace.environment_v2.metric_line_protocol import (
+    MetricLineEncoder,
+    normalize_metric_key,
+    normalize_dimension_key,
+    escape_dimension_value,
+    MAX_DIMENSIONS,
+    format_timestamp,
+)
+
+
+def test_normalize_metric_key():
+    assert normalize_metric_key("cpu.usage") == "cpu.usage"
+    assert normalize_metric_key("1cpu.2usage") == "cpu.2usage"
+    assert normalize_metric_key("my metric!.total") == "my_metric_.total"
+    assert normalize_metric_key("a..b") == "a.b"
+    with pytest.raises(ValueError):
+        normalize_metric_key("123")
+    with pytest.raises(ValueError):
+        normalize_metric_key("")
+
+
+def test_normalize_dimension_key():
+    assert normalize_dimension_key("dt.entity.host") == "dt.entity.host"
+    assert normalize_dimension_key("Host Name") == "host_name"
+    assert normalize_dimension_key("1abc.2def") == "abc.def"
+    assert normalize_dimension_key("!!!") is None
+
+
+def test_escape_dimension_value():
+    assert escape_dimension_value('a b,c=d"e\\f') == 'a\\ b\\,c\\=d\\"e\\\\f'
+    assert escape_dimension_value("line\nbreak") == "linebreak"
+    assert len(escape_dimension_value("x" * 300)) == 250
+
+
+def test_encode_lines():
+    encoder = MetricLineEncoder(prefix="app", default_dimensions={"env": "prod", "region": "eu"})
+    timestamp = datetime(2021, 5, 14, 22, 0, tzinfo=timezone.utc)
+
+    assert encoder.gauge("cpu", 1.5, {"Host": "web 1"}) == "app.cpu,env=prod,region=eu,host=web\\ 1 gauge,1.5"
+    assert encoder.count("requests", 10, {"region": "us"}, timestamp) == "app.requests,env=prod,region=us count,delta=10 1621029600000"
+    assert encoder.summary("latency", 1, 5, 9, 3, timestamp=1621029600000) == "app.latency,env=prod,region=eu gauge,min=1,max=5,sum=9,count=3 1621029600000"
+
+
+def test_encode_bulk():
+    encoder = MetricLineEncoder()
+    assert encoder.gauges("cpu", [1, 2.5], dimensions={"host": "a"}) == ["cpu,host=a gauge,1", "cpu,host=a gauge,2.5"]
+    assert encoder.counts("hits", [3, 4], [1621029600000, 1621029660000]) == ["hits count,delta=3 1621029600000", "hits count,delta=4 1621029660000"]
+    with pytest.raises(ValueError):
+        encoder.gauges("cpu", [1, 2], [1621029600000])
+    with pytest.raises(ValueError):
+        encoder.gauges("cpu", [1, float("nan")])
+
+
+def test_validation():
+    encoder = MetricLineEncoder()
+    with pytest.raises(ValueError):
+        encoder.gauge("cpu", float("inf"))
+    with pytest.raises(ValueError):
+        encoder.gauge("cpu", "1")
+    with pytest.raises(ValueError):
+        encoder.summary("latency", 5, 1, 6, 2)
+    with pytest.raises(ValueError):
+        encoder.summary("latency", 1, 5, 100, 2)
+    with pytest.raises(ValueError):
+        encoder.summary("latency", 1, 5, 6, 0)
+    with pytest.raises(ValueError):
+        encoder.gauge("cpu", 1, {f"dim{i}": "v" for i in range(MAX_DIMENSIONS + 1)})
+    with pytest.raises(ValueError):
+        encoder.gauge("cpu", 1, timestamp=-1)
+
+
+def test_format_timestamp_keeps_offsets():
+    utc = datetime(2021, 5, 14, 22, 0, tzinfo=timezone.utc)
+    assert format_timestamp(utc) == " 1621029600000"
+    assert format_timestamp(utc.astimezone(timezone(timedelta(hours=2)))) == " 1621029600000"
+    assert format_timestamp(datetime(2021, 5, 14, 22, 0)) == " 1621029600000"
+    assert format_timestamp(datetime(2021, 5, 14, 22, 0, 0, 123000, tzinfo=timezone.utc)) == " 1621029600123"
@@ -0,0 +1,78 @@
+import pytest
+
+from dynatrace import Dynatrace
+from dynatrace.environment_v2.metric_multiplexer import MetricQueryMultiplexer
+from dynatrace.environment_v2.metrics import MetricSeriesCollection
+
+
+def test_merges_queries_with_same_parameters(dt: Dynatrace):
+    mux = MetricQueryMultiplexer(dt.metrics)
+    cpu = mux.submit("builtin:host.cpu.usage", "1h", "now-2h", entity_selector='type("HOST")')
+    mem = mux.submit("builtin:host.mem.usage", "1h", "now-2h", entity_selector='type("HOST")')
+    disk = mux.submit("builtin:host.disk.avail", "1h", "now-2h", entity_selector='type("HOST")')
+    daily = mux.submit("builtin:host.cpu.usage", "1d", "now-7d")
+
+    assert not cpu.done()
+    assert mux.flush() == 2
+    assert mux.requests_sent == 2
+
+    assert isinstance(cpu.result(), MetricSeriesCollection)
+    assert cpu.result().metric_id == "builtin:host.cpu.usage"
+    assert cpu.result().data[0].values == [10.0, 20.0]
+    assert mem.result().data[0].values == [50.0, 55.0]
+    assert disk.result().data == []
+    assert daily.result().data[0].values == [15.0]
+
+
+def test_result_flushes_and_duplicates_share_a_result(dt: Dynatrace):
+    mux = MetricQueryMultiplexer(dt.metrics)
+    first = mux.submit("builtin:host.cpu.usage", "1h", "now-2h")
+    second = mux.submit("builtin:host.cpu.usage", "1h", "now-2h")
+
+    assert first.result().data[0].values == [10.0, 20.0]
+    assert second.done()
+    assert second.result() is first.result()
+    assert mux.requests_sent == 1
+
+
+def test_max_selectors(dt: Dynatrace):
+    with MetricQueryMultiplexer(dt.metrics, max_selectors=2) as mux:
+        futures = [mux.submit(s, "1h", "now-2h", entity_selector='type("HOST")') for s in ("builtin:host.cpu.usage", "builtin:host.mem.usage", "builtin:host.disk.avail")]
+    assert mux.requests_sent == 2
+    assert [f.result().metric_id for f in futures] == ["builtin:host.cpu.usage", "builtin:host.mem.usage", "builtin:host.disk.avail"]
+
+
+def test_normalized_metric_ids_are_routed_by_position(dt: Dynatrace):
+    mux = MetricQueryMultiplexer(dt.metrics)
+    cpu = mux.submit("builtin:host.cpu.usage:avg", "1h", "now-2h")
+    mem = mux.submit("builtin:host.mem.usage:avg", "1h", "now-2h")
+    assert cpu.result().data[0].values == [10.0, 20.0]
+    assert mem.result().data[0].values == [50.0, 55.0]
+
+
+def test_failed_merge_is_retried_per_selector(dt: Dynatrace):
+    mux = MetricQueryMultiplexer(dt.metrics)
+    cpu = mux.submit("builtin:host.cpu.usage", "1h", "now-2h")
+    invalid = mux.submit("builtin:host.invalid", "1h", "now-2h")
+
+    assert mux.flush() == 3
+    assert cpu.result().data[0].values == [10.0, 20.0]
+    with pytest.raises(Exception):
+        invalid.result()
+
+
+def test_selectors_with_commas_are_routed_by_position(dt: Dynatrace):
+    mux = MetricQueryMultiplexer(dt.metrics)
+    cpu = mux.submit('builtin:host.cpu.usage:splitBy("dt.entity.host","cpu"):avg', "1h", "now-2h")
+    mem = mux.submit('builtin:host.mem.usage:filter(in("dt.entity.host",entitySelector("type(HOST),tag(~"env:prod~")")))', "1h", "now-2h")
+    assert mux.flush() == 1
+    assert cpu.result().data[0].values == [10.0, 20.0]
+    assert mem.result().data[0].values == [50.0, 55.0]
+
+
+def test_several_metrics_in_one_selector_are_rejected(dt: Dynatrace):
+    mux = MetricQueryMultiplexer(dt.metrics)
+    with pytest.raises(ValueError):
+        mux.submit("builtin:host.cpu.usage,builtin:host.mem.usage", "1h", "now-2h")
+    with pytest.raises(ValueError):
+        mux.submit('builtin:host.cpu.usage:filter(eq("a","b")),builtin:host.mem.usage', "1h", "now-2h")
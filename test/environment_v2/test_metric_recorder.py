@@ -0,0 +1,113 @@
+import re
+import time
+
+from unittest import mock
+import pytest
+
+from dynatrace import Dynatrace
+from dynatrace.environment_v2.metric_line_protocol import MetricLineEncoder
+from dynatrace.environment_v2.metric_recorder import MetricRecorder
+
+
+def strip_timestamps(lines):
+    return sorted(re.sub(r" \d{13}$", "", line) for line in lines)
+
+
+def test_flush_aggregates(dt: Dynatrace):
+    recorder = MetricRecorder(dt.metrics, MetricLineEncoder(prefix="app"))
+    for value in (3, 1, 5):
+        recorder.gauge("latency", value, {"endpoint": "/a"})
+    recorder.gauge("latency", 7, {"endpoint": "/b"})
+    for _ in range(10):
+        recorder.count("requests", dimensions={"endpoint": "/a"})
+    recorder.count("requests", 5, {"endpoint": "/a"})
+
+    with mock.patch.object(dt.metrics, "ingest") as ingest:
+        assert recorder.flush() == 3
+        assert recorder.flush() == 0
+
+    assert ingest.call_count == 1
+    assert strip_timestamps(ingest.call_args[0][0]) == [
+        "app.latency,endpoint=/a gauge,min=1,max=5,sum=9,count=3",
+        "app.latency,endpoint=/b gauge,7",
+        "app.requests,endpoint=/a count,delta=15",
+    ]
+
+
+def test_flush_chunks_and_restores_on_error(dt: Dynatrace):
+    recorder = MetricRecorder(dt.metrics, max_lines_per_request=2)
+    for i in range(5):
+        recorder.count(f"requests{i}")
+
+    with mock.patch.object(dt.metrics, "ingest", side_effect=[None, Exception("HTTP 503")]):
+        with pytest.raises(Exception):
+            recorder.flush()
+    assert str(recorder.last_error) == "HTTP 503"
+
+    recorder.count("requests4", 2)
+    with mock.patch.object(dt.metrics, "ingest") as ingest:
+        assert recorder.flush() == 3
+    lines = strip_timestamps(line for call in ingest.call_args_list for line in call[0][0])
+    assert lines == ["requests2 count,delta=1", "requests3 count,delta=1", "requests4 count,delta=3"]
+
+
+def test_invalid_series_fail_when_recording(dt: Dynatrace):
+    recorder = MetricRecorder(dt.metrics)
+    with pytest.raises(ValueError):
+        recorder.gauge("123", 1)
+
+
+def test_background_flush(dt: Dynatrace):
+    with mock.patch.object(dt.metrics, "ingest") as ingest:
+        with MetricRecorder(dt.metrics, flush_interval=0.01) as recorder:
+            recorder.gauge("cpu", 1)
+            deadline = time.time() + 5
+            while not ingest.called and time.time() < deadline:
+                time.sleep(0.01)
+            assert ingest.called
+            recorder.gauge("cpu", 2)
+    lines = [line for call in ingest.call_args_list for line in call[0][0]]
+    assert strip_timestamps(lines) == ["cpu gauge,1", "cpu gauge,2"]
+
+
+def test_invalid_values_fail_when_recording(dt: Dynatrace):
+    recorder = MetricRecorder(dt.metrics)
+    with pytest.raises(ValueError):
+        recorder.gauge("cpu", float("nan"))
+    with pytest.raises(ValueError):
+        recorder.count("requests", "1")
+    recorder.gauge("cpu", 1)
+
+    with mock.patch.object(dt.metrics, "ingest") as ingest:
+        assert recorder.flush() == 1
+    assert strip_timestamps(ingest.call_args[0][0]) == ["cpu gauge,1"]
+
+
+def test_unencodable_aggregates_are_dropped(dt: Dynatrace):
+    recorder = MetricRecorder(dt.metrics)
+    recorder.gauge("cpu", 1e308)
+    recorder.gauge("cpu", 1e308)
+    recorder.count("requests")
+
+    with mock.patch.object(dt.metrics, "ingest") as ingest:
+        assert recorder.flush() == 1
+        assert recorder.flush() == 0
+    assert strip_timestamps(ingest.call_args[0][0]) == ["requests count,delta=1"]
+    assert isinstance(recorder.last_error, ValueError)
+
+
+def test_dropped_aggregates_are_not_restored(dt: Dynatrace, caplog):
+    recorder = MetricRecorder(dt.metrics)
+    recorder.gauge("cpu", 1e308)
+    recorder.gauge("cpu", 1e308)
+    recorder.count("requests")
+
+    with mock.patch.object(dt.metrics, "ingest", side_effect=Exception("Unavailable")):
+        with pytest.raises(Exception):
+            recorder.flush()
+    caplog.clear()
+    with mock.patch.object(dt.metrics, "ingest") as ingest:
+        assert recorder.flush() == 1
+    assert strip_timestamps(ingest.call_args[0][0]) == ["requests count,delta=1"]
+    # The overflowed gauge was dropped for good by the failed flush
+    assert "Dropping" not in caplog.text
@@ -0,0 +1,91 @@
+import random
+
+import pytest
+
+from dynatrace.environment_v2 import metric_rollup
+from dynatrace.environment_v2.metric_rollup import rollup
+from dynatrace.environment_v2.metrics import MetricSeriesCollection
+from dynatrace.utils import int64_to_datetime
+
+MINUTE = 60000
+HOUR = 60 * MINUTE
+START = 1621029600000  # 2021-05-14T22:00:00Z
+
+
+@pytest.fixture(params=["numpy", "python"])
+def engine(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(metric_rollup, "numpy", None)
+    return request.param
+
+
+def collection(*series):
+    return MetricSeriesCollection(
+        raw_element={
+            "metricId": "builtin:host.cpu.usage",
+            "data": [{"dimensionMap": dimensions, "timestamps": [t for t, _ in points], "values": [v for _, v in points]} for dimensions, points in series],
+        }
+    )
+
+
+def test_rollup_buckets_and_gaps(engine):
+    points = [(START + i * MINUTE, float(i)) for i in range(120)]
+    points[5] = (points[5][0], None)
+    points += [(START + 3 * HOUR + MINUTE, None)]
+    result = rollup(collection(({"dt.entity.host": "HOST-1"}, points)), "1h", ["min", "max", "avg", "sum", "count", "median", "percentile(90)"])
+
+    assert len(result) == 1
+    series = result[0]
+    assert series.dimension_map == {"dt.entity.host": "HOST-1"}
+    assert series.timestamps == [int64_to_datetime(START + i * HOUR) for i in range(4)]
+    assert series.values["count"] == [59, 60, 0, 0]
+    assert series.values["min"] == [0.0, 60.0, None, None]
+    assert series.values["max"] == [59.0, 119.0, None, None]
+    assert series.values["sum"][1] == sum(range(60, 120))
+    assert series.values["avg"][1] == pytest.approx(89.5)
+    assert series.values["median"][1] == pytest.approx(89.5)
+    assert series.values["percentile(90)"][1] == pytest.approx(113.1)
+
+
+def test_rollup_split_by(engine):
+    data = collection(
+        ({"dt.entity.host": "HOST-1", "dt.entity.disk": "DISK-1"}, [(START, 1.0), (START + MINUTE, 3.0)]),
+        ({"dt.entity.host": "HOST-1", "dt.entity.disk": "DISK-2"}, [(START, 5.0)]),
+        ({"dt.entity.host": "HOST-2", "dt.entity.disk": "DISK-3"}, [(START, 7.0)]),
+    )
+
+    assert len(rollup(data, "1h")) == 3
+
+    by_host = rollup(data, "1h", ["avg", "max"], split_by=["dt.entity.host"])
+    assert [s.dimension_map for s in by_host] == [{"dt.entity.host": "HOST-1"}, {"dt.entity.host": "HOST-2"}]
+    assert by_host[0].values == {"avg": [3.0], "max": [5.0]}
+
+    merged = rollup(data, "1h", ["sum"], split_by=[])
+    assert merged[0].dimension_map == {}
+    assert merged[0].values["sum"] == [16.0]
+
+
+def test_rollup_invalid():
+    with pytest.raises(ValueError):
+        rollup([], "1h", ["p95"])
+    with pytest.raises(ValueError):
+        rollup([], "1h", ["percentile(101)"])
+    with pytest.raises(ValueError):
+        rollup([], "Inf")
+
+
+def test_numpy_and_python_agree(monkeypatch):
+    pytest.importorskip("numpy")
+    rng = random.Random(42)
+    points = [(START + i * MINUTE, None if rng.random() < 0.1 else rng.uniform(0, 100)) for i in range(1000)]
+    data = collection(({}, points))
+    aggregations = ["min", "max", "avg", "sum", "count", "median", "percentile(99)"]
+
+    vectorized = rollup(data, "15m", aggregations)[0].values
+    monkeypatch.setattr(metric_rollup, "numpy", None)
+    plain = rollup(data, "15m", aggregations)[0].values
+
+    for name in aggregations:
+        assert vectorized[name] == pytest.approx(plain[name])
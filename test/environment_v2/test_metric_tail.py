@@ -0,0 +1,53 @@
+from unittest import mock
+import pytest
+
+from dynatrace import Dynatrace
+from dynatrace.environment_v2.metric_tail import MetricTail
+from dynatrace.utils import int64_to_datetime
+
+MINUTE = 60000
+START = 1621029600000
+
+
+def test_poll(dt: Dynatrace):
+    tail = MetricTail(dt.metrics, "builtin:host.cpu.usage", resolution="1m", window="10m", lag="2m")
+
+    with mock.patch("dynatrace.environment_v2.metric_tail.now_utc", return_value=int64_to_datetime(START + 10 * MINUTE)):
+        first = tail.poll()
+    assert len(first) == 1
+    assert first[0].metric_id == "builtin:host.cpu.usage"
+    assert first[0].data[0].dimension_map == {"dt.entity.host": "HOST-1"}
+    assert first[0].data[0].values == [float(i) for i in range(8)]
+
+    # The second poll only asks for the buckets that were not final yet
+    with mock.patch("dynatrace.environment_v2.metric_tail.now_utc", return_value=int64_to_datetime(START + 12 * MINUTE)):
+        second = tail.poll()
+    assert second[0].data[0].timestamps == [int64_to_datetime(START + 8 * MINUTE), int64_to_datetime(START + 9 * MINUTE)]
+    assert second[0].data[0].values == [8.0, 9.0]
+
+    window = tail.window()[0].data[0]
+    assert window.timestamps[0] == int64_to_datetime(START + 2 * MINUTE)
+    assert window.timestamps[-1] == int64_to_datetime(START + 11 * MINUTE)
+    assert window.values[-2:] == [10.0, None]
+
+
+def test_failed_page_is_emitted_again(dt: Dynatrace):
+    def page(metric_id, values):
+        return {"result": [{"metricId": metric_id, "data": [{"dimensionMap": {}, "timestamps": [START + i * MINUTE for i in range(len(values))], "values": values}]}]}
+
+    def failing(*args):
+        yield page("cpu", [1.0, 2.0, 3.0])
+        raise Exception("HTTP 503")
+
+    def working(*args):
+        yield page("cpu", [1.0, 2.0, 3.0])
+        yield page("mem", [4.0, 5.0, 6.0])
+
+    tail = MetricTail(dt.metrics, "cpu,mem", resolution="1m", window="10m", lag="0m")
+    with mock.patch("dynatrace.environment_v2.metric_tail.now_utc", return_value=int64_to_datetime(START + 5 * MINUTE)):
+        with mock.patch.object(dt.metrics, "query_pages", side_effect=failing):
+            with pytest.raises(Exception):
+                tail.poll()
+        with mock.patch.object(dt.metrics, "query_pages", side_effect=working):
+            result = tail.poll()
+    assert [(c.metric_id, c.data[0].values) for c in result] == [("cpu", [1.0, 2.0, 3.0]), ("mem", [4.0, 5.0, 6.0])]
@@ -1,7 +1,10 @@
+from datetime import datetime, timedelta, timezone
+
 from dynatrace import Dynatrace
 import pytest
 
-from dynatrace.environment_v2.metrics import MetricDescriptor, AggregationType, Transformation, ValueType, MetricSeriesCollection
+from dynatrace.environment_v2.metrics import MetricDescriptor, AggregationType, Transformation, ValueType, MetricSeriesCollection, plan_resolution, ResolutionPlan
+from dynatrace.environment_v2.metrics import _split_selectors, _to_timestamp
 from dynatrace.pagination import PaginatedList
 from dynatrace.utils import int64_to_datetime
 
@@ -116,3 +119,61 @@ def test_ingest(dt: Dynatrace):
     assert ingest["linesOk"] == 1
     assert ingest["linesInvalid"] == 0
     assert ingest["error"] is None
+
+
+def test_aggregate(dt: Dynatrace):
+    results = list(dt.metrics.aggregate("builtin:host.cpu.usage,builtin:host.mem.usage", AggregationType.MAX, time_from="now-24h"))
+    assert [r.metric_id for r in results] == ["builtin:host.cpu.usage:fold(max)", "builtin:host.mem.usage:fold(max)"]
+    assert results[0].data[0].values == [97.5]
+
+
+def test_top_n(dt: Dynatrace):
+    results = list(dt.metrics.top_n('builtin:host.cpu.usage:filter(eq("dt.entity.host",HOST-1))', 2, "percentile(95)", time_from="now-2h"))
+    assert len(results) == 1
+    assert results[0].data[0].values == [90.0]
+
+
+def test_last(dt: Dynatrace):
+    results = list(dt.metrics.last("builtin:host.cpu.usage"))
+    assert [s.values for s in results[0].data] == [[12.0], [15.0]]
+
+
+def test_plan_resolution():
+    assert plan_resolution("now-2h").resolution == "1m"
+    plan = plan_resolution("now-7d", points_per_series=200)
+    assert plan.resolution == "1h"
+    assert plan.points_per_series == 168
+    assert plan_resolution("now-30d", series_count=100000).resolution == "1w"
+    assert plan_resolution(int64_to_datetime(1621029600000), int64_to_datetime(1621029600000 + 86400000), points_per_series=24).resolution == "1h"
+    with pytest.raises(ValueError):
+        plan_resolution("now", "now-1h")
+
+
+def test_plan_resolution_timestamps():
+    assert plan_resolution("2021-05-01T00:00:00", "2021-05-02T00:00:00", points_per_series=24).resolution == "1h"
+    assert plan_resolution("2021-05-01T00:00:00.000Z", "2021-05-01T04:00:00+02:00").timeframe == timedelta(hours=2)
+
+    now = datetime(2021, 5, 14, 22, 17, 5, tzinfo=timezone.utc)
+    assert _to_timestamp("now-1d/d", now) == datetime(2021, 5, 13, tzinfo=timezone.utc)
+    assert _to_timestamp("now/h", now) == datetime(2021, 5, 14, 22, tzinfo=timezone.utc)
+    assert _to_timestamp("now-1M/M", now) == datetime(2021, 4, 1, tzinfo=timezone.utc)
+    assert _to_timestamp("now/w", now) == datetime(2021, 5, 10, tzinfo=timezone.utc)
+    with pytest.raises(ValueError, match="now-<n><unit>"):
+        _to_timestamp("yesterday", now)
+
+
+def test_query_planned(dt: Dynatrace):
+    results = dt.metrics.query_planned("builtin:host.cpu.usage", time_from="now-7d")
+    plan = results.metadata["resolutionPlan"]
+    assert isinstance(plan, ResolutionPlan)
+    assert plan.series_count == 3
+    assert plan.resolution == "2h"
+    assert results.metadata["resolution"] == "2h"
+    assert len(list(results)[0].data) == 3
+
+
+def test_split_selectors():
+    assert _split_selectors('builtin:a:splitBy("x","y"), builtin:b') == ['builtin:a:splitBy("x","y")', "builtin:b"]
+    assert _split_selectors('builtin:a:filter(eq("tag","a~",b")),builtin:b') == ['builtin:a:filter(eq("tag","a~",b"))', "builtin:b"]
+    # An escaped tilde right before the closing quote
+    assert _split_selectors('builtin:a:filter(eq("tag","a~~")),builtin:b') == ['builtin:a:filter(eq("tag","a~~"))', "builtin:b"]
@@ -0,0 +1,94 @@
+import copy
+import json
+import os
+
+from unittest import mock
+import pytest
+
+from dynatrace import Dynatrace
+from dynatrace.environment_v2.problem_feed import ProblemEventType, ProblemFeed
+from dynatrace.environment_v2.problems import Problem, Status
+from dynatrace.utils import int64_to_datetime
+
+NOW = 1623010000000
+MINUTE = 60000
+
+with open(os.path.join(os.path.dirname(__file__), "..", "mock_data", "GET_api_v2_problems_0d7ed4db1cd91c2.json")) as f:
+    OPEN, CLOSED = json.load(f)["problems"]
+
+
+def new_problem(problem_id, status="OPEN"):
+    problem = copy.deepcopy(OPEN)
+    problem.update({"problemId": problem_id, "status": status, "endTime": -1 if status == "OPEN" else NOW})
+    return problem
+
+
+class FakeProblems:
+    def __init__(self, *polls):
+        self.polls = list(polls)
+        self.listed_from = []
+        self.details = []
+
+    def list_pages(self, problem_selector, entity_selector, fields, time_from, time_to):
+        self.listed_from.append(int(time_from))
+        self.current = {raw["problemId"]: raw for raw in self.polls.pop(0)}
+        return iter([{"problems": list(self.current.values())}])
+
+    def get(self, problem_id, fields=None):
+        self.details.append((problem_id, fields))
+        return Problem(raw_element=dict(self.current[problem_id], evidenceDetails={"totalCount": 0, "details": []}))
+
+
+def poll(feed, minutes):
+    with mock.patch("dynatrace.environment_v2.problem_feed.now_utc", return_value=int64_to_datetime(NOW + minutes * MINUTE)):
+        return feed.poll()
+
+
+def test_feed(dt: Dynatrace):
+    updated = copy.deepcopy(OPEN)
+    updated["title"] = "custom host disconnected error (2 hosts)"
+    closed = dict(updated, status="CLOSED", endTime=NOW + MINUTE)
+    fake = FakeProblems(
+        [OPEN, CLOSED],
+        [OPEN, CLOSED],
+        [updated, CLOSED, new_problem("P-NEW")],
+        [closed, new_problem("P-NEW"), new_problem("P-FLASH", "CLOSED")],
+        [new_problem("P-NEW")],
+    )
+    feed = ProblemFeed(fake, initial_window="1d", overlap="5m")
+
+    events = poll(feed, 0)
+    assert [(e.event_type, e.problem.problem_id) for e in events] == [(ProblemEventType.OPENED, OPEN["problemId"])]
+    assert events[0].problem.evidence_details.total_count == 0
+    assert fake.details == [(OPEN["problemId"], "+evidenceDetails,+impactAnalysis")]
+
+    # Nothing changed, so no details are fetched
+    assert poll(feed, 1) == []
+    assert len(fake.details) == 1
+
+    events = poll(feed, 2)
+    assert [(e.event_type, e.problem.problem_id) for e in events] == [(ProblemEventType.UPDATED, OPEN["problemId"]), (ProblemEventType.OPENED, "P-NEW")]
+
+    events = poll(feed, 3)
+    assert [(e.event_type, e.problem.problem_id) for e in events] == [(ProblemEventType.CLOSED, OPEN["problemId"]), (ProblemEventType.CLOSED, "P-FLASH")]
+    assert events[0].previous_status == Status.OPEN
+    assert events[1].previous_status is None
+
+    assert poll(feed, 4) == []
+    assert feed.tracked == 1
+    assert fake.listed_from == [NOW - 24 * 60 * MINUTE, NOW - 5 * MINUTE, NOW - 4 * MINUTE, NOW - 3 * MINUTE, NOW - 2 * MINUTE]
+
+
+def test_failed_poll_is_repeated(dt: Dynatrace):
+    fake = FakeProblems([OPEN], [OPEN])
+    feed = ProblemFeed(fake)
+    with mock.patch.object(fake, "get", side_effect=Exception("HTTP 503")):
+        with pytest.raises(Exception):
+            poll(feed, 0)
+    assert [e.event_type for e in poll(feed, 1)] == [ProblemEventType.OPENED]
+    assert fake.listed_from[1] == NOW + MINUTE - 24 * 60 * MINUTE
+
+
+def test_list_pages(dt: Dynatrace):
+    pages = list(dt.problems.list_pages(time_from="now-3d"))
+    assert [p["problemId"] for p in pages[0]["problems"]] == [OPEN["problemId"], CLOSED["problemId"]]
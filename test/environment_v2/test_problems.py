@@ -1,5 +1,7 @@
 from datetime import datetime
 
+import pytest
+
 import dynatrace.environment_v2.problems as pb
 from dynatrace import Dynatrace
 from dynatrace.pagination import PaginatedList
@@ -83,6 +85,7 @@ def test_close(dt: Dynatrace):
     # type checks
     assert isinstance(close_result, pb.ProblemCloseResult)
     assert isinstance(close_result.comment, pb.Comment)
+    assert not close_result.already_closed
     assert isinstance(close_result.close_timestamp, datetime)
     assert isinstance(close_result.closing, bool)
 
@@ -115,3 +118,43 @@ def test_get_comment(dt: Dynatrace):
     assert comment.content == "Closing this. 1234"
     assert comment.context == "dynatrace-problem-close"
     assert comment.author == "radu.stefan@dynatrace.com"
+
+
+def test_enrich(dt: Dynatrace):
+    lean = dt.problems.list(time_from="now-3d")
+    enriched = list(dt.problems.enrich(lean, select=lambda p: p.status == pb.Status.OPEN, workers=2))
+
+    assert [p.problem_id for p in enriched] == [PROBLEM_ID, "-8720840650528236841_1623003540000V2"]
+    assert enriched[0].evidence_details.total_count == 4
+    assert [c.content for c in enriched[0].recent_comments.comments][-1] == "OneAgent reconnected"
+    assert enriched[0].recent_comments.total_count == 3
+    assert enriched[1].evidence_details.total_count is None
+
+    by_id = next(dt.problems.enrich([PROBLEM_ID], comments=False))
+    assert by_id.evidence_details.total_count == 4
+
+
+def test_close_many(dt: Dynatrace):
+    report = dt.problems.close_many("Closing this. 1234", problems=[PROBLEM_ID, "P-ALREADY-CLOSED", "P-MISSING"], workers=3)
+
+    assert [r["problemId"] for r in report.results] == [PROBLEM_ID, "P-ALREADY-CLOSED", "P-MISSING"]
+    assert [r["problemId"] for r in report.done] == [PROBLEM_ID]
+    assert [r["problemId"] for r in report.skipped] == ["P-ALREADY-CLOSED"]
+    assert [r["problemId"] for r in report.errors] == ["P-MISSING"]
+
+    with pytest.raises(ValueError):
+        dt.problems.close_many("Closing this. 1234")
+
+
+def test_comment_many_skips_closed(dt: Dynatrace):
+    report = dt.problems.comment_many("Maintenance mis-alert", problem_selector='managementZones("Operations Team")', time_from="now-3d", context="bulk")
+
+    assert [r["problemId"] for r in report.done] == [PROBLEM_ID]
+    assert [r["problemId"] for r in report.skipped] == ["-8720840650528236841_1623003540000V2"]
+    assert report.errors == []
+
+
+def test_close_already_closed(dt: Dynatrace):
+    close_result = dt.problems.close(problem_id="P-ALREADY-CLOSED", message="Closing this. 1234")
+    assert close_result.problem_id is None
+    assert close_result.already_closed
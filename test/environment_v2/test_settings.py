@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from dynatrace.environment_v2.settings import SettingsObject, SettingsObjectCreate, SchemaStub
+from dynatrace.environment_v2.settings import SettingsObject, SettingsObjectCreate, SchemaStub, SettingsReconcilePlan, value_hash
 from dynatrace import Dynatrace
 from dynatrace.pagination import PaginatedList
 
@@ -62,4 +62,58 @@ def test_post_object(dt: Dynatrace):
 def test_put_object(dt: Dynatrace):
     response = dt.settings.update_object(test_object_id, settings_object)
     print(response)
-    
\ No newline at end of file
+    
+
+alerting_schema = "builtin:alerting.profile"
+desired_state = [
+    SettingsObjectCreate(alerting_schema, {"name": "Default", "severityRules": []}, "environment"),
+    SettingsObjectCreate(
+        alerting_schema,
+        {"name": "Team A", "severityRules": [{"severityLevel": "AVAILABILITY", "delayInMinutes": 0}]},
+        "environment",
+        external_id="ext-changed",
+    ),
+    SettingsObjectCreate(alerting_schema, {"name": "Team B", "severityRules": []}, "environment"),
+]
+
+
+def test_value_hash_ignores_key_order():
+    assert value_hash({"a": 1, "b": [1, 2]}) == value_hash({"b": [1, 2], "a": 1})
+    assert value_hash({"a": 1}) != value_hash({"a": 2})
+
+
+def test_plan(dt: Dynatrace):
+    plan = dt.settings.plan(desired_state, delete_missing=True)
+    assert isinstance(plan, SettingsReconcilePlan)
+    assert plan.has_changes
+    assert [o.object_id for o in plan.unchanged] == ["obj-unchanged"]
+    assert [(current.object_id, d.external_id) for current, d in plan.updates] == [("obj-changed", "ext-changed")]
+    assert [d.value["name"] for d in plan.creates] == ["Team B"]
+    assert [o.object_id for o in plan.deletes] == ["obj-orphan"]
+
+
+def test_plan_keeps_unmanaged_objects(dt: Dynatrace):
+    plan = dt.settings.plan(desired_state)
+    assert plan.deletes == []
+
+
+def test_reconcile_dry_run(dt: Dynatrace):
+    plan = dt.settings.reconcile(desired_state, delete_missing=True, dry_run=True)
+    assert plan.has_changes
+    assert plan.results == []
+
+
+def test_reconcile(dt: Dynatrace):
+    plan = dt.settings.reconcile(desired_state, delete_missing=True)
+    assert plan.errors == []
+    assert [(r["action"], r["objectId"]) for r in plan.results] == [
+        ("create", "obj-created"),
+        ("update", "obj-changed"),
+        ("delete", "obj-orphan"),
+    ]
+
+
+def test_reconcile_no_changes(dt: Dynatrace):
+    plan = dt.settings.reconcile(desired_state[:1])
+    assert not plan.has_changes
+    assert plan.results == []
@@ -0,0 +1,79 @@
+import pytest
+
+from dynatrace import Dynatrace
+from dynatrace.environment_v2.settings import SettingsObjectCreate, SchemaDefinition
+from dynatrace.environment_v2.settings_schema_cache import SettingsSchemaCache, _check_constraint
+
+
+SPAN_SCHEMA = "builtin:span-attribute"
+TABLE_SCHEMA = "builtin:ua.attribute-table"
+
+
+def test_get_schema(dt: Dynatrace):
+    schema = dt.settings.get_schema(SPAN_SCHEMA)
+    assert isinstance(schema, SchemaDefinition)
+    assert schema.version == "0.0.42"
+    assert schema.allowed_scopes == ["environment"]
+    assert "masking" in schema.properties
+
+
+def test_sync(dt: Dynatrace, tmp_path):
+    cache = SettingsSchemaCache(dt.settings, tmp_path)
+    assert sorted(cache.sync()) == ["builtin:attribute-block-list", SPAN_SCHEMA, TABLE_SCHEMA]
+    assert (tmp_path / "builtin_span-attribute" / "0_0_42.json").exists()
+
+    # Versions already on disk are not downloaded again, also by a new cache instance
+    assert cache.sync() == []
+    assert SettingsSchemaCache(dt.settings, tmp_path).sync() == []
+    assert SettingsSchemaCache(dt.settings, tmp_path).get(SPAN_SCHEMA).version == "0.0.42"
+
+
+def test_validate_valid_object(dt: Dynatrace, tmp_path):
+    cache = SettingsSchemaCache(dt.settings, tmp_path)
+    valid = SettingsObjectCreate(SPAN_SCHEMA, {"key": "http.route", "masking": "NOT_MASKED"}, "environment")
+    assert cache.validate(valid) == []
+
+
+def test_validate_invalid_objects(dt: Dynatrace, tmp_path):
+    cache = SettingsSchemaCache(dt.settings, tmp_path)
+
+    errors = cache.validate(SettingsObjectCreate(SPAN_SCHEMA, {"key": " padded", "masking": "SOMETIMES", "extra": 1}, "HOST-ABC"))
+    assert len(errors) == 4
+    assert any("scope 'HOST-ABC' is not allowed" in e for e in errors)
+    assert any("extra: unknown property" in e for e in errors)
+    assert any("masking: 'SOMETIMES' is not one of" in e for e in errors)
+    assert any("key: must not start or end with whitespace" in e for e in errors)
+
+    errors = cache.validate(SettingsObjectCreate(SPAN_SCHEMA, {"key": ""}, "environment"))
+    assert any("masking: required property is missing" in e for e in errors)
+    assert any("key: must be at least 1 characters long" in e for e in errors)
+
+
+def test_validate_nested_types(dt: Dynatrace, tmp_path):
+    cache = SettingsSchemaCache(dt.settings, tmp_path)
+    cards = [{"title": "a", "width": 4}, {"title": "b", "width": 13}, {"width": "wide"}, {"title": "d"}]
+    errors = cache.validate(SettingsObjectCreate(TABLE_SCHEMA, {"cards": cards}, "environment"))
+    assert any("cards: allows at most 3 items" in e for e in errors)
+    assert any("cards[1].width: must be at most 12" in e for e in errors)
+    assert any("cards[2].title: required property is missing" in e for e in errors)
+    assert any("cards[2].width: expected an integer" in e for e in errors)
+
+
+def test_create_object_rejects_locally(dt: Dynatrace, tmp_path):
+    cache = SettingsSchemaCache(dt.settings, tmp_path)
+    invalid = SettingsObjectCreate(SPAN_SCHEMA, {"key": "http.route"}, "environment")
+    with pytest.raises(ValueError, match="masking: required property is missing"):
+        dt.settings.create_object(body=invalid, schema_cache=cache)
+
+
+def test_pattern_constraint():
+    def errors(pattern, value):
+        found = []
+        _check_constraint({"type": "PATTERN", "pattern": pattern}, value, "key", found)
+        return found
+
+    assert errors("[a-z]+", "route") == []
+    # The whole value has to match, like Java's String.matches
+    assert errors("[a-z]+", "http.route") == ["key: must match '[a-z]+'"]
+    # Java only syntax is left for the API to check
+    assert errors(r"\p{L}++", "route") == []
@@ -0,0 +1,29 @@
+import io
+from unittest import mock
+
+from dynatrace.http_client import HttpClient, TOO_MANY_REQUESTS_WAIT
+
+# The dt fixture replaces make_request for every test, the real one is kept to test it
+make_request = HttpClient.make_request
+
+
+class Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {"retry-after": "0"}
+        self.text = ""
+
+
+def test_throttled_upload_is_retried_with_its_body():
+    client = HttpClient("https://mock_tenant", "mock_token", too_many_requests_strategy=TOO_MANY_REQUESTS_WAIT)
+    bodies = []
+
+    def request(method, url, files=None, **kwargs):
+        bodies.append(files["file"][1].read())
+        return Response(429 if len(bodies) == 1 else 200)
+
+    with mock.patch.object(client.session, "request", side_effect=request):
+        response = make_request(client, "/api/config/v1/extensions", method="POST", files={"file": ("extension.zip", io.BytesIO(b"zip"))})
+
+    assert response.status_code == 200
+    assert bodies == [b"zip", b"zip"]
@@ -1,7 +1,11 @@
+from unittest import mock
+import pytest
+
 from dynatrace import Dynatrace
 from datetime import datetime
 
 from dynatrace.environment_v2.logs import LogRecord, EventType, LogRecordStatus
+from dynatrace.http_client import HttpClient, HttpError
 from dynatrace.pagination import PaginatedList
 
 
@@ -20,3 +24,49 @@ def test_export(dt: Dynatrace):
     assert first.status == LogRecordStatus.ERROR
     assert first.timestamp == datetime.utcfromtimestamp(1683574915193 / 1000)
 
+
+def test_search(dt: Dynatrace):
+    logs = list(dt.logs.search(query='status="ERROR"', time_from="now-1h", limit=3))
+    assert len(logs) == 3
+    assert all(isinstance(log, LogRecord) for log in logs)
+    assert logs[2].content.startswith("Failed to assign")
+
+
+def test_aggregate(dt: Dynatrace):
+    aggregation = dt.logs.aggregate(["status", "log.source"], time_from="now-10m")
+    assert not aggregation.local
+    assert aggregation.counts("status") == {"ERROR": 17, "INFO": 1}
+
+    local = dt.logs.aggregate_locally(["status", "log.source"], time_from="now-10m")
+    assert local.local
+    assert local.aggregation_result == aggregation.aggregation_result
+
+
+def aggregate_failing_with(status_code):
+    original = HttpClient.make_request
+
+    def make_request(self, path, *args, **kwargs):
+        if path.endswith("/aggregate"):
+            raise HttpError(f"Error making request to https://mock_tenant{path}", mock.Mock(status_code=status_code))
+        return original(self, path, *args, **kwargs)
+
+    return mock.patch.object(HttpClient, "make_request", new=make_request)
+
+
+def test_aggregate_falls_back_to_export(dt: Dynatrace):
+    with aggregate_failing_with(404):
+        aggregation = dt.logs.aggregate("dt.extension.name", time_from="now-10m", max_group_values=2)
+        assert aggregation.local
+        assert aggregation.counts("dt.extension.name") == {"custom:extension-netapp-ontap": 9, "custom:sybase-ase-health-ci": 3}
+
+        with pytest.raises(Exception):
+            dt.logs.aggregate("status", time_from="now-10m", local_fallback=False)
+
+
+@pytest.mark.parametrize("status_code", [400, 401, 403, 429, 500, 503])
+def test_aggregate_errors_do_not_fall_back(dt: Dynatrace, status_code):
+    with aggregate_failing_with(status_code), mock.patch.object(dt.logs, "aggregate_locally") as aggregate_locally:
+        with pytest.raises(HttpError) as error:
+            dt.logs.aggregate("status", time_from="now-10m")
+    assert error.value.status_code == status_code
+    aggregate_locally.assert_not_called()
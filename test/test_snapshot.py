@@ -0,0 +1,53 @@
+import json
+from unittest import mock
+
+import pytest
+
+from dynatrace import Dynatrace
+from dynatrace.snapshot import ConfigurationSnapshot, SnapshotResult
+
+MAINTENANCE_WINDOW_ID = "b6376a12-0b82-4069-9a41-0e55ef9a1f44"
+
+
+def test_first_snapshot(dt: Dynatrace, tmp_path):
+    result = ConfigurationSnapshot(dt, tmp_path, kinds=["maintenance_windows"]).run()
+    assert isinstance(result, SnapshotResult)
+    assert result.errors == []
+    assert result.fetched == 6
+    assert result.written == 6
+    assert result.unchanged == 0
+
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+    assert len(manifest) == 6
+    assert manifest[f"maintenance_windows/{MAINTENANCE_WINDOW_ID}"]["hash"]
+    assert manifest["settings/builtin:span-attribute/snapshot-object-2"]["updateToken"] == "token-2"
+    assert len(list((tmp_path / "manifests").iterdir())) == 1
+
+
+def test_incremental_snapshot(dt: Dynatrace, tmp_path):
+    snapshot = ConfigurationSnapshot(dt, tmp_path, kinds=["maintenance_windows"])
+    snapshot.run()
+    result = snapshot.run()
+
+    # Settings with the same update token are not fetched again, config v1 objects are fetched but not rewritten
+    assert result.fetched == 3
+    assert result.written == 0
+    assert result.unchanged == 6
+    assert result.removed == 0
+    assert snapshot.read_object(f"maintenance_windows/{MAINTENANCE_WINDOW_ID}")["id"] == MAINTENANCE_WINDOW_ID
+
+
+def test_errors_keep_previous_entries(dt: Dynatrace, tmp_path):
+    snapshot = ConfigurationSnapshot(dt, tmp_path, kinds=["maintenance_windows"], include_settings=False)
+    snapshot.run()
+
+    with mock.patch.object(dt.maintenance_windows, "list", side_effect=Exception("HTTP 503")):
+        result = snapshot.run()
+    assert result.errors == ["Could not list maintenance_windows: HTTP 503"]
+    assert result.removed == 0
+    assert len(snapshot.read_manifest()) == 3
+
+
+def test_unknown_kind(dt: Dynatrace, tmp_path):
+    with pytest.raises(ValueError):
+        ConfigurationSnapshot(dt, tmp_path, kinds=["hosts"])
@@ -0,0 +1,113 @@
+import hashlib
+import threading
+
+import pytest
+
+from dynatrace.streaming import MultipartFileEncoder, download_ranged
+
+BLOB = bytes(range(256)) * 400  # 102400 bytes
+ETAG = '"v1"'
+
+
+class RangeResponse:
+    def __init__(self, status_code, content=b"", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def iter_content(self, chunk_size=1):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start : start + chunk_size]
+
+    def close(self):
+        pass
+
+
+class RangeHttpClient:
+    def __init__(self, accept_ranges=True, fail_ranges=(), reject_head=False):
+        self.accept_ranges = accept_ranges
+        self.reject_head = reject_head
+        self.fail_ranges = set(fail_ranges)
+        self.ranges = []
+        self.lock = threading.Lock()
+
+    def make_request(self, path, params=None, headers=None, method="GET", stream=False, **kwargs):
+        headers = headers or {}
+        if method == "HEAD":
+            if self.reject_head:
+                raise Exception(f"Error making request to {path}: <Response [405]>. Response: ")
+            response_headers = {"Content-Length": str(len(BLOB)), "ETag": ETAG}
+            if self.accept_ranges:
+                response_headers["Accept-Ranges"] = "bytes"
+            return RangeResponse(200, headers=response_headers)
+        if "Range" not in headers:
+            return RangeResponse(200, BLOB, {"ETag": ETAG})
+        start, end = (int(x) for x in headers["Range"][len("bytes="):].split("-"))
+        with self.lock:
+            self.ranges.append(start)
+        if start in self.fail_ranges:
+            raise Exception("Connection reset")
+        return RangeResponse(206, BLOB[start : end + 1])
+
+
+def test_download_ranged(tmp_path):
+    client = RangeHttpClient()
+    destination = tmp_path / "installer.sh"
+    result = download_ranged(client, "/installer", destination, workers=4, part_size=10000, expected_sha256=hashlib.sha256(BLOB).hexdigest())
+
+    assert destination.read_bytes() == BLOB
+    assert result.size == len(BLOB)
+    assert result.etag == ETAG
+    assert result.verified
+    assert sorted(client.ranges) == list(range(0, len(BLOB), 10000))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["installer.sh"]
+
+
+def test_download_ranged_resumes(tmp_path):
+    destination = tmp_path / "installer.sh"
+    with pytest.raises(Exception):
+        download_ranged(RangeHttpClient(fail_ranges={30000, 70000}), "/installer", destination, workers=2, part_size=10000)
+    assert not destination.exists()
+    assert (tmp_path / "installer.sh.part.json").exists()
+
+    client = RangeHttpClient()
+    result = download_ranged(client, "/installer", destination, workers=2, part_size=10000)
+    assert destination.read_bytes() == BLOB
+    assert result.sha256 == hashlib.sha256(BLOB).hexdigest()
+    assert 30000 in client.ranges and 70000 in client.ranges
+    assert len(client.ranges) < len(range(0, len(BLOB), 10000))
+
+
+def test_download_ranged_checksum_mismatch(tmp_path):
+    with pytest.raises(ValueError):
+        download_ranged(RangeHttpClient(), "/installer", tmp_path / "installer.sh", part_size=10000, expected_sha256="0" * 64)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_download_without_range_support(tmp_path):
+    client = RangeHttpClient(accept_ranges=False)
+    result = download_ranged(client, "/installer", tmp_path / "installer.sh", part_size=10000)
+    assert (tmp_path / "installer.sh").read_bytes() == BLOB
+    assert result.etag == ETAG
+    assert client.ranges == []
+
+
+def test_download_when_head_is_rejected(tmp_path):
+    client = RangeHttpClient(reject_head=True)
+    result = download_ranged(client, "/installer", tmp_path / "installer.sh", part_size=10000, expected_sha256=hashlib.sha256(BLOB).hexdigest())
+    assert (tmp_path / "installer.sh").read_bytes() == BLOB
+    assert result.verified
+    assert client.ranges == []
+
+
+def test_multipart_encoder_rewinds(tmp_path):
+    path = tmp_path / "extension.zip"
+    path.write_bytes(BLOB)
+    with MultipartFileEncoder(path, chunk_size=4096) as body:
+        first = b"".join(iter(lambda: body.read(), b""))
+        assert len(first) == len(body)
+        assert body.tell() == len(body)
+        body.seek(0)
+        assert b"".join(iter(lambda: body.read(100000), b"")) == first
+    assert b'filename="extension.zip"' in first
+    assert BLOB in first